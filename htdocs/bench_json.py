@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for list endpoint serialization
+
+Compares rows/second for 50, 1k and 10k consultation rows across:
+  pydantic   one ConsultationResponse per row, then validated and dumped again
+             (the old main.py path; skipped if pydantic is not installed)
+  dict copy  field-by-field dicts + json.dumps (the old simple_server.py path)
+  fast json  fast_json.rows_to_json on sqlite3.Row results without orjson
+             (column template, no per-row dicts)
+  orjson     fast_json.rows_to_json with orjson, one dict per row (skipped if
+             not installed)
+
+Both fast paths call rows_to_json itself, so they measure what the servers run.
+
+Run:
+  python bench_json.py [--sizes 50 1000 10000] [--seconds 1]
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+
+import fast_json
+
+try:
+    from pydantic import BaseModel, TypeAdapter
+except ImportError:
+    BaseModel = None
+
+COLUMNS = ["id", "patient_name", "symptoms", "chatbot_recommendation", "status",
+           "doctor_name", "doctor_note", "created_at", "updated_at"]
+
+
+def load_rows(count):
+    """Fetch count synthetic consultations as sqlite3.Row objects"""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"CREATE TABLE consultations ({', '.join(COLUMNS)})")
+    conn.executemany(
+        f"INSERT INTO consultations VALUES ({', '.join('?' for _ in COLUMNS)})",
+        [(
+            f"consult-{i:08d}",
+            f"User_{i % 997}",
+            "Fever and dry cough for three days, mild headache",
+            "Rest, fluids, paracetamol for fever. ⚠️ See a doctor if breathing gets difficult.",
+            "pending",
+            None,
+            None,
+            "2024-05-01 10:00:00",
+            "2024-05-01 10:00:00"
+        ) for i in range(count)]
+    )
+    rows = conn.execute("SELECT * FROM consultations").fetchall()
+    conn.close()
+    return rows
+
+
+def dict_copy(rows):
+    consultations = []
+    for row in rows:
+        consultations.append({column: row[column] for column in COLUMNS})
+    return json.dumps(consultations).encode()
+
+
+def fast_stdlib(rows):
+    saved = fast_json.orjson
+    fast_json.orjson = None
+    try:
+        return fast_json.rows_to_json(rows)
+    finally:
+        fast_json.orjson = saved
+
+
+def fast_orjson(rows):
+    return fast_json.rows_to_json(rows)
+
+
+def make_pydantic_path():
+    if BaseModel is None:
+        return None
+
+    class ConsultationResponse(BaseModel):
+        id: str
+        patient_name: str
+        symptoms: str
+        chatbot_recommendation: str
+        status: str
+        doctor_name: str | None = None
+        doctor_note: str | None = None
+        created_at: str
+        updated_at: str
+
+    adapter = TypeAdapter(list[ConsultationResponse])
+
+    def pydantic_path(rows):
+        models = [ConsultationResponse(**{column: row[column] for column in COLUMNS}) for row in rows]
+        # FastAPI validates the returned objects against response_model, then dumps them
+        return adapter.dump_json(adapter.validate_python([m.model_dump() for m in models]))
+
+    return pydantic_path
+
+
+def rows_per_second(fn, rows, seconds):
+    fn(rows)  # warm up
+    iterations = 0
+    start = time.perf_counter()
+    while True:
+        fn(rows)
+        iterations += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return iterations * len(rows) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialization throughput for list endpoints")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 1000, 10000])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    paths = [("pydantic", make_pydantic_path()), ("dict copy", dict_copy), ("fast json", fast_stdlib)]
+    if fast_json.orjson is not None:
+        paths.append(("orjson", fast_orjson))
+
+    print("⚡ JSON serialization benchmark (rows/second)")
+    print("=" * 60)
+    print(f"{'path':<12}" + "".join(f"{size:>14,}" for size in args.sizes))
+
+    results = {}
+    for size in args.sizes:
+        rows = load_rows(size)
+        for name, fn in paths:
+            if fn is not None:
+                results[(name, size)] = rows_per_second(fn, rows, args.seconds)
+
+    for name, fn in paths:
+        if fn is None:
+            print(f"{name:<12}  (not installed)")
+            continue
+        print(f"{name:<12}" + "".join(f"{results[(name, size)]:>14,.0f}" for size in args.sizes))
+
+
+if __name__ == "__main__":
+    main()
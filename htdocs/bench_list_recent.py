@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the /_list_recent consultation queue
+
+Builds a throwaway SQLite database with one million consultations and
+compares the original unindexed "LIMIT 50" query against keyset
+pagination over the (status, created_at, id) index.
+
+Run:
+  python bench_list_recent.py [--rows 1000000] [--pages 20]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from consultation_queue import list_consultations
+
+STATUSES = ["pending", "approved", "modified"]
+
+
+def build_database(path, rows):
+    """Create the consultations table and bulk load synthetic rows"""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("""
+        CREATE TABLE consultations (
+            id TEXT PRIMARY KEY,
+            patient_name TEXT NOT NULL,
+            symptoms TEXT NOT NULL,
+            chatbot_recommendation TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            doctor_name TEXT,
+            doctor_note TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    batch = []
+    for i in range(rows):
+        created = (start + timedelta(seconds=i * 30)).strftime("%Y-%m-%d %H:%M:%S")
+        batch.append((
+            f"c{i:09d}",
+            f"User_{rng.randint(1, 50000)}",
+            "fever and cough for two days",
+            "Rest, fluids and monitor temperature.",
+            rng.choices(STATUSES, weights=[10, 60, 30])[0],
+            created,
+            created
+        ))
+        if len(batch) == 50000:
+            conn.executemany("""
+                INSERT INTO consultations (id, patient_name, symptoms, chatbot_recommendation, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, batch)
+            batch = []
+    if batch:
+        conn.executemany("""
+            INSERT INTO consultations (id, patient_name, symptoms, chatbot_recommendation, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, batch)
+    conn.commit()
+    return conn
+
+
+def timed(fn, repeat):
+    """Return (median seconds, last result) over repeat runs"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2], result
+
+
+def legacy_query(conn):
+    return conn.execute("""
+        SELECT * FROM consultations
+        WHERE status = 'pending'
+        ORDER BY created_at DESC
+        LIMIT 50
+    """).fetchall()
+
+
+def walk_pages(conn, pages, limit=50):
+    """Follow next cursors for a number of pages, returning rows seen"""
+    cursor = None
+    seen = 0
+    for _ in range(pages):
+        rows, cursor = list_consultations(conn, status="pending", limit=limit, cursor=cursor)
+        seen += len(rows)
+        if not cursor:
+            break
+    return seen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /_list_recent queries")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print("📊 /_list_recent benchmark")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+
+        start = time.perf_counter()
+        conn = build_database(path, args.rows)
+        conn.row_factory = sqlite3.Row
+        print(f"Loaded {args.rows:,} rows in {time.perf_counter() - start:.1f}s")
+
+        no_index, rows = timed(lambda: legacy_query(conn), args.repeat)
+        print(f"Unindexed LIMIT 50:          {no_index * 1000:9.2f} ms ({len(rows)} rows)")
+
+        start = time.perf_counter()
+        conn.execute("""
+            CREATE INDEX idx_consultations_status_created
+            ON consultations (status, created_at, id)
+        """)
+        conn.execute("ANALYZE")
+        print(f"Index build:                 {(time.perf_counter() - start) * 1000:9.2f} ms")
+
+        indexed, rows = timed(lambda: legacy_query(conn), args.repeat)
+        print(f"Indexed LIMIT 50:            {indexed * 1000:9.2f} ms ({len(rows)} rows)")
+
+        first_page, _ = timed(lambda: list_consultations(conn, limit=50), args.repeat)
+        print(f"Keyset first page:           {first_page * 1000:9.2f} ms")
+
+        walk, seen = timed(lambda: walk_pages(conn, args.pages), args.repeat)
+        print(f"Keyset {args.pages} pages:             {walk * 1000:9.2f} ms "
+              f"({seen} rows, {walk / args.pages * 1000:.2f} ms/page)")
+
+        plan = conn.execute("""
+            EXPLAIN QUERY PLAN
+            SELECT * FROM consultations
+            WHERE status = 'pending' AND (created_at, id) < (?, ?)
+            ORDER BY created_at DESC, id DESC LIMIT 51
+        """, ("2024-06-01 00:00:00", "c")).fetchall()
+        print("\nQuery plan:")
+        for row in plan:
+            print(f"   {row[3]}")
+
+        if first_page > 0:
+            print(f"\n🚀 Speedup (first page): {no_index / first_page:.0f}x")
+
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
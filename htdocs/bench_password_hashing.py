@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark login throughput against password-hashing cost
+
+For each cost setting this measures single-hash latency and sustained
+verifications per second across the hashing pool, then recommends the
+highest cost that still holds the target peak login rate.
+
+Run:
+  python bench_password_hashing.py [--target-rate 50] [--workers 4] [--seconds 3]
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from password_hashing import hash_password, verify_password, WORKERS
+
+SCRYPT_COSTS = [2 ** 12, 2 ** 13, 2 ** 14, 2 ** 15, 2 ** 16]
+PBKDF2_COSTS = [100_000, 200_000, 400_000, 600_000, 1_000_000]
+
+
+def measure(algorithm, cost, workers, seconds):
+    """Return (single verify latency in ms, verifications per second with workers threads)"""
+    kwargs = {"scrypt_n": cost} if algorithm == "scrypt" else {"pbkdf2_iterations": cost}
+    stored = hash_password("correct horse battery staple", algorithm=algorithm, **kwargs)
+
+    start = time.perf_counter()
+    verify_password("correct horse battery staple", stored)
+    latency = (time.perf_counter() - start) * 1000
+
+    deadline = time.perf_counter() + seconds
+    completed = 0
+
+    def worker():
+        count = 0
+        while time.perf_counter() < deadline:
+            verify_password("correct horse battery staple", stored)
+            count += 1
+        return count
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for count in pool.map(lambda _: worker(), range(workers)):
+            completed += count
+    elapsed = time.perf_counter() - start
+
+    return latency, completed / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput vs. password hashing cost")
+    parser.add_argument("--target-rate", type=float, default=50.0, help="peak logins per second to sustain")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="hashing pool size (PASSWORD_HASH_WORKERS)")
+    parser.add_argument("--seconds", type=float, default=3.0, help="measurement time per setting")
+    parser.add_argument("--algorithm", choices=["scrypt", "pbkdf2_sha256", "both"], default="both")
+    args = parser.parse_args()
+
+    print("🔐 Password hashing benchmark")
+    print(f"   workers={args.workers}  target={args.target_rate:.0f} logins/s")
+    print("=" * 60)
+    print(f"{'algorithm':<15} {'cost':>10} {'latency ms':>12} {'logins/s':>12}")
+
+    plans = []
+    if args.algorithm in ("scrypt", "both"):
+        plans += [("scrypt", cost) for cost in SCRYPT_COSTS]
+    if args.algorithm in ("pbkdf2_sha256", "both"):
+        plans += [("pbkdf2_sha256", cost) for cost in PBKDF2_COSTS]
+
+    best = {}
+    for algorithm, cost in plans:
+        latency, rate = measure(algorithm, cost, args.workers, args.seconds)
+        marker = "✅" if rate >= args.target_rate else "❌"
+        print(f"{algorithm:<15} {cost:>10} {latency:>12.1f} {rate:>12.1f} {marker}")
+        if rate >= args.target_rate:
+            best[algorithm] = cost
+
+    print("=" * 60)
+    for algorithm, cost in best.items():
+        setting = "PASSWORD_SCRYPT_N" if algorithm == "scrypt" else "PASSWORD_PBKDF2_ITERATIONS"
+        print(f"🎯 Highest {algorithm} cost holding {args.target_rate:.0f} logins/s: {setting}={cost}")
+    if not best:
+        print("⚠️ No setting reaches the target rate; add workers or lower the target.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Embedding and retrieval benchmark
+
+Measures what an embedding or vector-index change costs:
+  encode     SentenceTransformer.encode throughput at several batch sizes
+  chroma     end-to-end Chroma build and query latency plus recall@k, on
+             synthetic corpora (1k to 1M vectors) in collections configured
+             like knowledge_base / conversations / user_profiles
+  hnsw       HNSW parameter sweep (M, construction_ef, search_ef) on the
+             same index library Chroma uses (chroma-hnswlib), so search_ef
+             can be varied without rebuilding
+  stored     query latency and recall@k on the real persisted collections,
+             using their stored embeddings as queries (--stored)
+
+Recall@k is measured against an exact brute-force cosine search in numpy.
+Synthetic vectors are clustered (not uniform) so recall behaves like it
+does on real sentence embeddings. 1M vectors need roughly 3 GB of RAM.
+
+Results are printed and written as JSON for comparison between commits.
+
+Run:
+  python bench_retrieval.py [--sizes 1000 10000 100000] [--queries 200] [--k 10]
+  python bench_retrieval.py --skip-encode --sizes 1000000 --m 16 32 --search-ef 10 50 100
+  python bench_retrieval.py --stored --skip-encode --sizes 1000
+  python bench_retrieval.py --stub          # offline: hashing embedder instead of the model
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from vector_index import COLLECTIONS, DEFAULT_CONSTRUCTION_EF, DEFAULT_M, DEFAULT_SEARCH_EF, collection_metadata
+
+try:
+    import hnswlib
+except ImportError:  # the sweep is skipped without chroma-hnswlib
+    hnswlib = None
+
+
+DIMENSION = 384  # all-MiniLM-L6-v2
+
+SAMPLE_TEXTS = [
+    "I have had a fever and dry cough for three days",
+    "Paracetamol can relieve fever and mild pain; follow the dose on the pack.",
+    "Annual flu vaccination is recommended for older adults and high-risk groups.",
+    "Patient reports sore throat, fatigue and mild headache since yesterday.",
+    "Seek urgent care for chest pain, difficulty breathing or confusion.",
+    "Name: Asha Patel Age: 42 Medical History: type 2 diabetes, hypertension Allergies: penicillin",
+    "user: my child has a rash after eating peanuts\nassistant: this may be an allergic reaction",
+    "Dehydration signs include dark urine, dizziness and a dry mouth."
+]
+
+
+def percentile_ms(values, fraction):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))] * 1000, 3)
+
+
+def load_model(stub):
+    if stub:
+        from stub_backends import HashingEmbedder
+        return HashingEmbedder(DIMENSION)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer("all-MiniLM-L6-v2")
+
+
+def bench_encode(model, batch_sizes, total_texts):
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] + f" #{i}" for i in range(total_texts)]
+    model.encode(texts[:8])  # warm up
+
+    results = []
+    for batch_size in batch_sizes:
+        latencies = []
+        start = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            t0 = time.perf_counter()
+            model.encode(texts[i:i + batch_size], batch_size=batch_size)
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "batch_size": batch_size,
+            "texts_per_second": round(len(texts) / elapsed, 1),
+            "batch_p50_ms": percentile_ms(latencies, 0.50),
+            "batch_p95_ms": percentile_ms(latencies, 0.95)
+        })
+    return results
+
+
+def synthetic_vectors(count, rng, centers):
+    """Unit vectors scattered around cluster centers (same-cluster cosine around 0.65)"""
+    assignment = rng.integers(0, len(centers), size=count)
+    noise = rng.normal(scale=0.7 / np.sqrt(centers.shape[1]), size=(count, centers.shape[1]))
+    vectors = centers[assignment] + noise.astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def make_dataset(size, queries, seed=42):
+    rng = np.random.default_rng(seed + size)
+    centers = rng.normal(size=(max(16, size // 500), DIMENSION)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    return synthetic_vectors(size, rng, centers), synthetic_vectors(queries, rng, centers)
+
+
+def exact_top_k(corpus, queries, k, chunk=50_000):
+    """Brute-force cosine top-k (vectors are unit length, so a dot product)"""
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), k), dtype=np.int64)
+    for offset in range(0, len(corpus), chunk):
+        scores = queries @ corpus[offset:offset + chunk].T
+        top = min(k, scores.shape[1])
+        part = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+        merged_scores = np.concatenate([best_scores, np.take_along_axis(scores, part, axis=1)], axis=1)
+        merged_ids = np.concatenate([best_ids, part + offset], axis=1)
+        order = np.argsort(-merged_scores, axis=1)[:, :k]
+        best_scores = np.take_along_axis(merged_scores, order, axis=1)
+        best_ids = np.take_along_axis(merged_ids, order, axis=1)
+    return best_ids
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return round(hits / (len(truth) * len(truth[0])), 4)
+
+
+def max_batch_size(client):
+    for attr in ("get_max_batch_size", "max_batch_size"):
+        value = getattr(client, attr, None)
+        if callable(value):
+            value = value()
+        if value:
+            return int(value)
+    return 5000
+
+
+def bench_chroma(workdir, collection_name, corpus, queries, truth, k, m, construction_ef, search_ef):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=os.path.join(workdir, f"{collection_name}-{len(corpus)}-{m}-{construction_ef}"))
+    metadata = collection_metadata(collection_name, M=m, construction_ef=construction_ef, search_ef=search_ef)
+    collection = client.get_or_create_collection(name=collection_name, metadata=metadata)
+
+    batch = max_batch_size(client)
+    start = time.perf_counter()
+    for offset in range(0, len(corpus), batch):
+        chunk = corpus[offset:offset + batch]
+        collection.add(ids=[str(i) for i in range(offset, offset + len(chunk))], embeddings=chunk.tolist())
+    build_seconds = time.perf_counter() - start
+
+    latencies = []
+    found = []
+    for query in queries:
+        t0 = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latencies.append(time.perf_counter() - t0)
+        found.append([int(i) for i in result["ids"][0]])
+
+    return {
+        "collection": collection_name,
+        "size": len(corpus),
+        "M": m,
+        "construction_ef": construction_ef,
+        "search_ef": search_ef,
+        "build_seconds": round(build_seconds, 3),
+        "add_vectors_per_second": round(len(corpus) / build_seconds, 1),
+        "query_p50_ms": percentile_ms(latencies, 0.50),
+        "query_p95_ms": percentile_ms(latencies, 0.95),
+        "query_p99_ms": percentile_ms(latencies, 0.99),
+        f"recall_at_{k}": recall_at_k(found, truth)
+    }
+
+
+def bench_hnsw_sweep(corpus, queries, truth, k, m_values, construction_efs, search_efs):
+    results = []
+    for m in m_values:
+        for construction_ef in construction_efs:
+            index = hnswlib.Index(space="cosine", dim=corpus.shape[1])
+            index.init_index(max_elements=len(corpus), ef_construction=construction_ef, M=m)
+            start = time.perf_counter()
+            index.add_items(corpus, np.arange(len(corpus)))
+            build_seconds = time.perf_counter() - start
+
+            for search_ef in search_efs:
+                index.set_ef(max(search_ef, k))
+                latencies = []
+                found = []
+                for query in queries:
+                    t0 = time.perf_counter()
+                    labels, _ = index.knn_query(query, k=k)
+                    latencies.append(time.perf_counter() - t0)
+                    found.append(labels[0].tolist())
+                results.append({
+                    "size": len(corpus),
+                    "M": m,
+                    "construction_ef": construction_ef,
+                    "search_ef": search_ef,
+                    "build_seconds": round(build_seconds, 3),
+                    "query_p50_ms": percentile_ms(latencies, 0.50),
+                    "query_p95_ms": percentile_ms(latencies, 0.95),
+                    f"recall_at_{k}": recall_at_k(found, truth)
+                })
+    return results
+
+
+def bench_stored(k, queries):
+    """Latency and recall on the persisted collections, querying with perturbed stored embeddings"""
+    import chromadb
+
+    rng = np.random.default_rng(7)
+    results = []
+    for name, path in COLLECTIONS.items():
+        if not os.path.isdir(path):
+            continue
+        client = chromadb.PersistentClient(path=path)
+        try:
+            collection = client.get_collection(name)
+        except Exception:
+            continue
+        stored = collection.get(include=["embeddings"])
+        if not stored["ids"]:
+            continue
+
+        ids = stored["ids"]
+        corpus = np.asarray(stored["embeddings"], dtype=np.float32)
+        corpus /= np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+        picks = rng.integers(0, len(corpus), size=min(queries, len(corpus)))
+        probe = corpus[picks] + rng.normal(scale=0.05, size=(len(picks), corpus.shape[1])).astype(np.float32)
+        probe /= np.linalg.norm(probe, axis=1, keepdims=True)
+
+        top = min(k, len(corpus))
+        truth = [[ids[i] for i in row] for row in exact_top_k(corpus, probe, top)]
+        latencies = []
+        found = []
+        for query in probe:
+            t0 = time.perf_counter()
+            result = collection.query(query_embeddings=[query.tolist()], n_results=top, include=[])
+            latencies.append(time.perf_counter() - t0)
+            found.append(result["ids"][0])
+
+        results.append({
+            "collection": name,
+            "size": len(corpus),
+            "metadata": collection.metadata,
+            "query_p50_ms": percentile_ms(latencies, 0.50),
+            "query_p95_ms": percentile_ms(latencies, 0.95),
+            f"recall_at_{k}": recall_at_k(found, truth)
+        })
+    return results
+
+
+def print_table(title, rows, columns):
+    print(f"\n{title}")
+    print("-" * 18 * len(columns))
+    print("".join(f"{c:>18}" for c in columns))
+    for row in rows:
+        print("".join(f"{str(row.get(c, '')):>18}" for c in columns))
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding and vector retrieval benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--collection", choices=sorted(COLLECTIONS), default="knowledge_base",
+                        help="production collection whose configuration the synthetic runs copy")
+    parser.add_argument("--m", type=int, nargs="+", default=[DEFAULT_M])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[DEFAULT_CONSTRUCTION_EF])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--chroma-search-ef", type=int, default=DEFAULT_SEARCH_EF, help="search_ef for the end-to-end Chroma runs")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--encode-texts", type=int, default=512)
+    parser.add_argument("--stub", action="store_true", help="use the offline hashing embedder")
+    parser.add_argument("--skip-encode", action="store_true")
+    parser.add_argument("--skip-chroma", action="store_true")
+    parser.add_argument("--stored", action="store_true", help="also benchmark the persisted collections")
+    parser.add_argument("--output", default="bench_retrieval.json")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "k": args.k,
+            "queries": args.queries,
+            "collection": args.collection,
+            "embedder": "stub" if args.stub else "all-MiniLM-L6-v2"
+        }
+    }
+
+    print("🔎 Embedding and retrieval benchmark")
+    print("=" * 60)
+
+    if not args.skip_encode:
+        model = load_model(args.stub)
+        report["encode"] = bench_encode(model, args.batch_sizes, args.encode_texts)
+        print_table("🧠 model.encode", report["encode"],
+                    ["batch_size", "texts_per_second", "batch_p50_ms", "batch_p95_ms"])
+
+    recall_key = f"recall_at_{args.k}"
+    workdir = tempfile.mkdtemp(prefix="bench-retrieval-")
+    report["chroma"] = []
+    report["hnsw"] = []
+    try:
+        for size in args.sizes:
+            corpus, queries = make_dataset(size, args.queries)
+            truth = exact_top_k(corpus, queries, args.k).tolist()
+
+            if not args.skip_chroma:
+                for m in args.m:
+                    for construction_ef in args.construction_ef:
+                        report["chroma"].append(bench_chroma(
+                            workdir, args.collection, corpus, queries, truth, args.k,
+                            m, construction_ef, args.chroma_search_ef
+                        ))
+
+            if hnswlib is not None:
+                report["hnsw"].extend(bench_hnsw_sweep(
+                    corpus, queries, truth, args.k, args.m, args.construction_ef, args.search_ef
+                ))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if report["chroma"]:
+        print_table(f"🗄️ Chroma ({args.collection} configuration)", report["chroma"],
+                    ["size", "M", "construction_ef", "build_seconds", "query_p50_ms", "query_p95_ms", recall_key])
+    if report["hnsw"]:
+        print_table("🕸️ HNSW sweep", report["hnsw"],
+                    ["size", "M", "construction_ef", "search_ef", "query_p50_ms", "query_p95_ms", recall_key])
+    elif hnswlib is None:
+        print("\n⚠️ chroma-hnswlib not installed, HNSW sweep skipped")
+
+    if args.stored:
+        report["stored"] = bench_stored(args.k, args.queries)
+        print_table("📦 Persisted collections", report["stored"],
+                    ["collection", "size", "query_p50_ms", "query_p95_ms", recall_key])
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Shared pytest fixtures
+
+Run from this directory:
+  python -m pytest -q
+"""
+
+import os
+import shutil
+
+import pytest
+
+from migrations import migrate
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DB = os.path.join(HERE, "chatbot.db")
+
+# Streamlit smoke check; run it with 'streamlit run test_streamlit.py'
+collect_ignore = ["test_streamlit.py"]
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    """Copy of the shipped chatbot.db, as created before schema migrations existed"""
+    path = tmp_path / "chatbot.db"
+    shutil.copyfile(BASELINE_DB, path)
+    return str(path)
+
+
+@pytest.fixture
+def db_path(baseline_db):
+    """The baseline database migrated to the latest schema version"""
+    migrate(baseline_db)
+    return baseline_db
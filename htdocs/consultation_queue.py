@@ -0,0 +1,195 @@
+"""
+Consultation queue queries shared by main.py and simple_server.py
+
+Keyset pagination over the (status, created_at, id) index so that listing
+the doctor queue never scans or sorts the whole consultations table.
+Reviewed consultations may have been moved to consultations_archive by
+retention.py; reads for those statuses span both tiers transparently.
+"""
+
+import base64
+import json
+from datetime import datetime, timezone
+
+from fts_query import build_match_query
+from migrations import SEARCH_INDEX, SEARCH_TIERS, fill_search_index
+
+CONSULTATION_STATUSES = ("pending", "approved", "modified")
+ARCHIVED_STATUSES = ("approved", "modified")
+CONSULTATION_COLUMNS = (
+    "id, patient_name, symptoms, chatbot_recommendation, status, "
+    "doctor_name, doctor_note, created_at, updated_at"
+)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at, consult_id):
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    raw = json.dumps([created_at, consult_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, consult_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(consult_id, str):
+        raise ValueError("Invalid cursor")
+    return created_at, consult_id
+
+
+def normalize_since(since):
+    """
+    Convert an ISO-8601 timestamp (or SQLite's 'YYYY-MM-DD HH:MM:SS') to the
+    UTC text created_at is stored as. Values with an offset are converted to
+    UTC; values without one are taken as UTC. Raises ValueError if unparseable.
+    """
+    if since is None or since == "":
+        return None
+    try:
+        parsed = datetime.fromisoformat(since.strip())
+    except (TypeError, ValueError):
+        raise ValueError("Invalid since timestamp. Use ISO-8601, e.g. 2025-01-31T09:00:00Z")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def list_consultations(conn, status="pending", since=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """
+    Fetch one page of consultations, newest first.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    Raises ValueError for an unknown status, malformed cursor or since.
+    """
+    if status not in CONSULTATION_STATUSES:
+        raise ValueError(f"Invalid status. Use one of: {', '.join(CONSULTATION_STATUSES)}")
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    clauses = ["status = ?"]
+    params = [status]
+
+    since = normalize_since(since)
+    if since:
+        clauses.append("created_at >= ?")
+        params.append(since)
+
+    if cursor:
+        created_at, consult_id = decode_cursor(cursor)
+        # Row-value comparison lets SQLite seek straight into the index
+        clauses.append("(created_at, id) < (?, ?)")
+        params.extend([created_at, consult_id])
+
+    # Fetch one extra row to know whether another page exists
+    where = " AND ".join(clauses)
+    if status in ARCHIVED_STATUSES:
+        # Each tier is read through its own index, then the two sorted runs are merged
+        rows = conn.execute(f"""
+            SELECT * FROM (
+                SELECT {CONSULTATION_COLUMNS} FROM consultations
+                WHERE {where} ORDER BY created_at DESC, id DESC LIMIT ?
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT {CONSULTATION_COLUMNS} FROM consultations_archive
+                WHERE {where} ORDER BY created_at DESC, id DESC LIMIT ?
+            )
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        """, params + [limit + 1] + params + [limit + 1, limit + 1]).fetchall()
+    else:
+        rows = conn.execute(f"""
+            SELECT {CONSULTATION_COLUMNS} FROM consultations
+            WHERE {where}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        """, params + [limit + 1]).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+
+    return rows, next_cursor
+
+
+def get_consultation(conn, consult_id):
+    """Look up a consultation by id in the hot table, falling back to the archive"""
+    row = conn.execute(
+        f"SELECT {CONSULTATION_COLUMNS} FROM consultations WHERE id = ?", (consult_id,)
+    ).fetchone()
+    if row is None:
+        row = conn.execute(
+            f"SELECT {CONSULTATION_COLUMNS} FROM consultations_archive WHERE id = ?", (consult_id,)
+        ).fetchone()
+    return row
+
+
+def search_consultations(conn, text, limit=20, offset=0):
+    """
+    Ranked full-text search across both tiers.
+
+    Both tiers share one FTS5 index (migration 7), so bm25 scores are
+    computed against the same corpus statistics and can be ordered
+    together; with an index per tier, a growing archive would shift every
+    archived score relative to the active ones. Ranking runs over rowids
+    and scores only; rows and snippets are then fetched for the requested
+    page alone, so snippet() cost does not grow with the number of
+    matches. Returns (results, has_more).
+    """
+    match = build_match_query(text)
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    offset = max(0, int(offset))
+
+    ranked = conn.execute(f"""
+        SELECT rowid, tier, bm25({SEARCH_INDEX}) AS score FROM {SEARCH_INDEX}
+        WHERE {SEARCH_INDEX} MATCH ?
+        ORDER BY score, rowid LIMIT ? OFFSET ?
+    """, [match, limit + 1, offset]).fetchall()
+
+    has_more = len(ranked) > limit
+    ranked = ranked[:limit]
+
+    details = {}
+    for tier, table, _ in SEARCH_TIERS:
+        rowids = [row[0] for row in ranked if row[1] == tier]
+        if not rowids:
+            continue
+        placeholders = ", ".join("?" for _ in rowids)
+        cursor = conn.execute(f"""
+            SELECT s.rowid AS rid,
+                   snippet({SEARCH_INDEX}, -1, '<mark>', '</mark>', '…', 16) AS snippet,
+                   {', '.join('c.' + column.strip() for column in CONSULTATION_COLUMNS.split(','))}
+            FROM {SEARCH_INDEX} s JOIN {table} c ON c.rowid = s.rowid / 2
+            WHERE {SEARCH_INDEX} MATCH ? AND s.rowid IN ({placeholders})
+        """, [match] + rowids)
+        names = [column[0] for column in cursor.description]
+        for values in cursor.fetchall():
+            row = dict(zip(names, values))
+            details[row.pop("rid")] = row
+
+    results = []
+    for rowid, tier, score in ranked:
+        row = details.get(rowid)
+        if row is None:
+            continue
+        result = dict(row)
+        result["tier"] = tier
+        result["score"] = round(-score, 4)
+        results.append(result)
+
+    return results, has_more
+
+
+def rebuild_search_index(conn):
+    """Reload the full-text index from both tiers (needed after VACUUM renumbers rowids)"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_INDEX,)
+    ).fetchone()
+    if exists:
+        fill_search_index(conn)
@@ -225,7 +225,7 @@ $ageDistributionData = getAgeDistribution($conn);
                         </a>
                     </li>
                      <li class="nav-item">
-                        <a class="nav-link" href="chatbot-demo.html">
+                        <a class="nav-link" href="static/chatbot-demo.html">
                             <i class="fas fa-chart-bar me-1"></i>chatbot
                         </a>
                     </li>
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Doctor access-key verification with an in-memory TTL cache
+
+verify_doctor_key in main.py used to open a connection and query doctors
+on every /doctor_review call. DoctorKeyCache keeps recent results, both
+valid keys (positive) and rejected keys (negative, shorter TTL), so a
+doctor working through the queue costs one lookup per TTL.
+
+Keys are cached and looked up by their SHA-256 digest, never in plain
+text, so the SQL equality only ever sees digests; the stored key is then
+compared with hmac.compare_digest. add_doctor() and rotate_doctor_key()
+invalidate the cache in this process; other processes pick up changes
+when their entries expire. A lookup that overlaps an invalidation is not
+cached, so a rotated key cannot be re-cached as valid.
+
+Configuration (environment variables):
+  DOCTOR_KEY_CACHE_TTL            seconds a valid key is trusted (default 60)
+  DOCTOR_KEY_CACHE_NEGATIVE_TTL   seconds a rejected key stays rejected (default 10)
+  DOCTOR_KEY_CACHE_SIZE           maximum cached keys (default 1024)
+
+Run:
+  python doctor_auth.py add --name "Dr. Smith" --email smith@example.com
+  python doctor_auth.py rotate --doctor-id 1
+"""
+
+import argparse
+import hmac
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from instrumentation import InstrumentedConnection, record_cache
+from migrations import access_key_digest
+
+DATABASE_URL = "chatbot.db"
+
+CACHE_TTL = float(os.getenv("DOCTOR_KEY_CACHE_TTL", "60"))
+NEGATIVE_TTL = float(os.getenv("DOCTOR_KEY_CACHE_NEGATIVE_TTL", "10"))
+CACHE_SIZE = int(os.getenv("DOCTOR_KEY_CACHE_SIZE", "1024"))
+
+
+class DoctorKeyCache:
+    def __init__(self, db_path=DATABASE_URL, ttl=CACHE_TTL, negative_ttl=NEGATIVE_TTL, max_size=CACHE_SIZE):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # digest -> (doctor_id or None, expires_at)
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped by every invalidation
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, access_key):
+        """Return the doctor id for access_key, or None if it is not valid"""
+        digest = access_key_digest(access_key)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                record_cache("doctor_key", True)
+                return entry[0]
+            self.misses += 1
+            generation = self._generation
+        record_cache("doctor_key", False)
+
+        doctor_id = self._lookup(access_key, digest)
+        expires_at = now + (self.ttl if doctor_id is not None else self.negative_ttl)
+
+        with self._lock:
+            if generation != self._generation:
+                # Invalidated while we were reading; the result may already be stale
+                return doctor_id
+            self._entries[digest] = (doctor_id, expires_at)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        return doctor_id
+
+    def _lookup(self, access_key, digest):
+        conn = sqlite3.connect(self.db_path, factory=InstrumentedConnection)
+        try:
+            row = conn.execute(
+                "SELECT id, access_key FROM doctors WHERE access_key_digest = ?", (digest,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if row and hmac.compare_digest(row[1].encode(), access_key.encode()):
+            return row[0]
+        return None
+
+    def invalidate(self, access_key=None, doctor_id=None):
+        """Drop one key, every key of one doctor, or (no arguments) the whole cache"""
+        with self._lock:
+            self._generation += 1
+            if access_key is None and doctor_id is None:
+                self._entries.clear()
+                return
+            if access_key is not None:
+                self._entries.pop(access_key_digest(access_key), None)
+            if doctor_id is not None:
+                for digest in [d for d, (cached_id, _) in self._entries.items() if cached_id == doctor_id]:
+                    del self._entries[digest]
+
+    def invalidate_negative(self):
+        """Forget rejected keys, e.g. after a doctor has been added"""
+        with self._lock:
+            self._generation += 1
+            for digest in [d for d, (cached_id, _) in self._entries.items() if cached_id is None]:
+                del self._entries[digest]
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+# Process-wide cache used by the servers
+doctor_key_cache = DoctorKeyCache()
+
+
+def add_doctor(conn, name, email, access_key=None, cache=doctor_key_cache):
+    """Create a doctor account; returns (doctor_id, access_key)"""
+    access_key = access_key or secrets.token_urlsafe(24)
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO doctors (name, email, access_key, access_key_digest)
+        VALUES (?, ?, ?, ?)
+    """, (name, email, access_key, access_key_digest(access_key)))
+    conn.commit()
+    # The new key may have been rejected (and negatively cached) moments ago
+    cache.invalidate_negative()
+    return cursor.lastrowid, access_key
+
+
+def rotate_doctor_key(conn, doctor_id, new_key=None, cache=doctor_key_cache):
+    """Replace a doctor's access key; the old key stops working immediately in this process"""
+    new_key = new_key or secrets.token_urlsafe(24)
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE doctors SET access_key = ?, access_key_digest = ? WHERE id = ?",
+        (new_key, access_key_digest(new_key), doctor_id)
+    )
+    if cursor.rowcount == 0:
+        raise ValueError(f"Doctor {doctor_id} not found")
+    conn.commit()
+    cache.invalidate(doctor_id=doctor_id)
+    cache.invalidate_negative()
+    return new_key
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage doctor access keys")
+    parser.add_argument("--db", default=DATABASE_URL)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="create a doctor with a generated access key")
+    add.add_argument("--name", required=True)
+    add.add_argument("--email", required=True)
+
+    rotate = commands.add_parser("rotate", help="issue a new access key for a doctor")
+    rotate.add_argument("--doctor-id", type=int, required=True)
+
+    args = parser.parse_args()
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "add":
+            doctor_id, access_key = add_doctor(conn, args.name, args.email)
+            print(f"✅ Doctor {doctor_id} created. Access key: {access_key}")
+        else:
+            access_key = rotate_doctor_key(conn, args.doctor_id)
+            print(f"✅ Doctor {args.doctor_id} key rotated. New access key: {access_key}")
+        print(f"ℹ️ Running servers pick this up within {CACHE_TTL:.0f}s (cache TTL)")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
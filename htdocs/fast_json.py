@@ -0,0 +1,64 @@
+"""
+Fast JSON encoding for list endpoints
+
+Rows read from chatbot.db are already trusted and correctly typed, so list
+endpoints serialize them straight to bytes instead of building one
+Pydantic model per row and validating it again on the way out.
+
+rows_to_json() reads the column names once and fills a per-call object
+template with each row's encoded values, so no dict is built per row.
+The exception is orjson, used when it is installed: it serializes a list
+of dicts in C faster than Python can fill the template one value at a
+time, so that path still zips each row into a dict.
+"""
+
+import json
+from json.encoder import encode_basestring
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps(obj):
+    """Serialize obj to UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return _encoder.encode(obj).encode("utf-8")
+
+
+def rows_to_dicts(rows, columns=None):
+    """Convert sqlite3.Row objects (or plain tuples with columns) to dicts"""
+    if not rows:
+        return []
+    if columns is None:
+        columns = rows[0].keys()
+    return [dict(zip(columns, row)) for row in rows]
+
+
+_SCALARS = {
+    str: encode_basestring,
+    int: int.__repr__,
+    type(None): lambda value: "null",
+}
+
+
+def _value(value):
+    return _SCALARS.get(type(value), _encoder.encode)(value)
+
+
+def rows_to_json(rows, columns=None):
+    """Serialize database rows directly to a JSON array of objects"""
+    if orjson is not None:
+        return orjson.dumps(rows_to_dicts(rows, columns))
+    if not rows:
+        return b"[]"
+    if columns is None:
+        columns = rows[0].keys()
+    # '{"id":%s,"status":%s,...}', built once for the whole result
+    template = "{" + ",".join(encode_basestring(column).replace("%", "%%") + ":%s" for column in columns) + "}"
+    body = ",".join(template % tuple(map(_value, row)) for row in rows)
+    return ("[" + body + "]").encode("utf-8")
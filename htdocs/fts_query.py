@@ -0,0 +1,27 @@
+"""
+SQLite FTS5 query building shared by consultation_queue.py and profile_store.py
+
+User text is never passed to MATCH as-is: FTS5 query syntax (quotes,
+NEAR, column filters, bare operators) would either raise or change the
+meaning of the search.
+"""
+
+import re
+
+SEARCH_TERM = re.compile(r"\w+\*?", re.UNICODE)
+
+
+def build_match_query(text):
+    """
+    Turn free text into a safe FTS5 query: every word must match, and a
+    trailing '*' keeps prefix search (e.g. 'diab*').
+    """
+    terms = []
+    for term in SEARCH_TERM.findall(text or ""):
+        prefix = term.endswith("*")
+        word = term.rstrip("*")
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    if not terms:
+        raise ValueError("Search query must contain at least one word")
+    return " ".join(terms)
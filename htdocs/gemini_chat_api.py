@@ -4,18 +4,29 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+from instrumentation import LLM_CALL, instrument_flask
+from stub_backends import StubGenerativeModel
+
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
 
+# Per-route latency histograms and /metrics (Prometheus text format)
+instrument_flask(app)
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
-if not GEMINI_API_KEY:
-    raise RuntimeError("GEMINI_API_KEY not set in environment.")
+# LLM_BACKEND=stub answers offline with canned replies (load tests)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
 
-genai.configure(api_key=GEMINI_API_KEY)
+if LLM_BACKEND == "stub":
+    MODEL_NAME = "stub"
+elif not GEMINI_API_KEY:
+    raise RuntimeError("GEMINI_API_KEY not set in environment.")
+else:
+    genai.configure(api_key=GEMINI_API_KEY)
 
 DEFAULT_SYSTEM_PROMPT = (
     "You are a helpful, concise health assistant. Provide friendly, short answers. "
@@ -36,7 +47,7 @@ def gemini_chat():
         return jsonify({"error": "messages array required"}), 400
 
     try:
-        model = genai.GenerativeModel(MODEL_NAME)
+        model = StubGenerativeModel(MODEL_NAME) if LLM_BACKEND == "stub" else genai.GenerativeModel(MODEL_NAME)
 
         # Convert OpenAI-style messages to Gemini parts
         parts = []
@@ -47,7 +58,8 @@ def gemini_chat():
             content = m.get("content", "")
             parts.append({"role": role, "content": content})
 
-        resp = model.generate_content(parts)
+        with LLM_CALL.time(model=MODEL_NAME):
+            resp = model.generate_content(parts)
         text = getattr(resp, "text", None) or (resp.candidates[0].content.parts[0].text if getattr(resp, "candidates", None) else "")
 
         return jsonify({
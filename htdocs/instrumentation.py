@@ -0,0 +1,331 @@
+"""
+Shared instrumentation for the chatbot services
+
+A small, dependency-free metrics registry (counters, gauges, histograms)
+rendered in the Prometheus text exposition format on /metrics. Used by
+main.py, simple_server.py, rag_vector_api.py and gemini_chat_api.py.
+
+Recorded series:
+  http_request_duration_seconds{method,route,status}   per-route latency
+  embedding_encode_seconds{operation}                   SentenceTransformer.encode
+  chroma_query_seconds{collection,operation}            Chroma queries and writes
+  sqlite_query_seconds{operation}                       statements by leading keyword
+  sqlite_commit_seconds                                 commit (fsync) time
+  llm_call_seconds{model}                               LLM round trips
+  llm_first_token_seconds{model}                        time to the first streamed token
+  cache_requests_total{cache,result}                    cache hits and misses
+  cache_hit_ratio{cache}                                derived from the counter above
+
+Metrics are per process; with several workers, scrape each one.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+FIRST_TOKEN_BUCKETS = (0.05, 0.1, 0.2, 0.35, 0.5, 0.75, 1.0, 1.5, 2.0, 4.0, 8.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Gauge whose series are either set directly or produced by a callback at render time"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        if self.callback is not None:
+            for labels, value in self.callback():
+                self.set(value, **labels)
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_series(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        inf = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, inf)} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=(), callback=None):
+    return REGISTRY.register(Gauge(name, documentation, labelnames, callback))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def render_metrics():
+    """Return the text exposition of every registered metric as bytes"""
+    return REGISTRY.render()
+
+
+# Metrics shared across services
+
+REQUEST_DURATION = histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"]
+)
+EMBEDDING_ENCODE = histogram(
+    "embedding_encode_seconds", "Time spent in SentenceTransformer.encode", ["operation"]
+)
+CHROMA_QUERY = histogram(
+    "chroma_query_seconds", "Time spent in Chroma collection calls", ["collection", "operation"]
+)
+SQLITE_QUERY = histogram(
+    "sqlite_query_seconds", "SQLite statement execution time by leading keyword", ["operation"]
+)
+SQLITE_COMMIT = histogram(
+    "sqlite_commit_seconds", "SQLite commit time (includes fsync)"
+)
+LLM_CALL = histogram(
+    "llm_call_seconds", "LLM request latency", ["model"], buckets=LLM_BUCKETS
+)
+LLM_FIRST_TOKEN = histogram(
+    "llm_first_token_seconds", "Time to the first streamed token", ["model"], buckets=FIRST_TOKEN_BUCKETS
+)
+CACHE_REQUESTS = counter(
+    "cache_requests_total", "Cache lookups by result", ["cache", "result"]
+)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def _cache_hit_ratios():
+    with CACHE_REQUESTS._lock:
+        values = dict(CACHE_REQUESTS._values)
+    caches = {cache for cache, _ in values}
+    for cache in sorted(caches):
+        hits = values.get((cache, "hit"), 0)
+        total = hits + values.get((cache, "miss"), 0)
+        yield {"cache": cache}, (hits / total if total else 0.0)
+
+
+CACHE_HIT_RATIO = gauge(
+    "cache_hit_ratio", "Share of cache lookups served from cache", ["cache"], callback=_cache_hit_ratios
+)
+
+
+# SQLite instrumentation: sqlite3.connect(path, factory=InstrumentedConnection)
+
+_SQL_KEYWORD = re.compile(r"^\s*(\w+)")
+
+
+def _operation(sql):
+    match = _SQL_KEYWORD.match(sql)
+    return match.group(1).upper() if match else "OTHER"
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        with SQLITE_QUERY.time(operation=_operation(sql)):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        with SQLITE_QUERY.time(operation=_operation(sql)):
+            return super().executemany(sql, seq_of_parameters)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        with SQLITE_COMMIT.time():
+            return super().commit()
+
+
+# Framework integration
+
+def instrument_fastapi(app):
+    """Add per-route timing middleware and a /metrics endpoint to a FastAPI app"""
+    from fastapi import Request, Response
+
+    @app.middleware("http")
+    async def record_request_duration(request: Request, call_next):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=request.method,
+                route=getattr(route, "path", "unmatched"),
+                status=status
+            )
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+
+def instrument_flask(app):
+    """Add per-route timing hooks and a /metrics endpoint to a Flask app"""
+    from flask import Response, g, request
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_duration(response):
+        started = getattr(g, "request_started", None)
+        if started is not None:
+            REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                method=request.method,
+                route=request.url_rule.rule if request.url_rule else "unmatched",
+                status=response.status_code
+            )
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(render_metrics(), mimetype=CONTENT_TYPE)
@@ -5,14 +5,130 @@ Run:
   python interactive_cli.py
 
 Then type your symptoms. Type 'exit' to quit.
+
+Batch mode reads one case per line from a file or stdin (plain text, or a
+JSON object with "symptoms" and an optional "id"), answers them
+concurrently and writes one JSON result per line, in input order:
+  python interactive_cli.py --batch cases.txt --workers 16 --output results.jsonl
+  cat cases.jsonl | python interactive_cli.py > results.jsonl
+
+Configuration (environment variables):
+  OTC_BATCH_WORKERS   concurrent requests in batch mode (default 8)
 """
 
 from __future__ import annotations
 
-from medical_assistant_agent import generate_otc_advice
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Iterator
+
+from medical_assistant_agent import AdviceError, generate_otc_advice
+
+BATCH_WORKERS = int(os.getenv("OTC_BATCH_WORKERS", "8"))
+IN_FLIGHT_PER_WORKER = 4  # read-ahead bound, so memory stays flat on huge inputs
+
+
+def iter_cases(lines: IO[str]) -> Iterator[dict]:
+    """Yield {"id", "symptoms"} per non-empty line without reading the whole input"""
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        case = {"id": line_number, "symptoms": line}
+        if line.startswith("{"):
+            try:
+                record = json.loads(line)
+                case = {"id": record.get("id", line_number), "symptoms": str(record.get("symptoms", ""))}
+            except ValueError:
+                pass  # not JSON after all, keep the raw text
+        yield case
+
+
+def answer_case(case: dict, use_cache: bool) -> dict:
+    """One result line: the case, the advice or error, and its latency"""
+    start = time.perf_counter()
+    result = {"id": case["id"], "symptoms": case["symptoms"]}
+    try:
+        if not case["symptoms"].strip():
+            raise AdviceError("No symptoms given")
+        result["advice"] = generate_otc_advice(case["symptoms"], use_cache=use_cache, raise_errors=True)
+    except Exception as e:
+        result["error"] = str(e)
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def run_batch(lines: IO[str], out: IO[str], workers: int = BATCH_WORKERS, use_cache: bool = True) -> dict:
+    """Answer every case with a bounded worker pool, writing JSONL as results arrive in order"""
+    start = time.perf_counter()
+    done = failed = 0
+    latencies = []
+    pending: deque = deque()
+    limit = max(1, workers) * IN_FLIGHT_PER_WORKER
+
+    def flush(block: bool) -> None:
+        nonlocal done, failed
+        while pending and (block or pending[0].done()):
+            result = pending.popleft().result()
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            done += 1
+            failed += "error" in result
+            latencies.append(result["latency_ms"])
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for case in iter_cases(lines):
+            pending.append(pool.submit(answer_case, case, use_cache))
+            flush(block=False)
+            while len(pending) >= limit:
+                pending[0].result()
+                flush(block=False)
+        flush(block=True)
+    out.flush()
+
+    latencies.sort()
+    seconds = time.perf_counter() - start
+    return {
+        "cases": done,
+        "failed": failed,
+        "seconds": round(seconds, 2),
+        "per_second": round(done / seconds, 1) if seconds else 0,
+        "p50_ms": latencies[len(latencies) // 2] if latencies else 0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] if latencies else 0
+    }
+
+
+def batch_main(args: argparse.Namespace) -> None:
+    source = sys.stdin if args.batch in (None, "-") else open(args.batch, encoding="utf-8")
+    out = sys.stdout if args.output in (None, "-") else open(args.output, "w", encoding="utf-8")
+    try:
+        summary = run_batch(source, out, args.workers, use_cache=not args.no_cache)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    print(f"✅ {summary['cases']} cases ({summary['failed']} failed) in {summary['seconds']}s, "
+          f"{summary['per_second']}/s, p50 {summary['p50_ms']}ms, p95 {summary['p95_ms']}ms", file=sys.stderr)
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Medical Assistant (Informational Only)")
+    parser.add_argument("--batch", nargs="?", const="-", metavar="PATH",
+                        help="answer cases from a file ('-' or piped stdin) instead of prompting")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="concurrent requests in batch mode")
+    parser.add_argument("--output", metavar="PATH", help="JSONL results file (default: stdout)")
+    parser.add_argument("--no-cache", action="store_true", help="always ask the model (regression runs)")
+    args = parser.parse_args()
+
+    if args.batch is not None or not sys.stdin.isatty():
+        batch_main(args)
+        return
+
     print("Medical Assistant (Informational Only)")
     print("Type your symptoms and press Enter. Type 'exit' to quit.\n")
     while True:
@@ -0,0 +1,564 @@
+#!/usr/bin/env python3
+"""
+Load-testing and benchmark harness for the chatbot services
+
+Runs a scripted workload against main.py, simple_server.py,
+rag_vector_api.py or gemini_chat_api.py with a fixed number of concurrent
+clients for a fixed duration, then reports per-operation latency
+percentiles, throughput, error rate and server RSS. Results are written
+as JSON so runs from different commits can be compared.
+
+By default the server is started in a fresh temporary directory (empty
+chatbot.db and Chroma store) with stub model backends
+(EMBEDDING_BACKEND=stub, LLM_BACKEND=stub), so everything runs offline.
+Use --url to test a server that is already running instead.
+
+Workloads:
+  smoke              one request per endpoint, like the old test_server.py (main, simple)
+  chat_burst         POST /chat only (main, simple)
+  doctor_review_mix  list recent 60%, chat 25%, doctor review 15% (main, simple)
+  rag_queries        generate RAG response 70%, search knowledge 30% (rag)
+  bulk_ingest        POST /api/batch-add-knowledge, 32 items per request (rag)
+  llm_chat           POST /api/gemini-chat (gemini)
+
+Run:
+  python load_test.py --target main --workload chat_burst --concurrency 16 --duration 20
+  python load_test.py --target rag --workload rag_queries --output results/rag.json
+  python load_test.py --target simple --workload doctor_review_mix --compare results/baseline.json
+  python load_test.py --target main --workload chat_burst --server-env CONSULTATION_WRITE_MODE=sync
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlparse
+
+HTDOCS = os.path.dirname(os.path.abspath(__file__))
+
+SERVERS = {
+    "main": {
+        "command": "import main, uvicorn; main.init_db(); "
+                   "uvicorn.run(main.app, host='127.0.0.1', port={port}, log_level='warning')",
+        "health": "/health"
+    },
+    "simple": {
+        "command": "import simple_server as s; s.PORT = {port}; s.main()",
+        "health": "/health"
+    },
+    "rag": {
+        "command": "import rag_vector_api as r; r.app.run(host='127.0.0.1', port={port}, threaded=True)",
+        "health": "/api/health"
+    },
+    "gemini": {
+        "command": "import gemini_chat_api as g; g.app.run(host='127.0.0.1', port={port}, threaded=True)",
+        "health": "/api/health"
+    }
+}
+
+SYMPTOMS = [
+    "I have fever and cough since yesterday",
+    "Mild headache and a runny nose",
+    "When should I get my flu vaccine?",
+    "Sore throat and tiredness for three days",
+    "Stomach ache after eating",
+    "I have a cold and feel dizzy",
+    "Is the covid booster safe for children?",
+    "Back pain after lifting something heavy"
+]
+
+KNOWLEDGE = [
+    "Fever above 39C lasting more than three days needs a medical check-up.",
+    "Paracetamol can relieve fever and mild pain; follow the dose on the pack.",
+    "Annual flu vaccination is recommended for older adults and high-risk groups.",
+    "Dehydration signs include dark urine, dizziness and a dry mouth.",
+    "Seek urgent care for chest pain, difficulty breathing or confusion.",
+    "A sore throat is usually viral and improves within a week.",
+    "Wash hands with soap for twenty seconds to prevent infections.",
+    "Children need age-appropriate doses of fever medicine."
+]
+
+
+# Operations: each returns (name, method, path, body, headers)
+
+def op_health(state):
+    return "health", "GET", "/health", None, None
+
+
+def op_chat(state):
+    return "chat", "POST", "/chat", {"message": random.choice(SYMPTOMS), "user_id": random.randint(1, 500)}, None
+
+
+def op_list_recent(state):
+    return "list_recent", "GET", "/_list_recent?limit=50", None, None
+
+
+def op_review(state):
+    try:
+        consult_id = state["pending"].popleft()
+    except IndexError:
+        return op_chat(state)
+    body = {
+        "consult_id": consult_id,
+        "action": "approve",
+        "doctor_name": "Dr. Load",
+        "doctor_note": None
+    }
+    return "doctor_review", "POST", "/doctor_review", body, {"X-Doctor-Key": state["doctor_key"]}
+
+
+def op_rag(state):
+    return "rag_response", "POST", "/api/generate-rag-response", {"query": random.choice(SYMPTOMS)}, None
+
+
+def op_search_knowledge(state):
+    return "search_knowledge", "POST", "/api/search-knowledge", {"query": random.choice(SYMPTOMS), "k": 3}, None
+
+
+def op_batch_add(state):
+    items = [{"text": random.choice(KNOWLEDGE), "metadata": {"source": "load_test"}} for _ in range(32)]
+    return "batch_add", "POST", "/api/batch-add-knowledge", {"items": items}, None
+
+
+def op_gemini_chat(state):
+    body = {"messages": [{"role": "user", "content": random.choice(SYMPTOMS)}]}
+    return "gemini_chat", "POST", "/api/gemini-chat", body, None
+
+
+def seed_knowledge(client, state):
+    items = [{"text": text, "metadata": {"source": "load_test"}} for text in KNOWLEDGE]
+    client.request("POST", "/api/batch-add-knowledge", {"items": items})
+
+
+WORKLOADS = {
+    "smoke": {"targets": ("main", "simple"), "ops": [op_health, op_chat, op_list_recent], "sequential": True},
+    "chat_burst": {"targets": ("main", "simple"), "ops": [(1.0, op_chat)]},
+    "doctor_review_mix": {"targets": ("main", "simple"), "ops": [(0.6, op_list_recent), (0.25, op_chat), (0.15, op_review)]},
+    "rag_queries": {"targets": ("rag",), "ops": [(0.7, op_rag), (0.3, op_search_knowledge)], "setup": seed_knowledge},
+    "bulk_ingest": {"targets": ("rag",), "ops": [(1.0, op_batch_add)]},
+    "llm_chat": {"targets": ("gemini",), "ops": [(1.0, op_gemini_chat)]}
+}
+
+
+class Client:
+    """One keep-alive HTTP connection per worker; reconnects when the server closes it"""
+
+    def __init__(self, host, port, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.conn = None
+        self.reused = False
+
+    def request(self, method, path, body=None, headers=None):
+        payload = json.dumps(body).encode() if body is not None else None
+        send_headers = {"Content-Type": "application/json"} if payload is not None else {}
+        send_headers.update(headers or {})
+
+        while True:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                self.reused = False
+            try:
+                self.conn.request(method, path, body=payload, headers=send_headers)
+                response = self.conn.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                was_reused = self.reused
+                self.close()
+                if was_reused:
+                    continue  # a stale keep-alive connection, not a server error
+                raise
+            if response.will_close:
+                self.close()
+            else:
+                self.reused = True
+            return response.status, data
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, status=None, error=None):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(seconds)
+            if error is not None:
+                self.errors.setdefault(name, {})
+                self.errors[name][error] = self.errors[name].get(error, 0) + 1
+            else:
+                self.statuses.setdefault(name, {})
+                self.statuses[name][status] = self.statuses[name].get(status, 0) + 1
+
+
+class RssSampler(threading.Thread):
+    """Samples a process's resident set size from /proc (Linux only)"""
+
+    def __init__(self, pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def read_kb(self):
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            return None
+        return None
+
+    def run(self):
+        while not self._stop_event.is_set():
+            kb = self.read_kb()
+            if kb is not None:
+                self.samples.append(kb)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        if not self.samples:
+            return None
+        return {"start_kb": self.samples[0], "peak_kb": max(self.samples), "end_kb": self.samples[-1]}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, statuses, errors, elapsed):
+    values = sorted(latencies)
+    ok = sum(count for status, count in statuses.items() if status < 400)
+    failed = sum(count for status, count in statuses.items() if status >= 400) + sum(errors.values())
+    total = len(values)
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "ok": ok,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "errors": errors,
+        "latency_ms": {
+            "mean": ms(sum(values) / total) if total else None,
+            "p50": ms(percentile(values, 0.50)),
+            "p90": ms(percentile(values, 0.90)),
+            "p95": ms(percentile(values, 0.95)),
+            "p99": ms(percentile(values, 0.99)),
+            "max": ms(values[-1]) if values else None
+        }
+    }
+
+
+def pick(ops):
+    r = random.random() * sum(weight for weight, _ in ops)
+    for weight, op in ops:
+        r -= weight
+        if r <= 0:
+            return op
+    return ops[-1][1]
+
+
+def run_one(client, op, state, recorder):
+    name, method, path, body, headers = op(state)
+    start = time.perf_counter()
+    try:
+        status, data = client.request(method, path, body, headers)
+    except (OSError, http.client.HTTPException) as e:
+        recorder.record(name, time.perf_counter() - start, error=type(e).__name__)
+        return
+    recorder.record(name, time.perf_counter() - start, status=status)
+
+    if name == "chat" and status == 200:
+        try:
+            consult_id = json.loads(data).get("consultation_id")
+        except ValueError:
+            consult_id = None
+        if consult_id:
+            state["pending"].append(consult_id)
+
+
+def worker(host, port, workload, state, recorder, deadline, warmup_until, max_requests, counter):
+    client = Client(host, port)
+    warm = Recorder()
+    try:
+        while time.perf_counter() < deadline:
+            with counter["lock"]:
+                if max_requests and counter["sent"] >= max_requests:
+                    return
+                counter["sent"] += 1
+            target = warm if time.perf_counter() < warmup_until else recorder
+            run_one(client, pick(workload["ops"]), state, target)
+    finally:
+        client.close()
+
+
+def run_workload(host, port, workload_name, concurrency, duration, warmup=0.0, max_requests=0,
+                 doctor_key="doctor123"):
+    workload = WORKLOADS[workload_name]
+    state = {"pending": deque(maxlen=10000), "doctor_key": doctor_key}
+    recorder = Recorder()
+
+    if workload.get("setup"):
+        setup_client = Client(host, port)
+        workload["setup"](setup_client, state)
+        setup_client.close()
+
+    if workload.get("sequential"):
+        client = Client(host, port)
+        start = time.perf_counter()
+        for op in workload["ops"]:
+            run_one(client, op, state, recorder)
+        client.close()
+        return recorder, time.perf_counter() - start
+
+    counter = {"sent": 0, "lock": threading.Lock()}
+    start = time.perf_counter()
+    warmup_until = start + warmup
+    deadline = warmup_until + duration
+    threads = [
+        threading.Thread(target=worker, args=(host, port, workload, state, recorder, deadline,
+                                              warmup_until, max_requests, counter))
+        for _ in range(concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorder, time.perf_counter() - warmup_until
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(target, port, workdir, extra_env):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = HTDOCS + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("EMBEDDING_BACKEND", "stub")
+    env.setdefault("LLM_BACKEND", "stub")
+    env.update(extra_env)
+    log = open(os.path.join(workdir, "server.log"), "wb")
+    command = SERVERS[target]["command"].format(port=port)
+    return subprocess.Popen([sys.executable, "-c", command], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(host, port, path, process, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request("GET", path)
+            if conn.getresponse().status == 200:
+                conn.close()
+                return True
+            conn.close()
+        except OSError:
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def stop_server(process):
+    if process.poll() is None:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HTDOCS, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_report(results):
+    print(f"{'operation':<18}{'requests':>10}{'rps':>10}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    print("-" * 77)
+    for name, r in list(results["operations"].items()) + [("ALL", results["overall"])]:
+        lat = r["latency_ms"]
+        fmt = lambda v: f"{v:>10.2f}" if v is not None else f"{'-':>10}"
+        print(f"{name:<18}{r['requests']:>10}{r['throughput_rps']:>10.1f}{r['error_rate']:>9.2%}"
+              f"{fmt(lat['p50'])}{fmt(lat['p95'])}{fmt(lat['p99'])}")
+    if results.get("rss"):
+        rss = results["rss"]
+        print(f"\n🧠 Server RSS: start {rss['start_kb'] / 1024:.1f} MB, peak {rss['peak_kb'] / 1024:.1f} MB, "
+              f"end {rss['end_kb'] / 1024:.1f} MB")
+
+
+def print_comparison(results, baseline):
+    print(f"\n📊 Compared with {baseline['meta'].get('commit') or 'baseline'} "
+          f"({baseline['meta'].get('timestamp', '?')})")
+    print(f"{'operation':<18}{'p50':>18}{'p95':>18}{'rps':>18}")
+    print("-" * 72)
+
+    def delta(new, old, lower_is_better=True):
+        if new is None or old in (None, 0):
+            return f"{'-':>18}"
+        change = (new - old) / old * 100
+        mark = "✅" if (change < 0) == lower_is_better else "⚠️"
+        return f"{new:>9.2f} {change:+6.1f}% {mark}"
+
+    pairs = list(results["operations"].items()) + [("ALL", results["overall"])]
+    for name, r in pairs:
+        old = baseline["operations"].get(name) if name != "ALL" else baseline.get("overall")
+        if not old:
+            continue
+        print(f"{name:<18}"
+              f"{delta(r['latency_ms']['p50'], old['latency_ms']['p50'])}"
+              f"{delta(r['latency_ms']['p95'], old['latency_ms']['p95'])}"
+              f"{delta(r['throughput_rps'], old['throughput_rps'], lower_is_better=False)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the chatbot services")
+    parser.add_argument("--target", choices=sorted(SERVERS), default="main")
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="chat_burst")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds excluded from the results")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = no cap)")
+    parser.add_argument("--url", help="test an already running server instead of spawning one")
+    parser.add_argument("--doctor-key", default="doctor123")
+    parser.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the spawned server (repeatable)")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--keep-data", action="store_true", help="keep the spawned server's temp directory")
+    args = parser.parse_args()
+
+    workload = WORKLOADS[args.workload]
+    if args.target not in workload["targets"]:
+        parser.error(f"workload {args.workload} runs against: {', '.join(workload['targets'])}")
+    random.seed(args.seed)
+
+    print(f"🏋️ Load test: {args.workload} against {args.target}")
+    print("=" * 60)
+
+    process = None
+    workdir = None
+    sampler = None
+    if args.url:
+        parsed = urlparse(args.url)
+        host, port = parsed.hostname, parsed.port or 80
+    else:
+        host, port = "127.0.0.1", free_port()
+        workdir = tempfile.mkdtemp(prefix=f"loadtest-{args.target}-")
+        extra_env = dict(item.split("=", 1) for item in args.server_env)
+        print(f"🚀 Starting {args.target} on port {port} (data in {workdir})")
+        process = spawn_server(args.target, port, workdir, extra_env)
+
+    try:
+        if not wait_ready(host, port, SERVERS[args.target]["health"], process, args.startup_timeout):
+            print("❌ Server did not become ready")
+            if workdir:
+                print(f"   See {os.path.join(workdir, 'server.log')}")
+            sys.exit(1)
+
+        if process is not None:
+            sampler = RssSampler(process.pid)
+            sampler.start()
+
+        if workload.get("sequential"):
+            print("⏱️ One request per operation")
+        else:
+            print(f"⏱️ {args.concurrency} clients, {args.warmup}s warm-up + {args.duration}s measured")
+        recorder, elapsed = run_workload(host, port, args.workload, args.concurrency, args.duration,
+                                         args.warmup, args.requests, args.doctor_key)
+        rss = sampler.stop() if sampler else None
+    finally:
+        if process is not None:
+            stop_server(process)
+        if workdir and not args.keep_data:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    all_latencies = [v for values in recorder.latencies.values() for v in values]
+    all_statuses = {}
+    for statuses in recorder.statuses.values():
+        for status, count in statuses.items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+    all_errors = {}
+    for errors in recorder.errors.values():
+        for error, count in errors.items():
+            all_errors[error] = all_errors.get(error, 0) + count
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": git_commit(),
+            "target": args.target,
+            "workload": args.workload,
+            "concurrency": args.concurrency,
+            "duration_s": round(elapsed, 3),
+            "warmup_s": args.warmup,
+            "server_env": args.server_env,
+            "spawned": process is not None,
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        },
+        "operations": {
+            name: summarize(recorder.latencies[name], recorder.statuses.get(name, {}),
+                            recorder.errors.get(name, {}), elapsed)
+            for name in sorted(recorder.latencies)
+        },
+        "overall": summarize(all_latencies, all_statuses, all_errors, elapsed),
+        "rss": rss
+    }
+
+    print()
+    print_report(results)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    if results["overall"]["error_rate"] > 0:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
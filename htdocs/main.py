@@ -1,15 +1,26 @@
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, List
 import sqlite3
-import hashlib
 import secrets
 from datetime import datetime
 import uvicorn
 import os
 
+from consultation_queue import list_consultations, get_consultation, search_consultations, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from migrations import migrate, seed_default_doctor
+from retention import start_retention_worker, table_stats
+from write_behind import ConsultationWriter
+from doctor_auth import doctor_key_cache
+from password_hashing import hash_password_async, verify_password_async
+from fast_json import rows_to_json
+from static_assets import StaticAssets
+from instrumentation import InstrumentedConnection, instrument_fastapi
+from profiling import profile_fastapi
+
 # Initialize FastAPI app
 app = FastAPI(
     title="AI Health Chatbot API",
@@ -24,69 +35,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Per-route latency histograms and /metrics (Prometheus text format)
+instrument_fastapi(app)
+
+# Opt-in cProfile capture (PROFILE_SAMPLE_RATE or X-Profile: <PROFILE_TOKEN>)
+profile_fastapi(app)
+
 # Database setup
 DATABASE_URL = "chatbot.db"
 
 def get_db():
-    conn = sqlite3.connect(DATABASE_URL)
+    conn = sqlite3.connect(DATABASE_URL, factory=InstrumentedConnection)
     conn.row_factory = sqlite3.Row
     return conn
 
 def init_db():
     """Initialize database with required tables"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Create consultations table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS consultations (
-            id TEXT PRIMARY KEY,
-            patient_name TEXT NOT NULL,
-            symptoms TEXT NOT NULL,
-            chatbot_recommendation TEXT NOT NULL,
-            status TEXT DEFAULT 'pending',
-            doctor_name TEXT,
-            doctor_note TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create doctors table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS doctors (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            access_key TEXT UNIQUE NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create users table (for login/signup)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Insert default doctor if not exists
-    cursor.execute("SELECT COUNT(*) FROM doctors")
-    if cursor.fetchone()[0] == 0:
-        default_key = "doctor123"  # In production, use secure key generation
-        cursor.execute("""
-            INSERT INTO doctors (name, email, access_key) 
-            VALUES (?, ?, ?)
-        """, ("Dr. Admin", "admin@healthcare.com", default_key))
-    
-    conn.commit()
-    conn.close()
+    # Schema lives in migrations.py so existing databases pick up new versions
+    migrate(DATABASE_URL)
+    seed_default_doctor(DATABASE_URL)
 
 # Pydantic models
 class ConsultationCreate(BaseModel):
@@ -105,6 +75,18 @@ class ConsultationResponse(BaseModel):
     created_at: str
     updated_at: str
 
+class ConsultationSearchResult(ConsultationResponse):
+    tier: str  # "active" or "archived"
+    score: float
+    snippet: str
+
+class ConsultationSearchResponse(BaseModel):
+    query: str
+    results: List[ConsultationSearchResult]
+    limit: int
+    offset: int
+    next_offset: Optional[int] = None
+
 class DoctorReview(BaseModel):
     consult_id: str
     action: str  # "approve" or "modify"
@@ -133,16 +115,32 @@ def verify_doctor_key(x_doctor_key: str = Header(None)):
     if not x_doctor_key:
         raise HTTPException(status_code=401, detail="Doctor access key required")
     
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM doctors WHERE access_key = ?", (x_doctor_key,))
-    doctor = cursor.fetchone()
-    conn.close()
+    # Served from the in-memory cache; the doctors table is queried at most once per TTL
+    doctor_id = doctor_key_cache.verify(x_doctor_key)
     
-    if not doctor:
+    if doctor_id is None:
         raise HTTPException(status_code=401, detail="Invalid doctor access key")
     
-    return doctor[0]
+    return doctor_id
+
+# Background archiving of reviewed consultations
+retention_worker = None
+
+# Group-committed consultation inserts from /chat
+consultation_writer = ConsultationWriter(DATABASE_URL)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    global retention_worker
+    retention_worker = start_retention_worker(DATABASE_URL)
+    consultation_writer.start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    if retention_worker:
+        retention_worker.stop()
+    # Buffered consultations must reach disk before the process exits
+    consultation_writer.close()
 
 # Routes
 @app.get("/")
@@ -193,38 +191,92 @@ async def create_consultation(consultation: ConsultationCreate):
         conn.close()
 
 @app.get("/_list_recent", response_model=List[ConsultationResponse])
-async def list_recent_consultations():
-    """Get recent consultations for doctor review"""
+async def list_recent_consultations(
+    status: str = "pending",
+    since: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """Get recent consultations for doctor review (keyset paginated)"""
     conn = get_db()
-    cursor = conn.cursor()
     
-    cursor.execute("""
-        SELECT * FROM consultations 
-        WHERE status = 'pending' 
-        ORDER BY created_at DESC 
-        LIMIT 50
-    """)
+    try:
+        rows, next_cursor = list_consultations(conn, status=status, since=since, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        conn.close()
     
-    consultations = []
-    for row in cursor.fetchall():
-        consultations.append(ConsultationResponse(
-            id=row["id"],
-            patient_name=row["patient_name"],
-            symptoms=row["symptoms"],
-            chatbot_recommendation=row["chatbot_recommendation"],
-            status=row["status"],
-            doctor_name=row["doctor_name"],
-            doctor_note=row["doctor_note"],
-            created_at=row["created_at"],
-            updated_at=row["updated_at"]
-        ))
+    # Rows come straight from our own table, so skip per-row model validation
+    # and serialize them directly; response_model still documents the shape
+    response = Response(content=rows_to_json(rows), media_type="application/json")
     
-    conn.close()
-    return consultations
+    # The body stays a plain list for existing clients; the next page is advertised in a header
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    return response
+
+@app.get("/consultation/{consult_id}", response_model=ConsultationResponse)
+async def read_consultation(consult_id: str, doctor_id: int = Depends(verify_doctor_key)):
+    """Get a single consultation, whether still active or archived (doctors only)"""
+    if consultation_writer.is_pending(consult_id):
+        await run_in_threadpool(consultation_writer.ensure_written, consult_id)
+    
+    conn = get_db()
+    try:
+        row = get_consultation(conn, consult_id)
+    finally:
+        conn.close()
+    
+    if not row:
+        raise HTTPException(status_code=404, detail="Consultation not found")
+    
+    return ConsultationResponse(**dict(row))
+
+@app.get("/consultations/search", response_model=ConsultationSearchResponse)
+async def search_consultations_endpoint(
+    q: str,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    doctor_id: int = Depends(verify_doctor_key)
+):
+    """Full-text search over symptoms, recommendations and doctor notes"""
+    conn = get_db()
+    try:
+        results, has_more = search_consultations(conn, q, limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        conn.close()
+    
+    return ConsultationSearchResponse(
+        query=q,
+        results=results,
+        limit=limit,
+        offset=offset,
+        next_offset=offset + limit if has_more else None
+    )
+
+@app.get("/_storage_stats")
+async def storage_stats(doctor_id: int = Depends(verify_doctor_key)):
+    """Table sizes for the active and archived consultation tiers (doctors only)"""
+    conn = get_db()
+    try:
+        stats = table_stats(conn)
+    finally:
+        conn.close()
+    
+    stats["last_retention_run"] = retention_worker.last_run if retention_worker else None
+    return stats
 
 @app.post("/doctor_review")
 async def doctor_review(review: DoctorReview, doctor_id: int = Depends(verify_doctor_key)):
     """Doctor review of consultation"""
+    # A consultation created moments ago may still be in the write-behind buffer
+    if consultation_writer.is_pending(review.consult_id):
+        await run_in_threadpool(consultation_writer.ensure_written, review.consult_id)
+    
     conn = get_db()
     cursor = conn.cursor()
     
@@ -335,18 +387,13 @@ Please describe your symptoms or health concern, and I'll provide evidence-based
 
 ⚠️ Remember: I provide general information only. Always consult healthcare professionals for medical advice."""
 
-    # Create consultation record for doctor review
-    conn = get_db()
-    cursor = conn.cursor()
-    
+    # Create consultation record for doctor review (batched by the write-behind buffer)
     consult_id = secrets.token_urlsafe(16)
-    cursor.execute("""
-        INSERT INTO consultations (id, patient_name, symptoms, chatbot_recommendation)
-        VALUES (?, ?, ?, ?)
-    """, (consult_id, f"User_{message.user_id or 'Anonymous'}", message.message, response))
-    
-    conn.commit()
-    conn.close()
+    row = (consult_id, f"User_{message.user_id or 'Anonymous'}", message.message, response)
+    if consultation_writer.blocking:
+        await run_in_threadpool(consultation_writer.submit, *row)
+    else:
+        consultation_writer.submit(*row)
     
     return ChatResponse(response=response, consultation_id=consult_id)
 
@@ -363,8 +410,8 @@ async def register_user(user: UserCreate):
         if cursor.fetchone():
             raise HTTPException(status_code=400, detail="Email already registered")
         
-        # Hash password (in production, use proper password hashing)
-        hashed_password = hashlib.sha256(user.password.encode()).hexdigest()
+        # Salted KDF computed on the hashing pool, off the event loop
+        hashed_password = await hash_password_async(user.password)
         
         cursor.execute("""
             INSERT INTO users (name, email, password)
@@ -389,17 +436,22 @@ async def login_user(login: UserLogin):
     cursor = conn.cursor()
     
     try:
-        hashed_password = hashlib.sha256(login.password.encode()).hexdigest()
-        
         cursor.execute("""
-            SELECT id, name, email FROM users 
-            WHERE email = ? AND password = ?
-        """, (login.email, hashed_password))
+            SELECT id, name, email, password FROM users 
+            WHERE email = ?
+        """, (login.email,))
         
         user = cursor.fetchone()
-        if not user:
+        valid, needs_rehash = await verify_password_async(login.password, user["password"] if user else None)
+        if not valid:
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
+        # Upgrade legacy SHA-256 or lower-cost hashes now that we know the password
+        if needs_rehash:
+            cursor.execute("UPDATE users SET password = ? WHERE id = ?",
+                           (await hash_password_async(login.password), user["id"]))
+            conn.commit()
+        
         return {
             "message": "Login successful",
             "user": {
@@ -416,8 +468,20 @@ async def login_user(login: UserLogin):
     finally:
         conn.close()
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="."), name="static")
+# Static files: whitelisted assets only, precompressed, with ETag revalidation
+static_assets = StaticAssets()
+
+@app.api_route("/static/{asset_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def serve_static(asset_path: str, request: Request):
+    status, headers, file_path = static_assets.prepare(asset_path, request.headers)
+    
+    if status == 404:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if status == 304:
+        return Response(status_code=304, headers=headers)
+    
+    # FileResponse keeps our ETag/Last-Modified and uses zero-copy send when the server supports it
+    return FileResponse(file_path, headers=headers, media_type=headers["Content-Type"], stat_result=os.stat(file_path))
 
 if __name__ == "__main__":
     # Initialize database
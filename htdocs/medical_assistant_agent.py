@@ -0,0 +1,362 @@
+"""
+Medicine suggestion assistant (OpenAI ChatGPT), informational only
+
+generate_otc_advice(symptoms) is shared by streamlit_app.py and
+interactive_cli.py. Answers are memoized: symptom descriptions are
+normalized (case, punctuation, spacing and the order of comma-separated
+symptoms do not matter) and looked up in a size-bounded in-process LRU
+with a TTL, then optionally in an SQLite file shared by every process on
+the machine, before any LLM round trip.
+
+stream_otc_advice(symptoms) yields the answer in pieces as the model
+produces them (a cached answer arrives as one piece) and measures the
+time to the first token.
+
+Configuration (environment variables, .env supported):
+  OPENAI_API_KEY       API key (required unless LLM_BACKEND=stub)
+  OTC_MODEL            default model (default gpt-4o-mini)
+  LLM_BACKEND          'stub' answers offline with canned replies
+  ADVICE_CACHE_TTL     seconds an answer stays valid (default 86400, 0 disables caching)
+  ADVICE_CACHE_SIZE    in-process LRU entries (default 512)
+  ADVICE_CACHE_PATH    SQLite file for the shared on-disk tier (default: off)
+
+Run:
+  streamlit run medical_assistant_agent.py
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from instrumentation import LLM_CALL, LLM_FIRST_TOKEN, record_cache
+
+try:
+    from dotenv import load_dotenv
+except ImportError:  # .env support is optional
+    load_dotenv = None
+
+try:
+    from openai import OpenAI
+except ImportError:  # only needed for the real backend
+    OpenAI = None
+
+# Load environment variables
+if load_dotenv:
+    load_dotenv()
+openai_api_key = os.getenv("OPENAI_API_KEY")
+
+# System prompt for the assistant
+SYSTEM_PROMPT = """
+You are a medicine suggestion assistant.
+The user will describe their symptoms, and you should suggest:
+1. Common over-the-counter medicines or remedies (when safe).
+2. Home care advice.
+3. A clear warning to consult a doctor if the case seems serious.
+Keep responses short, simple, and friendly.
+"""
+
+MODELS = ["gpt-4o-mini", "gpt-4o"]
+DEFAULT_MODEL = os.getenv("OTC_MODEL", MODELS[0])
+DEFAULT_TEMPERATURE = 0.7
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+
+ADVICE_CACHE_TTL = int(os.getenv("ADVICE_CACHE_TTL", "86400"))
+ADVICE_CACHE_SIZE = int(os.getenv("ADVICE_CACHE_SIZE", "512"))
+ADVICE_CACHE_PATH = os.getenv("ADVICE_CACHE_PATH", "")
+
+FALLBACK_ANSWER = "Sorry, I couldn't generate a response."
+# Only list punctuation separates symptoms; words like "with" carry meaning ("pain with urination")
+_SEPARATORS = re.compile(r"\s*[,;\n]\s*")
+_NOISE = re.compile(r"[^\w\s'.-]")
+
+
+class AdviceError(Exception):
+    """The advice could not be generated (missing key, API failure)"""
+
+
+def normalize_symptoms(symptoms):
+    """Canonical form of a symptom description used as the cache key"""
+    text = unicodedata.normalize("NFKC", symptoms or "").lower()
+    parts = {" ".join(_NOISE.sub(" ", part).split()).strip(" .-'") for part in _SEPARATORS.split(text)}
+    return ", ".join(sorted(part for part in parts if part))
+
+
+def advice_key(symptoms, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE):
+    """Cache key: normalized symptoms plus everything else that shapes the answer"""
+    prompt_version = hashlib.sha1(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:8]
+    raw = f"{prompt_version}|{model}|{temperature:.2f}|{normalize_symptoms(symptoms)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AdviceCache:
+    """Size-bounded LRU with a TTL, backed by an optional SQLite file shared between processes"""
+
+    def __init__(self, ttl=ADVICE_CACHE_TTL, max_entries=ADVICE_CACHE_SIZE, path=ADVICE_CACHE_PATH):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            with self._disk() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS advice_cache (
+                        key TEXT PRIMARY KEY,
+                        advice TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                """)
+
+    def _disk(self):
+        """Per-thread connection to the shared cache file"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode = WAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self.entries[key]
+
+        if self.path:
+            try:
+                row = self._disk().execute(
+                    "SELECT advice, expires_at FROM advice_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+            except sqlite3.Error:
+                row = None
+            if row:
+                self._remember(key, row[0], row[1])
+                with self.lock:
+                    self.disk_hits += 1
+                return row[0]
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, advice):
+        expires_at = time.time() + self.ttl
+        self._remember(key, advice, expires_at)
+        if self.path:
+            try:
+                with self._disk() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO advice_cache (key, advice, expires_at) VALUES (?, ?, ?)",
+                        (key, advice, expires_at)
+                    )
+                    conn.execute("DELETE FROM advice_cache WHERE expires_at <= ?", (time.time(),))
+            except sqlite3.Error:
+                pass  # the in-process tier still has it
+
+    def _remember(self, key, advice, expires_at):
+        with self.lock:
+            self.entries[key] = (expires_at, advice)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        if self.path:
+            with self._disk() as conn:
+                conn.execute("DELETE FROM advice_cache")
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "disk_hits": self.disk_hits,
+                    "misses": self.misses}
+
+
+advice_cache = AdviceCache()
+_client = None
+
+
+def _openai_client():
+    global _client
+    if not openai_api_key:
+        raise AdviceError("OPENAI_API_KEY not found. Please add it to your .env file.")
+    if OpenAI is None:
+        raise AdviceError("The 'openai' package is not installed (pip install openai).")
+    if _client is None:
+        _client = OpenAI(api_key=openai_api_key)
+    return _client
+
+
+def _messages(symptoms):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT.strip()},
+        {"role": "user", "content": symptoms.strip()}
+    ]
+
+
+def _stub_reply(symptoms, model):
+    from stub_backends import StubGenerativeModel
+    return StubGenerativeModel(model).generate_content(_messages(symptoms)).text
+
+
+def _ask_llm(symptoms, model, temperature):
+    """One chat completion; raises AdviceError"""
+    if LLM_BACKEND == "stub":
+        with LLM_CALL.time(model="stub"):
+            return _stub_reply(symptoms, model)
+
+    client = _openai_client()
+    try:
+        with LLM_CALL.time(model=model):
+            completion = client.chat.completions.create(model=model, temperature=temperature,
+                                                        messages=_messages(symptoms))
+    except Exception as e:
+        raise AdviceError(f"Error: {e}") from e
+    return completion.choices[0].message.content if completion.choices else None
+
+
+def _stream_llm(symptoms, model, temperature):
+    """Yield text deltas of one streamed chat completion; raises AdviceError"""
+    if LLM_BACKEND == "stub":
+        # The stub answers in one go; split it so the streaming path is exercised offline
+        for word in re.findall(r"\S+\s*", _stub_reply(symptoms, model)):
+            yield word
+        return
+
+    client = _openai_client()
+    try:
+        stream = client.chat.completions.create(model=model, temperature=temperature,
+                                                messages=_messages(symptoms), stream=True)
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+    except Exception as e:
+        raise AdviceError(f"Error: {e}") from e
+
+
+def generate_otc_advice(symptoms, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE,
+                        use_cache=True, raise_errors=False):
+    """
+    Suggest OTC remedies and home care for a symptom description.
+
+    Repeat descriptions are answered from the cache. Errors are returned as
+    the message text (and never cached) unless raise_errors is set; an empty
+    reply then raises too, so callers with their own cache (st.cache_data)
+    never store FALLBACK_ANSWER.
+    """
+    caching = use_cache and ADVICE_CACHE_TTL > 0
+    key = advice_key(symptoms, model, temperature) if caching else None
+    if caching:
+        cached = advice_cache.get(key)
+        record_cache("otc_advice", cached is not None)
+        if cached is not None:
+            return cached
+
+    try:
+        answer = _ask_llm(symptoms, model, temperature)
+    except AdviceError as e:
+        if raise_errors:
+            raise
+        return str(e)
+
+    if not answer:
+        if raise_errors:
+            raise AdviceError(FALLBACK_ANSWER)
+        return FALLBACK_ANSWER
+    if caching:
+        advice_cache.put(key, answer)
+    return answer
+
+
+def stream_otc_advice(symptoms, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE,
+                      use_cache=True, timings=None):
+    """
+    Yield the advice piece by piece as the model produces it.
+
+    A cached answer is yielded whole. Only a completed stream is cached.
+    If a dict is passed as timings it receives first_token_seconds,
+    total_seconds, cached and fallback (True when the model sent no text
+    and FALLBACK_ANSWER was yielded instead). Failures raise AdviceError.
+    """
+    timings = {} if timings is None else timings
+    start = time.perf_counter()
+    caching = use_cache and ADVICE_CACHE_TTL > 0
+    key = advice_key(symptoms, model, temperature) if caching else None
+    if caching:
+        cached = advice_cache.get(key)
+        record_cache("otc_advice", cached is not None)
+        if cached is not None:
+            timings.update(cached=True, first_token_seconds=time.perf_counter() - start)
+            yield cached
+            timings["total_seconds"] = time.perf_counter() - start
+            return
+
+    timings.update(cached=False, fallback=False)
+    label = "stub" if LLM_BACKEND == "stub" else model
+    pieces = []
+    try:
+        for piece in _stream_llm(symptoms, model, temperature):
+            if not pieces:
+                timings["first_token_seconds"] = time.perf_counter() - start
+                LLM_FIRST_TOKEN.observe(timings["first_token_seconds"], model=label)
+            pieces.append(piece)
+            yield piece
+    finally:
+        # Failed and abandoned streams still count as model calls
+        timings["total_seconds"] = time.perf_counter() - start
+        LLM_CALL.observe(timings["total_seconds"], model=label)
+
+    if not pieces:
+        timings.update(fallback=True, first_token_seconds=time.perf_counter() - start)
+        yield FALLBACK_ANSWER
+    elif caching:
+        advice_cache.put(key, "".join(pieces))
+
+
+def main():
+    import streamlit as st
+
+    st.title("💊 Medicine Suggestion Chatbot (OpenAI ChatGPT)")
+
+    if not openai_api_key and LLM_BACKEND != "stub":
+        st.error("OPENAI_API_KEY not found. Please add it to your .env file.")
+
+    user_input = st.text_input("Describe your symptoms:")
+
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        temperature = st.slider("Creativity (temperature)", 0.0, 1.0, DEFAULT_TEMPERATURE, 0.1)
+    with col2:
+        model = st.selectbox("Model", MODELS, index=MODELS.index(DEFAULT_MODEL) if DEFAULT_MODEL in MODELS else 0)
+
+    if st.button("Get Suggestion"):
+        if not user_input:
+            st.warning("Please enter symptoms.")
+            return
+        if not openai_api_key and LLM_BACKEND != "stub":
+            st.stop()
+        try:
+            answer = generate_otc_advice(user_input, model=model, temperature=temperature, raise_errors=True)
+            st.success(answer)
+        except AdviceError as e:
+            st.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for chatbot.db
+
+Both main.py and simple_server.py call migrate() from init_db(), so a
+schema change is written once here and rolled out to existing databases
+the next time either server starts.
+
+Each migration runs in its own BEGIN IMMEDIATE transaction and records
+its version in schema_version, so a crash part-way through leaves the
+database at the last fully applied version. The database is switched to
+WAL mode first, which keeps readers running while an index is built.
+
+Run:
+  python migrations.py [--db chatbot.db] [--status]
+"""
+
+import argparse
+import hashlib
+import sqlite3
+from datetime import datetime
+
+DATABASE_URL = "chatbot.db"
+
+MIGRATIONS = []
+
+
+def access_key_digest(access_key):
+    """Hex SHA-256 of a doctor access key; doctors are looked up by this, never by the key"""
+    return hashlib.sha256(access_key.encode()).hexdigest()
+
+
+def migration(version, name):
+    """Register a migration function; versions must be strictly increasing"""
+    def register(fn):
+        if MIGRATIONS and version <= MIGRATIONS[-1][0]:
+            raise ValueError(f"Migration {version} registered out of order")
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+
+def create_index(cursor, name, table, columns, unique=False):
+    """
+    Build an index unless it already exists.
+
+    SQLite has no CREATE INDEX CONCURRENTLY; the build holds the write lock
+    for its own short transaction only, and WAL mode keeps readers unblocked.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,))
+    if cursor.fetchone():
+        return False
+    cursor.execute(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    )
+    return True
+
+
+@migration(1, "initial schema")
+def _initial_schema(cursor):
+    # Existing deployments already have these tables; IF NOT EXISTS adopts them as-is
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS consultations (
+            id TEXT PRIMARY KEY,
+            patient_name TEXT NOT NULL,
+            symptoms TEXT NOT NULL,
+            chatbot_recommendation TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            doctor_name TEXT,
+            doctor_note TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS doctors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            access_key TEXT UNIQUE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+@migration(2, "consultation queue index")
+def _consultation_queue_index(cursor):
+    create_index(cursor, "idx_consultations_status_created", "consultations", ["status", "created_at", "id"])
+
+
+@migration(3, "consultations archive tier")
+def _consultations_archive(cursor):
+    # Reviewed consultations are moved here by retention.py; same columns plus archived_at
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS consultations_archive (
+            id TEXT PRIMARY KEY,
+            patient_name TEXT NOT NULL,
+            symptoms TEXT NOT NULL,
+            chatbot_recommendation TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            doctor_name TEXT,
+            doctor_note TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    create_index(cursor, "idx_consultations_archive_status_created", "consultations_archive", ["status", "created_at", "id"])
+
+
+def _create_fts(cursor, table):
+    """External-content FTS5 index over one consultations tier, kept in sync by triggers"""
+    fts = f"{table}_fts"
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            symptoms, chatbot_recommendation, doctor_note,
+            content='{table}', content_rowid='rowid',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts} (rowid, symptoms, chatbot_recommendation, doctor_note)
+            VALUES (new.rowid, new.symptoms, new.chatbot_recommendation, new.doctor_note);
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, symptoms, chatbot_recommendation, doctor_note)
+            VALUES ('delete', old.rowid, old.symptoms, old.chatbot_recommendation, old.doctor_note);
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF symptoms, chatbot_recommendation, doctor_note ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, symptoms, chatbot_recommendation, doctor_note)
+            VALUES ('delete', old.rowid, old.symptoms, old.chatbot_recommendation, old.doctor_note);
+            INSERT INTO {fts} (rowid, symptoms, chatbot_recommendation, doctor_note)
+            VALUES (new.rowid, new.symptoms, new.chatbot_recommendation, new.doctor_note);
+        END
+    """)
+    # Index rows that existed before the migration
+    cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+@migration(4, "consultation full-text search")
+def _consultation_fts(cursor):
+    _create_fts(cursor, "consultations")
+    _create_fts(cursor, "consultations_archive")
+
+
+@migration(5, "consultation review-age index")
+def _consultation_review_index(cursor):
+    # retention.py archives by review time (updated_at), not creation time
+    create_index(cursor, "idx_consultations_status_updated", "consultations", ["status", "updated_at", "id"])
+
+
+@migration(6, "doctor access key digests")
+def _doctor_key_digests(cursor):
+    # SQLite has no SHA-256, so existing keys are hashed here
+    cursor.execute("ALTER TABLE doctors ADD COLUMN access_key_digest TEXT")
+    rows = cursor.execute("SELECT id, access_key FROM doctors").fetchall()
+    cursor.executemany(
+        "UPDATE doctors SET access_key_digest = ? WHERE id = ?",
+        [(access_key_digest(access_key), doctor_id) for doctor_id, access_key in rows]
+    )
+    create_index(cursor, "idx_doctors_access_key_digest", "doctors", ["access_key_digest"], unique=True)
+
+
+# One full-text index over both consultation tiers, so bm25() ranks every
+# row against the same document counts and lengths. The rowid encodes the
+# source row: rowid * 2 + tier bit.
+SEARCH_INDEX = "consultation_search"
+SEARCH_TIERS = (
+    ("active", "consultations", 0),
+    ("archived", "consultations_archive", 1),
+)
+SEARCH_COLUMNS = ("symptoms", "chatbot_recommendation", "doctor_note")
+
+
+def fill_search_index(cursor):
+    """(Re)load the search index from both tiers; needed when VACUUM renumbers rowids"""
+    columns = ", ".join(SEARCH_COLUMNS)
+    cursor.execute(f"DELETE FROM {SEARCH_INDEX}")
+    for tier, table, bit in SEARCH_TIERS:
+        cursor.execute(f"""
+            INSERT INTO {SEARCH_INDEX} (rowid, {columns}, tier)
+            SELECT rowid * 2 + {bit}, {columns}, '{tier}' FROM {table}
+        """)
+
+
+@migration(7, "single consultation search index")
+def _consultation_search(cursor):
+    # Separate per-tier indexes scored the same term differently in each tier
+    for _, table, _ in SEARCH_TIERS:
+        for suffix in ("ai", "ad", "au"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+        cursor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+    columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+    # Holds its own copy of the text: an external-content view over both tiers
+    # could not look rows up by the computed rowid without a scan
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_INDEX} USING fts5(
+            {columns}, tier UNINDEXED,
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+    """)
+    for tier, table, bit in SEARCH_TIERS:
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_search_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {SEARCH_INDEX} (rowid, {columns}, tier)
+                VALUES (new.rowid * 2 + {bit}, {new_values}, '{tier}');
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_search_ad AFTER DELETE ON {table} BEGIN
+                DELETE FROM {SEARCH_INDEX} WHERE rowid = old.rowid * 2 + {bit};
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_search_au AFTER UPDATE OF {columns} ON {table} BEGIN
+                DELETE FROM {SEARCH_INDEX} WHERE rowid = old.rowid * 2 + {bit};
+                INSERT INTO {SEARCH_INDEX} (rowid, {columns}, tier)
+                VALUES (new.rowid * 2 + {bit}, {new_values}, '{tier}');
+            END
+        """)
+    fill_search_index(cursor)
+
+
+def connect(db_path=DATABASE_URL):
+    """Open a connection in autocommit mode so migrations control their own transactions"""
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    return conn
+
+
+def current_version(conn):
+    """Return the highest applied migration version (0 for a fresh database)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    """)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(db_path=DATABASE_URL, target=None, verbose=False):
+    """Apply all pending migrations up to target (default: latest); returns the new version"""
+    conn = connect(db_path)
+    try:
+        # auto_vacuum can only be chosen before the first table exists;
+        # older databases are converted with 'python retention.py --enable-incremental-vacuum'
+        if not conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0]:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        version = current_version(conn)
+
+        for number, name, fn in MIGRATIONS:
+            if number <= version or (target is not None and number > target):
+                continue
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have applied it while we waited for the lock
+                if current_version(conn) >= number:
+                    conn.execute("ROLLBACK")
+                    continue
+                cursor = conn.cursor()
+                fn(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                    (number, name, datetime.now().isoformat())
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            version = number
+            if verbose:
+                print(f"   applied {number:03d} {name}")
+
+        return version
+    finally:
+        conn.close()
+
+
+def seed_default_doctor(db_path=DATABASE_URL):
+    """Insert the default doctor account on an empty doctors table"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM doctors")
+    if cursor.fetchone()[0] == 0:
+        default_key = "doctor123"  # In production, use secure key generation
+        cursor.execute("""
+            INSERT INTO doctors (name, email, access_key, access_key_digest)
+            VALUES (?, ?, ?, ?)
+        """, ("Dr. Admin", "admin@healthcare.com", default_key, access_key_digest(default_key)))
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply chatbot.db schema migrations")
+    parser.add_argument("--db", default=DATABASE_URL)
+    parser.add_argument("--target", type=int, default=None, help="stop after this version")
+    parser.add_argument("--status", action="store_true", help="show applied and pending migrations")
+    args = parser.parse_args()
+
+    if args.status:
+        conn = connect(args.db)
+        current_version(conn)
+        applied = dict(conn.execute("SELECT version, applied_at FROM schema_version").fetchall())
+        conn.close()
+        for number, name, _ in MIGRATIONS:
+            state = f"applied {applied[number]}" if number in applied else "pending"
+            print(f"{number:03d} {name:<40} {state}")
+        return
+
+    print(f"📊 Migrating {args.db}...")
+    version = migrate(args.db, target=args.target, verbose=True)
+    print(f"✅ Schema at version {version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Password hashing service for the Python auth endpoints
+
+Passwords are hashed with a salted, cost-tunable KDF from the standard
+library (scrypt by default, PBKDF2-SHA256 as an alternative) on a bounded
+thread pool, so /register and /login never block the event loop and a
+login burst cannot start more KDF computations than there are workers.
+
+Stored formats:
+  scrypt$<n>$<r>$<p>$<salt>$<hash>              new default
+  pbkdf2_sha256$<iterations>$<salt>$<hash>      PASSWORD_HASH_ALGORITHM=pbkdf2_sha256
+  $2y$<cost>$...                                bcrypt from the PHP signup.php
+  <64 hex chars>                                legacy unsalted SHA-256
+
+verify_password() reports whether the stored hash should be upgraded;
+the login handlers then rehash with the current settings. Legacy SHA-256
+and weaker scrypt/PBKDF2 hashes are upgraded. bcrypt hashes are verified
+(through the optional 'bcrypt' package) but left as bcrypt, so the PHP
+pages can still verify them. A malformed or truncated stored hash is
+logged and fails verification instead of raising.
+
+Configuration (environment variables):
+  PASSWORD_HASH_ALGORITHM       scrypt | pbkdf2_sha256 (default scrypt)
+  PASSWORD_SCRYPT_N             scrypt CPU/memory cost, power of two (default 16384)
+  PASSWORD_SCRYPT_R             scrypt block size (default 8)
+  PASSWORD_SCRYPT_P             scrypt parallelism (default 1)
+  PASSWORD_PBKDF2_ITERATIONS    PBKDF2 iterations (default 600000)
+  PASSWORD_HASH_WORKERS         hashing threads (default min(4, CPU count))
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import logging
+import os
+import re
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import bcrypt
+except ImportError:  # bcrypt verification is only needed for PHP-created accounts
+    bcrypt = None
+
+ALGORITHMS = ("scrypt", "pbkdf2_sha256")
+
+ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "scrypt")
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "600000"))
+WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+logger = logging.getLogger(__name__)
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+LEGACY_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+BCRYPT_PREFIXES = ("$2y$", "$2b$", "$2a$")
+
+
+def _b64(data):
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    # maxmem must cover 128 * n * r bytes plus overhead, or OpenSSL refuses large n
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=min(256 * n * r + 1024 * 1024, 2 ** 31 - 1), dklen=HASH_BYTES)
+
+
+def hash_password(password, algorithm=None, scrypt_n=None, pbkdf2_iterations=None):
+    """Hash a password with a fresh salt using the configured (or given) algorithm and cost"""
+    algorithm = algorithm or ALGORITHM
+    salt = secrets.token_bytes(SALT_BYTES)
+
+    if algorithm == "scrypt":
+        n = scrypt_n or SCRYPT_N
+        digest = _scrypt(password, salt, n, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${n}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+    if algorithm == "pbkdf2_sha256":
+        iterations = pbkdf2_iterations or PBKDF2_ITERATIONS
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, HASH_BYTES)
+        return f"pbkdf2_sha256${iterations}${_b64(salt)}${_b64(digest)}"
+
+    raise ValueError(f"Unknown password hash algorithm '{algorithm}'. Use one of: {', '.join(ALGORITHMS)}")
+
+
+def verify_password(password, stored):
+    """
+    Check a password against any supported stored format.
+
+    Returns (valid, needs_rehash); needs_rehash is only meaningful when valid.
+    """
+    if not stored:
+        return False, False
+
+    try:
+        return _verify(password, stored)
+    except (binascii.Error, ValueError) as e:
+        # A truncated or corrupted record must fail the login, not the request
+        scheme = stored.split("$")[1 if stored.startswith("$") else 0][:16]
+        logger.warning("Rejecting login against a malformed %s password hash (%d chars): %s",
+                       scheme or "unknown", len(stored), e)
+        return False, False
+
+
+def _verify(password, stored):
+    if stored.startswith("scrypt$"):
+        _, n, r, p, salt, expected = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        digest = _scrypt(password, _unb64(salt), n, r, p)
+        valid = hmac.compare_digest(digest, _unb64(expected))
+        weaker = ALGORITHM != "scrypt" or n < SCRYPT_N or r < SCRYPT_R or p < SCRYPT_P
+        return valid, valid and weaker
+
+    if stored.startswith("pbkdf2_sha256$"):
+        _, iterations, salt, expected = stored.split("$")
+        iterations = int(iterations)
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), _unb64(salt), iterations, HASH_BYTES)
+        valid = hmac.compare_digest(digest, _unb64(expected))
+        weaker = ALGORITHM != "pbkdf2_sha256" or iterations < PBKDF2_ITERATIONS
+        return valid, valid and weaker
+
+    if stored.startswith(BCRYPT_PREFIXES):
+        if bcrypt is None:
+            raise RuntimeError("bcrypt package is required to verify PHP-created passwords (pip install bcrypt)")
+        # PHP writes $2y$, which the Python bcrypt package knows as $2b$
+        normalized = "$2b$" + stored[4:]
+        return bcrypt.checkpw(password.encode(), normalized.encode()), False
+
+    if LEGACY_SHA256.match(stored):
+        digest = hashlib.sha256(password.encode()).hexdigest()
+        valid = hmac.compare_digest(digest, stored)
+        return valid, valid
+
+    return False, False
+
+
+# Verified against when the account does not exist, so unknown emails take as long as wrong passwords
+_DUMMY_HASH = None
+
+
+def verify_missing_user(password):
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password(secrets.token_urlsafe(16))
+    verify_password(password, _DUMMY_HASH)
+    return False, False
+
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="password-hash")
+
+
+async def hash_password_async(password):
+    """Hash on the bounded pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, hash_password, password)
+
+
+async def verify_password_async(password, stored):
+    """Verify on the bounded pool; stored=None runs a dummy verification"""
+    loop = asyncio.get_running_loop()
+    if stored is None:
+        return await loop.run_in_executor(_executor, verify_missing_user, password)
+    return await loop.run_in_executor(_executor, verify_password, password, stored)
+
+
+def hash_password_pooled(password):
+    """Blocking variant for threaded servers; still capped at PASSWORD_HASH_WORKERS concurrent hashes"""
+    return _executor.submit(hash_password, password).result()
+
+
+def verify_password_pooled(password, stored):
+    if stored is None:
+        return _executor.submit(verify_missing_user, password).result()
+    return _executor.submit(verify_password, password, stored).result()
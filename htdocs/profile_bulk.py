@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Bulk import and export for the user_profiles collection
+
+Import streams a CSV or JSONL file record by record, validates each one,
+and embeds and stores them in batches: one model.encode() call, one
+collection.add() and one SQLite transaction per batch instead of per
+profile. Invalid records are collected in an error report (line number,
+reason, record) and never stop the import. Every imported profile gets
+an 'import' entry in the audit trail, written once per batch.
+
+Records with the same normalized email or phone as a stored profile, or
+as an earlier record of the same file, are reported as duplicates
+instead of being inserted, so re-importing a file adds nothing. With
+check_similar (--check-similar) each record is also compared with its
+nearest stored neighbours as on the create form.
+
+Export pages through the collection without loading it whole:
+  parquet  one row group per page; profile fields plus an optional
+           'embedding' column (needs pyarrow)
+  npy      <name>.npy float32 matrix of embeddings written through a
+           memory map, with the profiles in the same order in
+           <name>.jsonl
+
+Configuration (environment variables):
+  PROFILE_IMPORT_BATCH   profiles per encode/add batch (default 256)
+  EMBEDDING_BACKEND      'stub' uses the offline HashingEmbedder
+
+Run:
+  python profile_bulk.py import profiles.csv
+  python profile_bulk.py export profiles.parquet [--embeddings]
+  python profile_bulk.py export profiles.npy
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+
+from profile_dedup import DEDUP_SIMILARITY, check_new_profile
+from profile_embeddings import ProfileVectors
+from profile_records import PROFILE_INPUT_FIELDS, identity_keys, profile_metadata, validate_profile
+from profile_store import ProfileStore, profile_row
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is unavailable without pyarrow
+    pa = None
+    pq = None
+
+IMPORT_BATCH = int(os.getenv("PROFILE_IMPORT_BATCH", "256"))
+EXPORT_PAGE = 1000
+EXPORT_FIELDS = ["id"] + PROFILE_INPUT_FIELDS + ["created_at"]
+
+
+def detect_format(filename):
+    """'csv' or 'jsonl' from a file name"""
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    raise ValueError(f"Unsupported file type: {filename} (use .csv or .jsonl)")
+
+
+def iter_records(binary_file, fmt):
+    """
+    Yield (line_number, record) from a binary file object without reading
+    it all; a record that cannot be parsed is yielded as a ValueError.
+    """
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, {(key or "").strip().lower(): value for key, value in record.items()}
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+            yield line_number, record
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+
+
+class ImportReport:
+    """Counts and per-record errors of one import"""
+
+    def __init__(self):
+        self.imported = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    def fail(self, line_number, error, record=None):
+        self.errors.append({"line": line_number, "error": str(error), "record": record})
+
+    def summary(self):
+        rate = self.imported / self.seconds if self.seconds else 0
+        return f"{self.imported} imported, {len(self.errors)} failed in {self.seconds:.1f}s ({rate:.0f} profiles/s)"
+
+
+def _exact_duplicate(profile_data, store, seen_keys):
+    """Why a record duplicates a stored profile or an earlier record of this import, or None"""
+    keys = identity_keys(profile_data)
+    for kind, value in keys:
+        if (kind, value) in seen_keys:
+            return f"Duplicate of line {seen_keys[(kind, value)]} (same {kind})"
+    matches = store.find_by_identity(profile_data)
+    if matches:
+        return "Duplicate of existing profile " + "; ".join(
+            f"{profile_id} (same {', '.join(kinds)})" for profile_id, kinds in matches.items()
+        )
+    return None
+
+
+def _similar_duplicates(batch, fused, collection, store, threshold):
+    """{batch index: reason} for records whose embedding is near a stored profile"""
+    similar = {}
+    for index, (_, profile_data) in enumerate(batch):
+        duplicates = check_new_profile(profile_data, fused[index], collection, store, threshold)
+        if duplicates:
+            similar[index] = "Similar to existing profile " + "; ".join(
+                f"{d['id']} ({d['similarity']:.1%})" if d['similarity'] else d['id'] for d in duplicates
+            )
+    return similar
+
+
+def _store_batch(batch, collection, model, store, vectors, report, check_similar=False,
+                 threshold=DEDUP_SIMILARITY):
+    """Embed and add one batch of (line_number, profile_data)"""
+    try:
+        group_vectors, fused = vectors.embed([profile_data for _, profile_data in batch], model)
+        similar = _similar_duplicates(batch, fused, collection, store, threshold) if check_similar else {}
+        kept = [index for index in range(len(batch)) if index not in similar]
+        if similar:
+            group_vectors = {group: matrix[kept] for group, matrix in group_vectors.items()}
+            fused = fused[kept]
+        ids = [str(uuid.uuid4()) for _ in kept]
+        profiles = [batch[index][1] for index in kept]
+        metadatas = [profile_metadata(p, p["created_at"]) for p in profiles]
+        if ids:
+            collection.add(
+                ids=ids,
+                embeddings=fused.tolist(),
+                documents=[json.dumps(p) for p in profiles],
+                metadatas=metadatas
+            )
+            vectors.add(ids, profiles, group_vectors)
+    except Exception as e:
+        for line_number, profile_data in batch:
+            report.fail(line_number, f"Batch failed: {e}", profile_data)
+        return
+    for index, reason in similar.items():
+        report.fail(batch[index][0], reason, batch[index][1])
+    if not ids:
+        return
+    store.add_many(
+        [profile_row(profile_id, p, m["created_at"]) for profile_id, p, m in zip(ids, profiles, metadatas)]
+    )
+    store.record_audit_many(ids, "import", reembedded=list(group_vectors))
+    report.imported += len(ids)
+
+
+def import_profiles(records, collection, model, store, vectors, batch_size=IMPORT_BATCH, progress=None,
+                    check_similar=False):
+    """
+    Validate, embed and add records from iter_records() in batches.
+
+    Exact duplicates (email/phone) are always reported instead of inserted;
+    check_similar adds the nearest-neighbour check. progress(report) is
+    called after every batch. Returns an ImportReport.
+    """
+    report = ImportReport()
+    start = time.perf_counter()
+    batch = []
+    seen_keys = {}  # identity key -> first line with it in this import
+    for line_number, record in records:
+        if isinstance(record, Exception):
+            report.fail(line_number, record)
+            continue
+        try:
+            profile_data = validate_profile(record)
+        except ValueError as e:
+            report.fail(line_number, e, record)
+            continue
+        duplicate = _exact_duplicate(profile_data, store, seen_keys)
+        if duplicate:
+            report.fail(line_number, duplicate, record)
+            continue
+        for key in identity_keys(profile_data):
+            seen_keys.setdefault(key, line_number)
+        batch.append((line_number, profile_data))
+        if len(batch) >= batch_size:
+            _store_batch(batch, collection, model, store, vectors, report, check_similar)
+            batch = []
+            report.seconds = time.perf_counter() - start
+            if progress:
+                progress(report)
+    if batch:
+        _store_batch(batch, collection, model, store, vectors, report, check_similar)
+    report.seconds = time.perf_counter() - start
+    if progress:
+        progress(report)
+    return report
+
+
+def write_error_report(report, path):
+    """Write failed records as JSONL; returns the number written"""
+    with open(path, "w", encoding="utf-8") as f:
+        for error in report.errors:
+            f.write(json.dumps(error, default=str) + "\n")
+    return len(report.errors)
+
+
+def iter_export_pages(collection, include_embeddings=False, page_size=EXPORT_PAGE):
+    """Yield (rows, embeddings) one page at a time; embeddings is None unless requested"""
+    include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+    total = collection.count()
+    for offset in range(0, total, page_size):
+        page = collection.get(limit=page_size, offset=offset, include=include)
+        rows = []
+        for profile_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+            try:
+                profile_data = json.loads(document) if document else {}
+            except ValueError:
+                profile_data = {}
+            merged = {**(metadata or {}), **profile_data}
+            merged["id"] = profile_id
+            row = {field: "" if merged.get(field) is None else str(merged[field]) for field in EXPORT_FIELDS}
+            rows.append(row)
+        embeddings = None
+        if include_embeddings:
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+        yield rows, embeddings
+
+
+def export_parquet(collection, path, include_embeddings=False, progress=None):
+    """Stream profiles (and optionally embeddings) to a Parquet file; returns the row count"""
+    if pq is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    writer = None
+    written = 0
+    try:
+        for rows, embeddings in iter_export_pages(collection, include_embeddings):
+            columns = {field: pa.array([row[field] for row in rows], type=pa.string()) for field in EXPORT_FIELDS}
+            if embeddings is not None:
+                flat = pa.array(embeddings.reshape(-1), type=pa.float32())
+                columns["embedding"] = pa.FixedSizeListArray.from_arrays(flat, embeddings.shape[1])
+            table = pa.table(columns)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+            writer.write_table(table)
+            written += len(rows)
+            if progress:
+                progress(written)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def export_npy(collection, path, progress=None):
+    """
+    Stream embeddings to <path> (.npy, float32, one row per profile) and the
+    profiles to the matching .jsonl; returns the row count.
+    """
+    total = collection.count()
+    base = path[:-4] if path.endswith(".npy") else path
+    matrix = None
+    written = 0
+    with open(base + ".jsonl", "w", encoding="utf-8") as profiles_file:
+        for rows, embeddings in iter_export_pages(collection, include_embeddings=True):
+            if matrix is None:
+                matrix = np.lib.format.open_memmap(base + ".npy", mode="w+", dtype=np.float32,
+                                                   shape=(total, embeddings.shape[1]))
+            matrix[written:written + len(rows)] = embeddings
+            for row in rows:
+                profiles_file.write(json.dumps(row) + "\n")
+            written += len(rows)
+            if progress:
+                progress(written)
+    if matrix is not None:
+        matrix.flush()
+        del matrix
+    return written
+
+
+def _open_backends(with_model=True):
+    import chromadb
+    from vector_index import get_collection
+
+    client = chromadb.PersistentClient(path="./vector_db")
+    collection = get_collection(client, "user_profiles")
+    store = ProfileStore()
+    store.sync(collection)
+    vectors = ProfileVectors(client)
+    model = None
+    if with_model:
+        if os.getenv("EMBEDDING_BACKEND") == "stub":
+            from stub_backends import HashingEmbedder
+            model = HashingEmbedder()
+        else:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer('all-MiniLM-L6-v2')
+    return collection, store, vectors, model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export of user profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = sub.add_parser("import", help="import profiles from CSV or JSONL")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH)
+    import_parser.add_argument("--errors", help="error report path (default: <path>.errors.jsonl)")
+    import_parser.add_argument("--check-similar", action="store_true",
+                               help="also skip records whose embedding is near a stored profile")
+
+    export_parser = sub.add_parser("export", help="export profiles to Parquet or NPY")
+    export_parser.add_argument("path", help="output file ending in .parquet or .npy")
+    export_parser.add_argument("--embeddings", action="store_true", help="include embeddings (Parquet)")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        collection, store, vectors, model = _open_backends()
+        print(f"📥 Importing {args.path} in batches of {args.batch_size}...")
+        with open(args.path, "rb") as f:
+            report = import_profiles(
+                iter_records(f, detect_format(args.path)), collection, model, store, vectors, args.batch_size,
+                progress=lambda r: print(f"   {r.imported} imported, {len(r.errors)} failed", end="\r"),
+                check_similar=args.check_similar
+            )
+        print()
+        print(f"✅ {report.summary()}")
+        if report.errors:
+            errors_path = args.errors or args.path + ".errors.jsonl"
+            write_error_report(report, errors_path)
+            print(f"⚠️ Error report written to {errors_path}")
+        return
+
+    collection, _, _, _ = _open_backends(with_model=False)
+    if not collection.count():
+        print("ℹ️ There are no profiles to export")
+        return
+    start = time.perf_counter()
+    progress = lambda n: print(f"   {n} profiles exported", end="\r")
+    if args.path.endswith(".parquet"):
+        written = export_parquet(collection, args.path, args.embeddings, progress)
+    elif args.path.endswith(".npy"):
+        written = export_npy(collection, args.path, progress)
+    else:
+        parser.error("output must end in .parquet or .npy")
+    print()
+    print(f"✅ Exported {written} profiles to {args.path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for the user_profiles collection
+
+Two signals mark profiles as the same person:
+  exact     same normalized email or phone number (profile_keys in the
+            SQLite side store, an index lookup)
+  semantic  embedding cosine similarity at or above DEDUP_SIMILARITY
+
+On insert, check_new_profile() runs both against one new profile: a key
+lookup plus a single nearest-neighbour query.
+
+The batch job clusters the whole collection without comparing all pairs.
+Embeddings are bucketed with random-hyperplane LSH (several independent
+tables of sign bits), and only profiles sharing a bucket are compared,
+one block at a time as a NumPy matrix product. Near-identical vectors
+almost always share at least one bucket, so the work grows with bucket
+sizes rather than with the square of the collection. Exact key groups
+and similar pairs are merged with union-find into duplicate groups.
+
+Configuration (environment variables):
+  DEDUP_SIMILARITY   cosine similarity treated as a duplicate (default 0.95)
+  DEDUP_LSH_TABLES   LSH tables (default 8)
+  DEDUP_LSH_BITS     hyperplanes per table (default 10)
+
+Run:
+  python profile_dedup.py [--threshold 0.95] [--output duplicates.json]
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+DEDUP_SIMILARITY = float(os.getenv("DEDUP_SIMILARITY", "0.95"))
+LSH_TABLES = int(os.getenv("DEDUP_LSH_TABLES", "8"))
+LSH_BITS = int(os.getenv("DEDUP_LSH_BITS", "10"))
+NEIGHBOURS = 5
+LOAD_PAGE = 1000
+BLOCK_ROWS = 2048  # rows per matrix product inside an oversized bucket
+
+
+def distance_to_similarity(collection, distance):
+    """Cosine similarity from a Chroma distance in the collection's space"""
+    space = (collection.metadata or {}).get("hnsw:space", "l2")
+    if space == "l2":
+        # squared L2 between unit vectors (MiniLM output is normalized)
+        return 1.0 - distance / 2.0
+    return 1.0 - distance
+
+
+def check_new_profile(profile_data, embedding, collection, store, threshold=DEDUP_SIMILARITY):
+    """
+    Possible duplicates of a profile that is about to be added, best first:
+    [{"id", "name", "email", "reasons": [...], "similarity"}]
+    """
+    matches = {}
+    for profile_id, kinds in store.find_by_identity(profile_data).items():
+        matches[profile_id] = {"reasons": [f"same {kind}" for kind in kinds], "similarity": None}
+
+    if collection.count():
+        results = collection.query(
+            query_embeddings=[list(map(float, embedding))],
+            n_results=min(NEIGHBOURS, collection.count()),
+            include=["distances"]
+        )
+        for profile_id, distance in zip(results["ids"][0], results["distances"][0]):
+            similarity = distance_to_similarity(collection, distance)
+            if similarity >= threshold:
+                match = matches.setdefault(profile_id, {"reasons": [], "similarity": None})
+                match["reasons"].append("similar profile")
+                match["similarity"] = round(similarity, 4)
+
+    found = []
+    for profile in store.get_many(list(matches)):
+        found.append({"id": profile["id"], "name": profile["name"], "email": profile["email"],
+                      **matches[profile["id"]]})
+    found.sort(key=lambda m: (-len(m["reasons"]), -(m["similarity"] or 0)))
+    return found
+
+
+def load_embeddings(collection):
+    """(ids, unit-normalized float32 matrix) for every profile, read page by page"""
+    total = collection.count()
+    ids = []
+    matrix = None
+    for offset in range(0, total, LOAD_PAGE):
+        page = collection.get(limit=LOAD_PAGE, offset=offset, include=["embeddings"])
+        vectors = np.asarray(page["embeddings"], dtype=np.float32)
+        if matrix is None:
+            matrix = np.zeros((total, vectors.shape[1]), dtype=np.float32)
+        matrix[len(ids):len(ids) + len(vectors)] = vectors
+        ids.extend(page["ids"])
+    if matrix is None:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    matrix = matrix[:len(ids)]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1, norms)
+    return ids, matrix
+
+
+def lsh_buckets(matrix, tables=LSH_TABLES, bits=LSH_BITS, seed=0):
+    """Yield arrays of row indices that share a bucket in some LSH table"""
+    rng = np.random.default_rng(seed)
+    weights = 1 << np.arange(bits, dtype=np.int64)
+    for _ in range(tables):
+        planes = rng.standard_normal((matrix.shape[1], bits)).astype(np.float32)
+        codes = ((matrix @ planes) > 0).astype(np.int64) @ weights
+        order = np.argsort(codes, kind="stable")
+        boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+        for bucket in np.split(order, boundaries):
+            if len(bucket) > 1:
+                yield bucket
+
+
+def similar_pairs(matrix, threshold=DEDUP_SIMILARITY, tables=LSH_TABLES, bits=LSH_BITS):
+    """{(i, j): similarity} for row pairs i < j at or above threshold, found via LSH blocking"""
+    pairs = {}
+    compared = 0
+    for bucket in lsh_buckets(matrix, tables, bits):
+        bucket = np.sort(bucket)
+        vectors = matrix[bucket]
+        for start in range(0, len(bucket), BLOCK_ROWS):
+            block = vectors[start:start + BLOCK_ROWS] @ vectors[start:].T
+            compared += block.size
+            rows, cols = np.nonzero(block >= threshold)
+            for row, col in zip(rows, cols):
+                i, j = bucket[start + row], bucket[start + col]
+                if i < j:
+                    pairs[(int(i), int(j))] = float(block[row, col])
+    return pairs, compared
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        self.parent[self.find(a)] = self.find(b)
+
+    def groups(self):
+        grouped = {}
+        for item in self.parent:
+            grouped.setdefault(self.find(item), []).append(item)
+        return [members for members in grouped.values() if len(members) > 1]
+
+
+def find_duplicate_groups(collection, store, threshold=DEDUP_SIMILARITY):
+    """Cluster the collection into duplicate groups; returns (groups, stats)"""
+    start = time.perf_counter()
+    union = UnionFind()
+    evidence = {}
+
+    for kind, value, profile_ids in store.identity_groups():
+        for profile_id in profile_ids[1:]:
+            union.union(profile_ids[0], profile_id)
+        for profile_id in profile_ids:
+            evidence.setdefault(profile_id, set()).add(f"same {kind}")
+
+    ids, matrix = load_embeddings(collection)
+    loaded = time.perf_counter()
+    pairs, compared = similar_pairs(matrix, threshold) if len(ids) > 1 else ({}, 0)
+    best = {}
+    for (i, j), similarity in pairs.items():
+        union.union(ids[i], ids[j])
+        for profile_id in (ids[i], ids[j]):
+            evidence.setdefault(profile_id, set()).add("similar profile")
+            best[profile_id] = max(best.get(profile_id, 0.0), similarity)
+
+    groups = []
+    for members in union.groups():
+        profiles = store.get_many(members)
+        groups.append([
+            {"id": p["id"], "name": p["name"], "email": p["email"], "phone": p["phone"],
+             "created_at": p["created_at"], "reasons": sorted(evidence.get(p["id"], ())),
+             "max_similarity": round(best[p["id"]], 4) if p["id"] in best else None}
+            for p in sorted(profiles, key=lambda p: p["created_at"])
+        ])
+    groups.sort(key=len, reverse=True)
+
+    n = len(ids)
+    stats = {
+        "profiles": n,
+        "groups": len(groups),
+        "duplicate_profiles": sum(len(g) - 1 for g in groups),
+        "similar_pairs": len(pairs),
+        "comparisons": compared,
+        "all_pairs": n * (n - 1) // 2,
+        "load_seconds": round(loaded - start, 2),
+        "cluster_seconds": round(time.perf_counter() - loaded, 2)
+    }
+    return groups, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report near-duplicate user profiles")
+    parser.add_argument("--threshold", type=float, default=DEDUP_SIMILARITY)
+    parser.add_argument("--output", help="write groups as JSON")
+    args = parser.parse_args()
+
+    import chromadb
+    from profile_store import ProfileStore
+    from vector_index import get_collection
+
+    client = chromadb.PersistentClient(path="./vector_db")
+    collection = get_collection(client, "user_profiles")
+    store = ProfileStore()
+    store.sync(collection)
+
+    print(f"🔍 Looking for duplicate profiles (similarity ≥ {args.threshold})...")
+    groups, stats = find_duplicate_groups(collection, store, args.threshold)
+    print("=" * 60)
+    print(f"👥 {stats['profiles']} profiles, {stats['groups']} duplicate groups "
+          f"({stats['duplicate_profiles']} extra profiles)")
+    share = stats["comparisons"] / stats["all_pairs"] if stats["all_pairs"] else 0
+    print(f"⚡ {stats['comparisons']:,} similarity computations ({share:.2%} of all pairs), "
+          f"load {stats['load_seconds']}s, cluster {stats['cluster_seconds']}s")
+    print("=" * 60)
+    for group in groups[:20]:
+        print(f"• {len(group)} profiles:")
+        for member in group:
+            similarity = f" sim={member['max_similarity']}" if member["max_similarity"] else ""
+            print(f"    {member['id']}  {member['name']} <{member['email']}>  "
+                  f"[{', '.join(member['reasons'])}]{similarity}")
+    if len(groups) > 20:
+        print(f"... and {len(groups) - 20} more groups")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"stats": stats, "groups": groups}, f, indent=2)
+        print(f"💾 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Field-weighted multi-vector embeddings for user profiles
+
+A profile is embedded per field group rather than as one blob of text:
+  clinical     medical history and allergies
+  demographic  name, age, gender, address, phone and email
+Each group vector lives in its own collection (user_profiles_clinical,
+user_profiles_demographic) under the profile's id, with a hash of the
+text it was embedded from, so an update re-embeds only the groups whose
+text changed.
+
+The vector stored in user_profiles itself is the normalized weighted sum
+of the group vectors (default weights), so it costs no extra encoding and
+still serves single-query lookups such as duplicate checks. Searches fuse
+scores with per-query weights: candidates come from the fused index and
+from each weighted group index, and are ranked by
+  score = sum(weight[g] * cosine(query, vector[g])) / sum(weights)
+
+Configuration (environment variables):
+  PROFILE_WEIGHT_CLINICAL     default clinical weight (default 0.7)
+  PROFILE_WEIGHT_DEMOGRAPHIC  default demographic weight (default 0.3)
+
+Run (embeds the groups of profiles stored before this existed):
+  python profile_embeddings.py backfill
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from vector_index import get_collection, query_collection
+
+FIELD_GROUPS = {
+    "clinical": [("medical_history", "Medical History"), ("allergies", "Allergies")],
+    "demographic": [("name", "Name"), ("age", "Age"), ("gender", "Gender"), ("address", "Address"),
+                    ("phone", "Phone"), ("email", "Email")]
+}
+GROUP_COLLECTIONS = {group: f"user_profiles_{group}" for group in FIELD_GROUPS}
+EMBEDDED_FIELDS = {field for fields in FIELD_GROUPS.values() for field, _ in fields}
+DEFAULT_WEIGHTS = {
+    "clinical": float(os.getenv("PROFILE_WEIGHT_CLINICAL", "0.7")),
+    "demographic": float(os.getenv("PROFILE_WEIGHT_DEMOGRAPHIC", "0.3"))
+}
+CANDIDATE_FACTOR = 4  # candidates fetched per index for every result returned
+BACKFILL_PAGE = 256
+
+
+def group_text(profile_data, group):
+    """Text a field group is embedded from"""
+    return "\n".join(f"{label}: {profile_data.get(field, '')}" for field, label in FIELD_GROUPS[group])
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def fuse(group_vectors, weights=None):
+    """Normalized weighted sum of {group: (n, d) vectors}"""
+    weights = weights or DEFAULT_WEIGHTS
+    total = sum(weights.get(group, 0.0) * _normalize(np.asarray(vectors, dtype=np.float32))
+                for group, vectors in group_vectors.items())
+    return _normalize(total)
+
+
+def encode_groups(model, profiles, groups=None):
+    """{group: (n, d) float32} with one batched encode per group"""
+    encoded = {}
+    for group in groups or FIELD_GROUPS:
+        texts = [group_text(profile, group) for profile in profiles]
+        encoded[group] = _normalize(np.asarray(model.encode(texts, batch_size=64), dtype=np.float32))
+    return encoded
+
+
+class ProfileVectors:
+    """The per-group collections of the user_profiles vector store"""
+
+    def __init__(self, client):
+        self.collections = {group: get_collection(client, name) for group, name in GROUP_COLLECTIONS.items()}
+
+    def embed(self, profiles, model):
+        """(group_vectors, fused (n, d)) for new profiles"""
+        group_vectors = encode_groups(model, profiles)
+        return group_vectors, fuse(group_vectors)
+
+    def add(self, ids, profiles, group_vectors):
+        """Store group vectors from embed() for newly added profiles"""
+        for group, collection in self.collections.items():
+            collection.upsert(
+                ids=list(ids),
+                embeddings=group_vectors[group].tolist(),
+                metadatas=[{"hash": text_hash(group_text(p, group))} for p in profiles]
+            )
+
+    def update(self, profile_id, profile_data, model):
+        """
+        Re-embed only the groups whose text changed; returns
+        (fused vector, changed groups).
+        """
+        group_vectors = {}
+        changed = []
+        for group, collection in self.collections.items():
+            text = group_text(profile_data, group)
+            stored = collection.get(ids=[profile_id], include=["embeddings", "metadatas"])
+            if stored["ids"] and (stored["metadatas"][0] or {}).get("hash") == text_hash(text):
+                group_vectors[group] = np.asarray(stored["embeddings"][:1], dtype=np.float32)
+                continue
+            vector = _normalize(np.asarray(model.encode([text]), dtype=np.float32))
+            collection.upsert(ids=[profile_id], embeddings=vector.tolist(), metadatas=[{"hash": text_hash(text)}])
+            group_vectors[group] = vector
+            changed.append(group)
+        return fuse(group_vectors)[0], changed
+
+    def delete(self, ids):
+        for collection in self.collections.values():
+            collection.delete(ids=list(ids))
+
+    def fused_scores(self, query_embedding, ids, weights, fallback=None):
+        """
+        {id: weighted cosine score} for the given profiles. Profiles without
+        group vectors (stored before backfill) score through fallback,
+        their vectors in the main collection.
+        """
+        if not ids:
+            return {}
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+        total_weight = sum(weights.values()) or 1.0
+        scores = {profile_id: 0.0 for profile_id in ids}
+        missing = set()
+        for group, collection in self.collections.items():
+            weight = weights.get(group, 0.0)
+            if not weight:
+                continue
+            stored = collection.get(ids=list(ids), include=["embeddings"])
+            found = set(stored["ids"])
+            missing.update(profile_id for profile_id in ids if profile_id not in found)
+            if stored["ids"]:
+                sims = _normalize(np.asarray(stored["embeddings"], dtype=np.float32)) @ query
+                for profile_id, sim in zip(stored["ids"], sims):
+                    scores[profile_id] += weight * float(sim) / total_weight
+        if missing and fallback is not None:
+            stored = fallback.get(ids=list(missing), include=["embeddings"])
+            if stored["ids"]:
+                sims = _normalize(np.asarray(stored["embeddings"], dtype=np.float32)) @ query
+                for profile_id, sim in zip(stored["ids"], sims):
+                    scores[profile_id] = float(sim)
+        return scores
+
+    def search(self, main_collection, query_embedding, n_results, weights=None, ef=None):
+        """[(id, score)] best first, fusing group scores with the given weights"""
+        weights = weights or DEFAULT_WEIGHTS
+        total = main_collection.count()
+        if not total:
+            return []
+        fetch = min(max(n_results * CANDIDATE_FACTOR, ef or 0), total)
+        candidates = {}
+        sources = [main_collection] + [self.collections[g] for g, w in weights.items() if w and g in self.collections]
+        for collection in sources:
+            count = collection.count()
+            if not count:
+                continue
+            results = query_collection(collection, [list(map(float, query_embedding))], min(fetch, count),
+                                       include=["distances"])
+            candidates.update(dict.fromkeys(results["ids"][0]))
+        scores = self.fused_scores(query_embedding, list(candidates), weights, fallback=main_collection)
+        return sorted(scores.items(), key=lambda item: -item[1])[:n_results]
+
+
+def backfill(client, model, main_collection):
+    """Embed groups for profiles that have none and store their fused vectors; returns the count"""
+    vectors = ProfileVectors(client)
+    done = 0
+    total = main_collection.count()
+    for offset in range(0, total, BACKFILL_PAGE):
+        page = main_collection.get(limit=BACKFILL_PAGE, offset=offset, include=["documents"])
+        have = set(vectors.collections["clinical"].get(ids=page["ids"], include=[])["ids"])
+        todo = [(profile_id, document) for profile_id, document in zip(page["ids"], page["documents"])
+                if profile_id not in have]
+        if not todo:
+            continue
+        ids = [profile_id for profile_id, _ in todo]
+        profiles = []
+        for _, document in todo:
+            try:
+                profiles.append(json.loads(document) if document else {})
+            except ValueError:
+                profiles.append({})
+        group_vectors, fused = vectors.embed(profiles, model)
+        vectors.add(ids, profiles, group_vectors)
+        # Same ids and count, so paging offsets stay valid while vectors are replaced
+        main_collection.update(ids=ids, embeddings=fused.tolist())
+        done += len(ids)
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-field profile embeddings")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("backfill", help="embed field groups for profiles stored before they existed")
+    parser.parse_args()
+
+    import chromadb
+
+    client = chromadb.PersistentClient(path="./vector_db")
+    main_collection = get_collection(client, "user_profiles")
+    if os.getenv("EMBEDDING_BACKEND") == "stub":
+        from stub_backends import HashingEmbedder
+        model = HashingEmbedder()
+    else:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer('all-MiniLM-L6-v2')
+
+    print(f"🧬 Embedding field groups for {main_collection.count()} profiles...")
+    start = time.perf_counter()
+    done = backfill(client, model, main_collection)
+    print(f"✅ Backfilled {done} profiles in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
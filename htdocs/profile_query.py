@@ -0,0 +1,221 @@
+"""
+Structured profile search queries
+
+Splits a free-text profile search such as "male patients in their 30s
+allergic to peanuts with diabetes" into structured predicates (age range,
+gender, allergy terms) and the free-text remainder ("diabetes"). The
+predicates are answered exactly by the SQLite side store; only the
+remainder needs an embedding and a nearest-neighbour search, and only
+over the profiles the predicates allow.
+
+Run:
+  python profile_query.py "women over 60 allergic to penicillin"
+"""
+
+import re
+import sys
+
+# Words that say who the query is about rather than what it is about
+FILLER_WORDS = {
+    "a", "all", "an", "and", "any", "are", "aged", "age", "ages", "find", "for", "from", "has", "have",
+    "having", "in", "is", "list", "me", "of", "old", "or", "patient", "patients", "people", "person",
+    "persons", "profile", "profiles", "show", "the", "their", "them", "those", "to", "user", "users",
+    "who", "whose", "with", "year", "years"
+}
+
+GENDER_WORDS = {
+    "male": "Male", "males": "Male", "man": "Male", "men": "Male", "boy": "Male", "boys": "Male",
+    "female": "Female", "females": "Female", "woman": "Female", "women": "Female", "girl": "Female",
+    "girls": "Female", "non-binary": "Other", "nonbinary": "Other"
+}
+
+# A bare number right after one of these is read as an age ("women over 60")
+PERSON_WORDS = set(GENDER_WORDS) | {
+    "adult", "adults", "patient", "patients", "people", "person", "persons", "profile", "profiles",
+    "user", "users", "those", "anyone", "someone"
+}
+# Words inside a numeric match that make it an age whatever precedes it
+AGE_CONTEXT = re.compile(r"\b(?:aged?|ages|old|older|younger|their|his|her)\b")
+# An age word after one of these describes someone else ("has 2 kids", "with children")
+AGE_WORD_OWNERS = {"has", "have", "having", "with", "their", "his", "her", "my", "own", "no", "without"}
+
+# Age words -> (min, max), inclusive; None means open-ended
+AGE_WORDS = {
+    r"\b(?:babies|baby|infants?)\b": (0, 1),
+    r"\b(?:children|child|kids?)\b": (0, 12),
+    r"\b(?:teenagers?|teens?|adolescents?)\b": (13, 19),
+    r"\badults?\b": (18, None),
+    r"\b(?:elderly|seniors?|older adults)\b": (65, None)
+}
+
+# Numbers only become ages with age context (see _age_context); "headache
+# for 2 to 3 days" and "BMI over 30" stay in the free-text remainder
+AGE_PATTERNS = [
+    # "in their 30s", "aged 30s"
+    (re.compile(r"\b(?:in (?:their|his|her) |aged? )?(\d)0'?s\b"), lambda m: (int(m[1]) * 10, int(m[1]) * 10 + 9)),
+    # "aged 30-40", "ages 30 to 40", "between 30 and 40 years old"
+    (re.compile(r"\b(?:(?:aged?|ages) )?(?:between )?(\d{1,3}) ?(?:-|to|and) ?(\d{1,3})(?: ?(?:years?|yrs?) old)?\b"),
+     lambda m: (min(int(m[1]), int(m[2])), max(int(m[1]), int(m[2])))),
+    # "over 60", "older than 60", "at least 60 years old"
+    (re.compile(r"\b(?:over|above|older than|at least|more than) (\d{1,3})(?: ?(?:years?|yrs?) old)?\b"),
+     lambda m: (int(m[1]) + (0 if "least" in m[0] else 1), None)),
+    # "60+", "60 and older"
+    (re.compile(r"\b(\d{1,3}) ?\+|\b(\d{1,3}) (?:and|or) (?:over|older|above)\b"),
+     lambda m: (int(m[1] or m[2]), None)),
+    # "under 18", "younger than 18", "at most 18 years old"
+    (re.compile(r"\b(?:under|below|younger than|at most|less than) (\d{1,3})(?: ?(?:years?|yrs?) old)?\b"),
+     lambda m: (0, int(m[1]) - (0 if "most" in m[0] else 1))),
+    # "aged 45", "age 45", "45 years old", "45-year-old"
+    (re.compile(r"\b(?:aged?:? (\d{1,3})|(\d{1,3})[ -]years?[ -]old)\b"),
+     lambda m: (int(m[1] or m[2]), int(m[1] or m[2])))
+]
+
+ALLERGY_PATTERNS = [
+    # "allergic to peanuts and shellfish", "allergy to penicillin"
+    re.compile(r"\b(?:allergic|allergies|allergy|sensitive) to ([\w\s,-]+?)(?=\s+(?:with|who|in|aged?|and (?:has|have|who|with))\b|[.;]|$)"),
+    # "peanut allergy", "penicillin allergies"
+    re.compile(r"\b([\w-]+) allerg(?:y|ies)\b")
+]
+ALLERGY_SPLIT = re.compile(r"\s*(?:,|\band\b|\bor\b|&)\s*")
+# Words that describe allergies rather than name an allergen ("food allergies")
+ALLERGY_STOP_WORDS = {
+    "known", "food", "foods", "any", "seasonal", "drug", "drugs", "medication", "medications", "other",
+    "multiple", "many", "several", "some", "severe", "mild", "environmental", "skin", "no", "nut", "nuts"
+}
+NEGATIONS = {"no", "not", "without", "denies", "deny", "never", "nkda", "non"}
+WORD = re.compile(r"[\w'-]+")
+
+
+def _preceding_words(match, count=1):
+    return WORD.findall(match.string[:match.start()])[-count:]
+
+
+def _next_word(match):
+    following = WORD.findall(match.string[match.end():])
+    return following[0] if following else ""
+
+
+def _age_context(match):
+    """A numeric match is an age only if it says so or sits next to a word for a person"""
+    if AGE_CONTEXT.search(match[0]):
+        return True
+    return bool(PERSON_WORDS.intersection(_preceding_words(match))) or _next_word(match) in PERSON_WORDS
+
+
+def _describes_someone(match):
+    """An age word that belongs to the person searched for, not to their family"""
+    previous = _preceding_words(match)
+    return not previous or not (previous[0] in AGE_WORD_OWNERS or previous[0].isdigit())
+
+
+def _remove(text, spans):
+    for start, end in sorted(spans, reverse=True):
+        text = text[:start] + " " + text[end:]
+    return text
+
+
+class ProfileQuery:
+    """Structured predicates plus the free-text remainder of a search"""
+
+    def __init__(self, text):
+        self.text = text
+        self.age_min = None
+        self.age_max = None
+        self.gender = None
+        self.allergies = []
+        self.remainder = ""
+
+    @property
+    def has_filters(self):
+        return self.age_min is not None or self.age_max is not None or bool(self.gender) or bool(self.allergies)
+
+    def describe(self):
+        """Human-readable summary of the extracted filters"""
+        parts = []
+        if self.gender:
+            parts.append(f"gender = {self.gender}")
+        if self.age_min is not None or self.age_max is not None:
+            if self.age_max is None:
+                parts.append(f"age ≥ {self.age_min}")
+            elif not self.age_min:
+                parts.append(f"age ≤ {self.age_max}")
+            elif self.age_min == self.age_max:
+                parts.append(f"age {self.age_min}")
+            else:
+                parts.append(f"age {self.age_min}–{self.age_max}")
+        if self.allergies:
+            parts.append("allergic to " + ", ".join(self.allergies))
+        return "; ".join(parts)
+
+    def __repr__(self):
+        return (f"ProfileQuery(age_min={self.age_min!r}, age_max={self.age_max!r}, gender={self.gender!r}, "
+                f"allergies={self.allergies!r}, remainder={self.remainder!r})")
+
+
+def parse_profile_query(text):
+    """
+    Extract age range, gender and allergy predicates from a search query.
+
+    Only unambiguous phrases become filters; anything else stays in the
+    remainder for the vector search, so no profile is dropped by a guess.
+    """
+    query = ProfileQuery(text)
+    rest = " " + (text or "").lower() + " "
+
+    for pattern in ALLERGY_PATTERNS:
+        spans = []
+        for match in pattern.finditer(rest):
+            if NEGATIONS.intersection(_preceding_words(match, 2)) or match[0].startswith("non"):
+                continue  # "no known allergies", "not allergic to latex"
+            terms = []
+            for term in ALLERGY_SPLIT.split(match[1]):
+                term = " ".join(word for word in WORD.findall(term) if word not in FILLER_WORDS)
+                if term and term not in ALLERGY_STOP_WORDS:
+                    terms.append(term)
+            if not terms:
+                continue  # "food allergies", "with allergies": nothing to filter on
+            query.allergies.extend(term for term in terms if term not in query.allergies)
+            spans.append(match.span())
+        rest = _remove(rest, spans)
+
+    for pattern, bounds in AGE_PATTERNS:
+        match = next((m for m in pattern.finditer(rest) if _age_context(m)), None)
+        if match:
+            age_min, age_max = bounds(match)
+            query.age_min, query.age_max = max(age_min, 0), age_max
+            rest = _remove(rest, [match.span()])
+            break
+    else:
+        for pattern, (age_min, age_max) in AGE_WORDS.items():
+            match = next((m for m in re.finditer(pattern, rest) if _describes_someone(m)), None)
+            if match:
+                query.age_min, query.age_max = age_min, age_max
+                rest = _remove(rest, [match.span()])
+                break
+
+    genders = set()
+    words = []
+    for word in WORD.findall(rest):
+        if word in GENDER_WORDS:
+            genders.add(GENDER_WORDS[word])
+        elif word not in FILLER_WORDS:
+            words.append(word)
+    # "men and women with asthma" asks about everyone
+    query.gender = genders.pop() if len(genders) == 1 else None
+    query.remainder = " ".join(words)
+    return query
+
+
+if __name__ == "__main__":
+    examples = sys.argv[1:] or [
+        "male patients with diabetes",
+        "people allergic to peanuts",
+        "users in their 30s",
+        "women over 60 with hypertension allergic to penicillin and sulfa",
+        "teenagers with asthma"
+    ]
+    for example in examples:
+        parsed = parse_profile_query(example)
+        print(f"🔎 {example!r}")
+        print(f"   filters:   {parsed.describe() or '(none)'}")
+        print(f"   remainder: {parsed.remainder or '(none)'}")
@@ -0,0 +1,117 @@
+"""
+Profile record helpers shared by profile_vector_app.py and the bulk tools
+
+One place decides which fields go into Chroma metadata, what a valid
+profile looks like and which fields identify a person, so profiles
+created from the form and from a bulk import are indistinguishable.
+(The embedded text is built per field group in profile_embeddings.py;
+'notes' is staff-only text that is stored but never embedded.)
+"""
+
+import re
+from datetime import datetime
+
+PROFILE_INPUT_FIELDS = ["name", "email", "phone", "age", "gender", "address", "medical_history", "allergies", "notes"]
+GENDERS = ["", "Male", "Female", "Other"]
+REQUIRED_FIELDS = ["name", "email"]
+PHONE_DIGITS = 10  # compare the trailing digits so country prefixes do not matter
+
+
+def profile_metadata(profile_data, created_at=None):
+    """Chroma metadata for a profile (values must be str/int/float/bool)"""
+    return {
+        "name": profile_data.get('name', ''),
+        "age": str(profile_data.get('age', '')),
+        "gender": profile_data.get('gender', ''),
+        "email": profile_data.get('email', ''),
+        "phone": profile_data.get('phone', ''),
+        "address": profile_data.get('address', ''),
+        "created_at": created_at or datetime.now().isoformat()
+    }
+
+
+def validate_profile(record):
+    """
+    Normalize an imported record into profile_data.
+
+    Raises ValueError describing the first problem found.
+    """
+    profile_data = {}
+    for field in PROFILE_INPUT_FIELDS:
+        value = record.get(field)
+        profile_data[field] = "" if value is None else str(value).strip()
+
+    missing = [field for field in REQUIRED_FIELDS if not profile_data[field]]
+    if missing:
+        raise ValueError(f"Missing required field(s): {', '.join(missing)}")
+
+    if profile_data["age"]:
+        try:
+            age = int(float(profile_data["age"]))
+        except ValueError:
+            raise ValueError(f"Invalid age: {profile_data['age']!r}")
+        if not 0 <= age <= 120:
+            raise ValueError(f"Age out of range: {age}")
+        profile_data["age"] = age
+
+    gender = {g.lower(): g for g in GENDERS}.get(profile_data["gender"].lower())
+    if gender is None:
+        raise ValueError(f"Invalid gender: {profile_data['gender']!r} (use {', '.join(g for g in GENDERS if g)})")
+    profile_data["gender"] = gender
+
+    created_at = str(record.get("created_at") or "").strip()
+    if created_at:
+        try:
+            datetime.fromisoformat(created_at)
+        except ValueError:
+            raise ValueError(f"Invalid created_at: {created_at!r}")
+    profile_data["created_at"] = created_at or datetime.now().isoformat()
+    return profile_data
+
+
+def normalize_email(email):
+    """Lower-cased email with surrounding whitespace removed ('' if absent)"""
+    return str(email or "").strip().lower()
+
+
+def normalize_phone(phone):
+    """Trailing digits of a phone number ('' if too short to identify anyone)"""
+    digits = re.sub(r"\D", "", str(phone or ""))
+    return digits[-PHONE_DIGITS:] if len(digits) >= 7 else ""
+
+
+def identity_keys(profile_data):
+    """(kind, value) pairs that identify the same person exactly"""
+    keys = []
+    email = normalize_email(profile_data.get("email"))
+    if email:
+        keys.append(("email", email))
+    phone = normalize_phone(profile_data.get("phone"))
+    if phone:
+        keys.append(("phone", phone))
+    return keys
+
+
+def age_input_value(age):
+    """Stored age as a form value: an int, or None so the field stays blank"""
+    if age is None or str(age).strip() == "":
+        return None
+    return int(float(age))
+
+
+def age_from_input(value):
+    """Form value back to profile_data['age']; a blank field means no age ('')"""
+    return "" if value is None else int(value)
+
+
+def _comparable(value):
+    return "" if value is None else str(value).strip()
+
+
+def diff_profiles(old, new, fields=PROFILE_INPUT_FIELDS):
+    """{field: {"old": ..., "new": ...}} for fields whose values differ"""
+    return {
+        field: {"old": old.get(field), "new": new.get(field)}
+        for field in fields
+        if field in new and _comparable(old.get(field)) != _comparable(new.get(field))
+    }
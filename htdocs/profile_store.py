@@ -0,0 +1,462 @@
+"""
+SQLite side store for the user_profiles collection
+
+Chroma is good at nearest-neighbour search but every count, chart or
+listing over it means pulling all documents (and embeddings) into the
+app. This store keeps one row per profile plus aggregates that triggers
+update on every insert and delete, so dashboards read a handful of rows
+no matter how many profiles exist. An external-content FTS5 index over
+the text fields backs the paginated profile browser, and profile_keys
+maps normalized emails and phone numbers to profiles for exact duplicate
+checks. profile_audit records every create, update and delete with the
+fields that changed.
+
+The collection stays the source of truth: sync() rebuilds the store from
+the collection's documents (never its embeddings) when the two disagree,
+e.g. on first start or after a failed write.
+
+Configuration (environment variables):
+  PROFILE_DB_PATH   SQLite file (default profiles.db)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from fts_query import build_match_query
+from profile_records import identity_keys
+
+PROFILE_DB_PATH = os.getenv("PROFILE_DB_PATH", "profiles.db")
+
+PROFILE_FIELDS = ["name", "email", "phone", "age", "gender", "address", "medical_history", "allergies", "notes",
+                  "created_at"]
+SEARCH_FIELDS = ["name", "email", "phone", "gender", "address", "medical_history", "allergies"]
+SYNC_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    phone TEXT,
+    age INTEGER,
+    gender TEXT,
+    address TEXT,
+    medical_history TEXT,
+    allergies TEXT,
+    notes TEXT,
+    created_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_profiles_age ON profiles (age);
+CREATE INDEX IF NOT EXISTS idx_profiles_created ON profiles (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_profiles_gender_created ON profiles (gender, created_at, id);
+
+CREATE TABLE IF NOT EXISTS profile_aggregates (
+    kind TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, bucket)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS profile_keys (
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (kind, value, id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_profile_keys_id ON profile_keys (id);
+
+CREATE TRIGGER IF NOT EXISTS profiles_keys_ad AFTER DELETE ON profiles BEGIN
+    DELETE FROM profile_keys WHERE id = OLD.id;
+END;
+
+CREATE TABLE IF NOT EXISTS profile_audit (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    profile_id TEXT NOT NULL,
+    action TEXT NOT NULL,
+    changes TEXT,
+    reembedded TEXT,
+    changed_by TEXT,
+    changed_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_profile_audit_profile ON profile_audit (profile_id, id);
+"""
+
+# (kind, bucket expression over NEW/OLD, amount expression)
+AGGREGATES = [
+    ("total", "'all'", "1"),
+    ("age", "CASE WHEN {row}.age IS NULL THEN 'unknown' "
+            "ELSE printf('%d-%d', ({row}.age / 10) * 10, ({row}.age / 10) * 10 + 9) END", "1"),
+    ("gender", "COALESCE(NULLIF({row}.gender, ''), 'Unknown')", "1"),
+    ("created", "COALESCE(NULLIF(substr({row}.created_at, 1, 10), ''), 'unknown')", "1"),
+    ("age_total", "'sum'", "COALESCE({row}.age, 0)"),
+    ("age_total", "'count'", "({row}.age IS NOT NULL)")
+]
+
+
+def _trigger_sql():
+    inserts = "\n".join(
+        f"INSERT INTO profile_aggregates (kind, bucket, count) VALUES ('{kind}', {bucket.format(row='NEW')}, "
+        f"{amount.format(row='NEW')}) ON CONFLICT (kind, bucket) DO UPDATE SET count = count + excluded.count;"
+        for kind, bucket, amount in AGGREGATES
+    )
+    deletes = "\n".join(
+        f"UPDATE profile_aggregates SET count = count - {amount.format(row='OLD')} "
+        f"WHERE kind = '{kind}' AND bucket = {bucket.format(row='OLD')};"
+        for kind, bucket, amount in AGGREGATES
+    )
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS profiles_aggregates_ai AFTER INSERT ON profiles BEGIN
+        {inserts}
+        END;
+        CREATE TRIGGER IF NOT EXISTS profiles_aggregates_ad AFTER DELETE ON profiles BEGIN
+        {deletes}
+        END;
+    """
+
+
+def _fts_sql():
+    """External-content FTS5 index over the profile text fields, kept in sync by triggers"""
+    columns = ", ".join(SEARCH_FIELDS)
+    new_values = ", ".join(f"new.{field}" for field in SEARCH_FIELDS)
+    old_values = ", ".join(f"old.{field}" for field in SEARCH_FIELDS)
+    return f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS profiles_fts USING fts5(
+            {columns},
+            content='profiles', content_rowid='rowid',
+            tokenize='porter unicode61 remove_diacritics 2'
+        );
+        CREATE TRIGGER IF NOT EXISTS profiles_fts_ai AFTER INSERT ON profiles BEGIN
+            INSERT INTO profiles_fts (rowid, {columns}) VALUES (new.rowid, {new_values});
+        END;
+        CREATE TRIGGER IF NOT EXISTS profiles_fts_ad AFTER DELETE ON profiles BEGIN
+            INSERT INTO profiles_fts (profiles_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+        END;
+    """
+
+
+def filter_match_query(text):
+    """FTS5 query for the browser filter box; the last word is a prefix so results follow typing"""
+    text = (text or "").strip()
+    if text and not text.endswith("*") and text[-1].isalnum():
+        text += "*"
+    return build_match_query(text)
+
+
+def parse_age(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def profile_row(profile_id, profile_data, created_at=None):
+    """Row tuple (id, *PROFILE_FIELDS) for a profile dict"""
+    values = [profile_id]
+    for field in PROFILE_FIELDS:
+        value = profile_data.get(field)
+        if field == "age":
+            value = parse_age(value)
+        elif field == "created_at":
+            # Never NULL so the (created_at, id) keyset ordering stays on the index
+            value = created_at or value or ""
+        elif value is not None:
+            value = str(value)
+        values.append(value)
+    return tuple(values)
+
+
+class ProfileStore:
+    def __init__(self, path=PROFILE_DB_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.executescript(SCHEMA)
+            columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(profiles)")}
+            if "notes" not in columns:
+                # Stores created before notes were editable
+                with self.conn:
+                    self.conn.execute("ALTER TABLE profiles ADD COLUMN notes TEXT")
+            self.conn.executescript(_trigger_sql())
+            has_fts = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'profiles_fts'"
+            ).fetchone()
+            self.conn.executescript(_fts_sql())
+            if not has_fts:
+                # Index rows stored before the search index existed
+                with self.conn:
+                    self.conn.execute("INSERT INTO profiles_fts (profiles_fts) VALUES ('rebuild')")
+            if not self.conn.execute("SELECT 1 FROM profile_keys LIMIT 1").fetchone():
+                # Key profiles stored before the duplicate index existed
+                with self.conn:
+                    rows = self.conn.execute("SELECT id, email, phone FROM profiles").fetchall()
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO profile_keys (kind, value, id) VALUES (?, ?, ?)",
+                        [(kind, value, row["id"]) for row in rows for kind, value in identity_keys(dict(row))]
+                    )
+
+    def add(self, profile_id, profile_data, created_at=None):
+        self.add_many([profile_row(profile_id, profile_data, created_at)])
+
+    def add_many(self, rows):
+        """Insert (or replace) row tuples from profile_row()"""
+        columns = ", ".join(["id"] + PROFILE_FIELDS)
+        placeholders = ", ".join("?" for _ in range(len(PROFILE_FIELDS) + 1))
+        ids = [row[0] for row in rows]
+        with self.lock, self.conn:
+            # Delete first so the aggregate triggers see replacements as -1/+1
+            self.conn.executemany("DELETE FROM profiles WHERE id = ?", [(i,) for i in ids])
+            self.conn.executemany(f"INSERT INTO profiles ({columns}) VALUES ({placeholders})", rows)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO profile_keys (kind, value, id) VALUES (?, ?, ?)",
+                [(kind, value, row[0]) for row in rows
+                 for kind, value in identity_keys(dict(zip(["id"] + PROFILE_FIELDS, row)))]
+            )
+
+    def delete(self, profile_id):
+        self.delete_many([profile_id])
+
+    def delete_many(self, profile_ids):
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM profiles WHERE id = ?", [(i,) for i in profile_ids])
+
+    def count(self):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT count FROM profile_aggregates WHERE kind = 'total' AND bucket = 'all'"
+            ).fetchone()
+        return row[0] if row else 0
+
+    def _filter(self, text=None, gender=None, age_min=None, age_max=None, allergies=()):
+        """WHERE clauses and parameters for browser and structured search filters"""
+        clauses = []
+        params = []
+        matches = []
+        if text and text.strip():
+            matches.append(f"({filter_match_query(text)})")
+        for term in allergies or ():
+            matches.append(f"allergies : ({build_match_query(term)})")
+        if matches:
+            # The subquery is evaluated once, so SQLite never probes the index row by row
+            clauses.append("p.rowid IN (SELECT rowid FROM profiles_fts WHERE profiles_fts MATCH ?)")
+            params.append(" AND ".join(matches))
+        if gender:
+            clauses.append("p.gender = ?")
+            params.append(gender)
+        if age_min is not None:
+            clauses.append("p.age >= ?")
+            params.append(age_min)
+        if age_max is not None:
+            clauses.append("p.age <= ?")
+            params.append(age_max)
+        return clauses, params
+
+    def filter_ids(self, limit=None, **filters):
+        """Ids of profiles matching structured filters (gender, age_min, age_max, allergies), newest first"""
+        clauses, params = self._filter(**filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT p.id FROM profiles p {where} ORDER BY p.created_at DESC, p.id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self.lock:
+            return [row[0] for row in self.conn.execute(sql, params)]
+
+    def matching_ids(self, profile_ids, **filters):
+        """The subset of profile_ids that satisfies the structured filters"""
+        if not profile_ids:
+            return set()
+        clauses, params = self._filter(**filters)
+        clauses.append(f"p.id IN ({', '.join('?' for _ in profile_ids)})")
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT p.id FROM profiles p WHERE {' AND '.join(clauses)}", params + list(profile_ids)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def find_by_identity(self, profile_data):
+        """{profile_id: [matching key kinds]} for stored profiles with the same email or phone"""
+        keys = identity_keys(profile_data)
+        if not keys:
+            return {}
+        where = " OR ".join("(kind = ? AND value = ?)" for _ in keys)
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT id, kind FROM profile_keys WHERE {where}", [part for key in keys for part in key]
+            ).fetchall()
+        matches = {}
+        for profile_id, kind in rows:
+            matches.setdefault(profile_id, []).append(kind)
+        return matches
+
+    def identity_groups(self):
+        """Lists of profile ids sharing a normalized email or phone, with the shared key"""
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT kind, value, group_concat(id, char(31)) FROM profile_keys
+                GROUP BY kind, value HAVING COUNT(*) > 1
+            """).fetchall()
+        return [(kind, value, ids.split("\x1f")) for kind, value, ids in rows]
+
+    def record_audit(self, profile_id, action, changes=None, reembedded=(), changed_by=None):
+        """Append an audit entry; changes maps field -> {"old": ..., "new": ...}"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                """INSERT INTO profile_audit (profile_id, action, changes, reembedded, changed_by, changed_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (profile_id, action, json.dumps(changes) if changes else None,
+                 ",".join(reembedded) or None, changed_by, datetime.now().isoformat())
+            )
+
+    def record_audit_many(self, profile_ids, action, reembedded=(), changed_by=None):
+        """One audit entry per profile in a single transaction, e.g. for a bulk import batch"""
+        changed_at = datetime.now().isoformat()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                """INSERT INTO profile_audit (profile_id, action, changes, reembedded, changed_by, changed_at)
+                   VALUES (?, ?, NULL, ?, ?, ?)""",
+                [(profile_id, action, ",".join(reembedded) or None, changed_by, changed_at)
+                 for profile_id in profile_ids]
+            )
+
+    def audit_history(self, profile_id, limit=50):
+        """Audit entries for a profile, newest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                """SELECT action, changes, reembedded, changed_by, changed_at FROM profile_audit
+                   WHERE profile_id = ? ORDER BY id DESC LIMIT ?""",
+                (profile_id, limit)
+            ).fetchall()
+        history = []
+        for row in rows:
+            entry = dict(row)
+            entry["changes"] = json.loads(entry["changes"]) if entry["changes"] else {}
+            entry["reembedded"] = entry["reembedded"].split(",") if entry["reembedded"] else []
+            history.append(entry)
+        return history
+
+    def get_many(self, profile_ids):
+        """Stored profiles as dicts, in the order of profile_ids"""
+        if not profile_ids:
+            return []
+        columns = ", ".join(["id"] + PROFILE_FIELDS)
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {columns} FROM profiles WHERE id IN ({', '.join('?' for _ in profile_ids)})",
+                list(profile_ids)
+            ).fetchall()
+        by_id = {row["id"]: dict(row) for row in rows}
+        return [by_id[profile_id] for profile_id in profile_ids if profile_id in by_id]
+
+    def browse(self, text=None, gender=None, limit=25, after=None):
+        """
+        One page of profiles, newest first, optionally filtered by full-text
+        terms and gender.
+
+        after is the (created_at, id) key of the previous page's last row.
+        Returns (rows, next_key); next_key is None on the last page. Raises
+        ValueError for a filter with no searchable words.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        clauses, params = self._filter(text, gender)
+        if after:
+            # Row-value comparison lets SQLite seek straight into the index
+            clauses.append("(p.created_at, p.id) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        columns = ", ".join(["p.id"] + [f"p.{field}" for field in PROFILE_FIELDS])
+        with self.lock:
+            rows = self.conn.execute(f"""
+                SELECT {columns} FROM profiles p
+                {where}
+                ORDER BY p.created_at DESC, p.id DESC
+                LIMIT ?
+            """, params + [limit + 1]).fetchall()
+
+        rows = [dict(row) for row in rows]
+        next_key = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_key = (rows[-1]["created_at"], rows[-1]["id"])
+        return rows, next_key
+
+    def count_matching(self, text=None, gender=None, **filters):
+        """Number of profiles a browser or structured filter selects"""
+        if not (text and text.strip()) and not any(value for value in filters.values() if value is not None):
+            if not gender:
+                return self.count()
+            return self.stats()["genders"].get(gender, 0)
+        clauses, params = self._filter(text, gender, **filters)
+        with self.lock:
+            return self.conn.execute(
+                f"SELECT COUNT(*) FROM profiles p WHERE {' AND '.join(clauses)}", params
+            ).fetchone()[0]
+
+    def stats(self):
+        """Aggregates for the dashboard; constant work regardless of profile count"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT kind, bucket, count FROM profile_aggregates WHERE count != 0"
+            ).fetchall()
+            age_range = self.conn.execute("SELECT MIN(age), MAX(age) FROM profiles").fetchone()
+
+        grouped = {}
+        for kind, bucket, count in rows:
+            grouped.setdefault(kind, {})[bucket] = count
+
+        age_total = grouped.get("age_total", {})
+        age_count = age_total.get("count", 0)
+        age_histogram = grouped.get("age", {})
+        return {
+            "total": grouped.get("total", {}).get("all", 0),
+            "age_histogram": dict(sorted(age_histogram.items(), key=lambda item: _bucket_start(item[0]))),
+            "genders": dict(sorted(grouped.get("gender", {}).items(), key=lambda item: -item[1])),
+            "timeline": dict(sorted(grouped.get("created", {}).items())),
+            "average_age": age_total.get("sum", 0) / age_count if age_count else None,
+            "min_age": age_range[0],
+            "max_age": age_range[1]
+        }
+
+    def sync(self, collection, force=False):
+        """Rebuild from the collection if the row counts differ; returns True if rebuilt"""
+        if not force and collection.count() == self.count():
+            return False
+
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM profiles")
+            self.conn.execute("DELETE FROM profile_aggregates")
+
+        total = collection.count()
+        for offset in range(0, total, SYNC_PAGE_SIZE):
+            page = collection.get(limit=SYNC_PAGE_SIZE, offset=offset, include=["documents", "metadatas"])
+            rows = []
+            for profile_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                try:
+                    profile_data = json.loads(document) if document else {}
+                except ValueError:
+                    profile_data = {}
+                metadata = metadata or {}
+                rows.append(profile_row(profile_id, {**metadata, **profile_data}, metadata.get("created_at")))
+            if rows:
+                self.add_many(rows)
+        return True
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def _bucket_start(bucket):
+    try:
+        return int(bucket.split("-")[0])
+    except ValueError:
+        return 10 ** 6  # 'unknown' last
@@ -6,9 +6,23 @@ import numpy as np
 from sentence_transformers import SentenceTransformer
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 from datetime import datetime
 import uuid
 import json
+import os
+import tempfile
+
+from vector_index import get_collection, query_collection, MAX_EF
+from profile_store import ProfileStore
+from profile_query import parse_profile_query
+from profile_records import GENDERS, age_from_input, age_input_value, diff_profiles, profile_metadata
+from profile_embeddings import DEFAULT_WEIGHTS, EMBEDDED_FIELDS, ProfileVectors
+import profile_bulk
+from profile_dedup import check_new_profile
+
+# Filtered searches with at most this many candidates are ranked exactly in-process
+EXACT_RERANK_LIMIT = int(os.getenv("PROFILE_EXACT_RERANK_LIMIT", "2000"))
 
 # Page configuration
 st.set_page_config(
@@ -23,6 +37,14 @@ if 'current_profile_id' not in st.session_state:
     st.session_state.current_profile_id = None
 if 'profiles' not in st.session_state:
     st.session_state.profiles = []
+if 'profile_pages' not in st.session_state:
+    st.session_state.profile_pages = {}
+if 'profile_page' not in st.session_state:
+    st.session_state.profile_page = 0
+if 'editing_profile' not in st.session_state:
+    st.session_state.editing_profile = None
+if 'profile_notice' not in st.session_state:
+    st.session_state.profile_notice = None
 
 @st.cache_resource
 def init_vector_db():
@@ -31,16 +53,33 @@ def init_vector_db():
         # Create ChromaDB client with persistent storage
         client = chromadb.PersistentClient(path="./vector_db")
         
-        # Create or get collection for profiles
-        collection = client.get_or_create_collection(
-            name="user_profiles",
-            metadata={"hnsw:space": "cosine"}
-        )
+        # Create or get collection for profiles (HNSW parameters are configured in vector_index.py)
+        collection = get_collection(client, "user_profiles")
         return client, collection
     except Exception as e:
         st.error(f"Error initializing vector database: {str(e)}")
         return None, None
 
+@st.cache_resource
+def init_profile_store(_collection):
+    """Open the SQLite side store and bring it in line with the collection"""
+    try:
+        store = ProfileStore()
+        store.sync(_collection)
+        return store
+    except Exception as e:
+        st.error(f"Error initializing profile store: {str(e)}")
+        return None
+
+@st.cache_resource
+def init_profile_vectors(_client):
+    """Open the per-field (clinical / demographic) vector collections"""
+    try:
+        return ProfileVectors(_client)
+    except Exception as e:
+        st.error(f"Error initializing field vector collections: {str(e)}")
+        return None
+
 @st.cache_resource
 def init_embedding_model():
     """Initialize sentence transformer model for embeddings"""
@@ -51,40 +90,20 @@ def init_embedding_model():
         st.error(f"Error loading embedding model: {str(e)}")
         return None
 
-def create_profile_embedding(profile_data, model):
-    """Create vector embedding from profile data"""
-    # Combine profile information into a single text
-    profile_text = f"""
-    Name: {profile_data.get('name', '')}
-    Age: {profile_data.get('age', '')}
-    Gender: {profile_data.get('gender', '')}
-    Medical History: {profile_data.get('medical_history', '')}
-    Allergies: {profile_data.get('allergies', '')}
-    Address: {profile_data.get('address', '')}
-    Phone: {profile_data.get('phone', '')}
-    Email: {profile_data.get('email', '')}
-    """
-    
-    # Generate embedding
-    embedding = model.encode(profile_text).tolist()
-    return embedding
+def create_profile_embedding(profile_data, model, vectors):
+    """Create per-field vectors and the fused profile embedding"""
+    # Clinical and demographic fields are embedded separately, then combined with the default weights
+    group_vectors, fused = vectors.embed([profile_data], model)
+    return group_vectors, fused[0].tolist()
 
-def add_profile_to_vector_db(profile_data, collection, model):
+def add_profile_to_vector_db(profile_data, collection, model, store, vectors, embedded=None):
     """Add profile to vector database"""
     try:
         profile_id = str(uuid.uuid4())
-        embedding = create_profile_embedding(profile_data, model)
+        group_vectors, embedding = embedded or create_profile_embedding(profile_data, model, vectors)
         
         # Prepare metadata
-        metadata = {
-            "name": profile_data.get('name', ''),
-            "age": str(profile_data.get('age', '')),
-            "gender": profile_data.get('gender', ''),
-            "email": profile_data.get('email', ''),
-            "phone": profile_data.get('phone', ''),
-            "address": profile_data.get('address', ''),
-            "created_at": datetime.now().isoformat()
-        }
+        metadata = profile_metadata(profile_data)
         
         # Add to collection
         collection.add(
@@ -93,87 +112,183 @@ def add_profile_to_vector_db(profile_data, collection, model):
             metadatas=[metadata],
             ids=[profile_id]
         )
+        vectors.add([profile_id], [profile_data], group_vectors)
+        store.add(profile_id, profile_data, metadata["created_at"])
+        store.record_audit(profile_id, "create", reembedded=list(group_vectors))
         
         return profile_id
     except Exception as e:
         st.error(f"Error adding profile to vector database: {str(e)}")
         return None
 
-def search_similar_profiles(query_text, collection, model, n_results=5):
-    """Search for similar profiles using vector similarity"""
+def search_similar_profiles(query_text, collection, model, vectors, n_results=5, ef=None, weights=None):
+    """Search for similar profiles, fusing clinical and demographic similarity with the given weights"""
     try:
         # Create embedding for search query
         query_embedding = model.encode(query_text).tolist()
         
-        # Search in vector database
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results,
-            include=["documents", "metadatas", "distances"]
-        )
+        # Candidates from the fused and per-field indexes (ef widens each HNSW search), ranked by weighted score
+        hits = vectors.search(collection, query_embedding, n_results, weights, ef=ef)
+        if not hits:
+            return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
         
-        return results
+        found = collection.get(ids=[profile_id for profile_id, _ in hits], include=["documents", "metadatas"])
+        by_id = {profile_id: (document, metadata) for profile_id, document, metadata
+                 in zip(found['ids'], found['documents'], found['metadatas'])}
+        hits = [(profile_id, score) for profile_id, score in hits if profile_id in by_id]
+        return {
+            "ids": [[profile_id for profile_id, _ in hits]],
+            "documents": [[by_id[profile_id][0] for profile_id, _ in hits]],
+            "metadatas": [[by_id[profile_id][1] for profile_id, _ in hits]],
+            "distances": [[1.0 - score for _, score in hits]]
+        }
     except Exception as e:
         st.error(f"Error searching profiles: {str(e)}")
         return None
 
-def get_all_profiles(collection):
-    """Get all profiles from vector database"""
+def _profile_results(profiles, distances=None):
+    """Shape store rows like a single-query collection.query() result"""
+    return {
+        "ids": [[profile['id'] for profile in profiles]],
+        "documents": [[json.dumps({k: v for k, v in profile.items() if k != 'id'}) for profile in profiles]],
+        "metadatas": [[{**profile, "age": "" if profile.get('age') is None else str(profile['age'])} for profile in profiles]],
+        "distances": [distances or [None] * len(profiles)]
+    }
+
+def search_filtered_profiles(query_text, collection, model, store, vectors, n_results=5, ef=None, weights=None):
+    """
+    Answer structured parts of a query (age, gender, allergies) from the
+    side store and use vector similarity only for the free-text remainder.
+    Returns (parsed_query, results).
+    """
+    parsed = parse_profile_query(query_text)
+    if not parsed.has_filters:
+        return parsed, search_similar_profiles(query_text, collection, model, vectors, n_results, ef=ef, weights=weights)
+    
+    filters = {"gender": parsed.gender, "age_min": parsed.age_min, "age_max": parsed.age_max,
+               "allergies": parsed.allergies}
     try:
-        results = collection.get(
-            include=["documents", "metadatas", "embeddings"]
-        )
-        return results
+        candidate_ids = store.filter_ids(limit=EXACT_RERANK_LIMIT + 1, **filters)
+        
+        # Filters alone: no embedding or vector search needed
+        if not parsed.remainder or not candidate_ids:
+            return parsed, _profile_results(store.get_many(candidate_ids[:n_results]))
+        
+        query_embedding = np.asarray(model.encode(parsed.remainder), dtype=np.float32)
+        
+        if len(candidate_ids) <= EXACT_RERANK_LIMIT:
+            # Small candidate set: exact weighted scores over just those profiles' field vectors
+            scores = vectors.fused_scores(query_embedding, candidate_ids, weights or DEFAULT_WEIGHTS, fallback=collection)
+            hits = sorted(scores.items(), key=lambda item: -item[1])[:n_results]
+            return parsed, _profile_results(store.get_many([h[0] for h in hits]), [1.0 - h[1] for h in hits])
+        
+        # Large candidate set: over-fetch from the index and keep the neighbours that pass the filters
+        where = {"gender": parsed.gender} if parsed.gender else None
+        fetch_ef = min(max(ef or 0, n_results * 20), MAX_EF)
+        results = query_collection(collection, [query_embedding.tolist()], fetch_ef, where=where,
+                                   include=["distances"])
+        allowed = store.matching_ids(results['ids'][0], **filters)
+        scores = vectors.fused_scores(query_embedding, [i for i in results['ids'][0] if i in allowed],
+                                      weights or DEFAULT_WEIGHTS, fallback=collection)
+        hits = sorted(scores.items(), key=lambda item: -item[1])[:n_results]
+        return parsed, _profile_results(store.get_many([h[0] for h in hits]), [1.0 - h[1] for h in hits])
     except Exception as e:
-        st.error(f"Error retrieving profiles: {str(e)}")
-        return None
+        st.error(f"Error searching profiles: {str(e)}")
+        return parsed, None
 
-def delete_profile(profile_id, collection):
+def delete_profile(profile_id, collection, store, vectors):
     """Delete profile from vector database"""
     try:
         collection.delete(ids=[profile_id])
+        vectors.delete([profile_id])
+        store.delete(profile_id)
+        store.record_audit(profile_id, "delete")
         return True
     except Exception as e:
         st.error(f"Error deleting profile: {str(e)}")
         return False
 
-def create_profile_visualization(profiles_data):
-    """Create visualizations for profile data"""
-    if not profiles_data or not profiles_data.get('metadatas'):
+def update_profile(profile_id, profile_data, collection, model, store, vectors):
+    """
+    Update a profile in place, keeping its id. Only field groups whose text
+    changed are re-embedded. Returns (changes, reembedded groups), or None on error.
+    """
+    try:
+        stored = collection.get(ids=[profile_id], include=["documents", "metadatas", "embeddings"])
+        if not stored['ids']:
+            st.error("Profile not found; it may have been deleted.")
+            return None
+        old_profile = json.loads(stored['documents'][0]) if stored['documents'][0] else {}
+        old_metadata = stored['metadatas'][0] or {}
+        
+        changes = diff_profiles(old_profile, profile_data)
+        if not changes:
+            return {}, []
+        
+        updated = {**old_profile, **profile_data}
+        metadata = profile_metadata(updated, old_metadata.get('created_at') or old_profile.get('created_at'))
+        metadata["updated_at"] = datetime.now().isoformat()
+        
+        # Re-embed only when an embedded field changed (not e.g. notes), and then only the affected field groups
+        reembedded = []
+        embedding = np.asarray(stored['embeddings'][0], dtype=np.float32)
+        if EMBEDDED_FIELDS & set(changes):
+            fused, reembedded = vectors.update(profile_id, updated, model)
+            if reembedded:
+                embedding = fused
+        # Always pass the fused vector: Chroma would re-embed a bare document with its default model
+        collection.update(ids=[profile_id], embeddings=[embedding.tolist()],
+                          documents=[json.dumps(updated)], metadatas=[metadata])
+        
+        store.add(profile_id, updated, metadata["created_at"])
+        store.record_audit(profile_id, "update", changes, reembedded)
+        return changes, reembedded
+    except Exception as e:
+        st.error(f"Error updating profile: {str(e)}")
+        return None
+
+def create_profile_visualization(stats):
+    """Create visualizations from the precomputed profile aggregates"""
+    if not stats or not stats.get('total'):
         return None
     
-    # Extract data for visualization
-    metadata_list = profiles_data['metadatas']
-    
-    # Age distribution
-    ages = [int(meta.get('age', 0)) for meta in metadata_list if meta.get('age', '').isdigit()]
-    
-    # Gender distribution
-    genders = [meta.get('gender', 'Unknown') for meta in metadata_list]
-    gender_counts = pd.Series(genders).value_counts()
+    age_histogram = stats['age_histogram']
+    gender_counts = stats['genders']
+    timeline = pd.Series(stats['timeline'], dtype="int64")
     
     # Create subplots
     fig = make_subplots(
         rows=2, cols=2,
-        subplot_titles=('Age Distribution', 'Gender Distribution', 'Profile Count Over Time', 'Medical Conditions'),
-        specs=[[{"type": "histogram"}, {"type": "pie"}],
+        subplot_titles=('Age Distribution', 'Gender Distribution', 'Profile Count Over Time', 'Profiles Created Per Day'),
+        specs=[[{"type": "bar"}, {"type": "pie"}],
                [{"type": "scatter"}, {"type": "bar"}]]
     )
     
-    # Age histogram
-    if ages:
+    # Age histogram (bucketed by decade in the store)
+    if age_histogram:
         fig.add_trace(
-            go.Histogram(x=ages, name="Age Distribution", nbinsx=10),
+            go.Bar(x=list(age_histogram.keys()), y=list(age_histogram.values()), name="Age Distribution"),
             row=1, col=1
         )
     
     # Gender pie chart
-    if len(gender_counts) > 0:
+    if gender_counts:
         fig.add_trace(
-            go.Pie(labels=gender_counts.index, values=gender_counts.values, name="Gender"),
+            go.Pie(labels=list(gender_counts.keys()), values=list(gender_counts.values()), name="Gender"),
             row=1, col=2
         )
     
+    # Creation timeline
+    if len(timeline) > 0:
+        fig.add_trace(
+            go.Scatter(x=timeline.index, y=timeline.cumsum().values, mode="lines+markers", name="Total Profiles"),
+            row=2, col=1
+        )
+        fig.add_trace(
+            go.Bar(x=timeline.index, y=timeline.values, name="New Profiles"),
+            row=2, col=2
+        )
+    
     # Update layout
     fig.update_layout(height=800, showlegend=True, title_text="Profile Analytics Dashboard")
     
@@ -187,8 +302,10 @@ def main():
     # Initialize database and model
     client, collection = init_vector_db()
     model = init_embedding_model()
+    store = init_profile_store(collection) if collection else None
+    vectors = init_profile_vectors(client) if client else None
     
-    if not collection or not model:
+    if not collection or not model or not store or not vectors:
         st.error("Failed to initialize system components. Please check your setup.")
         return
     
@@ -196,19 +313,21 @@ def main():
     st.sidebar.title("🚀 Navigation")
     app_mode = st.sidebar.selectbox(
         "Choose an option:",
-        ["🏠 Dashboard", "➕ Create Profile", "🔍 Search Profiles", "📊 Analytics", "🗂️ View All Profiles"]
+        ["🏠 Dashboard", "➕ Create Profile", "📦 Import / Export", "🔍 Search Profiles", "📊 Analytics", "🗂️ View All Profiles"]
     )
     
     if app_mode == "🏠 Dashboard":
         show_dashboard(collection, model)
     elif app_mode == "➕ Create Profile":
-        create_profile_page(collection, model)
+        create_profile_page(collection, model, store, vectors)
+    elif app_mode == "📦 Import / Export":
+        bulk_page(collection, model, store, vectors)
     elif app_mode == "🔍 Search Profiles":
-        search_profiles_page(collection, model)
+        search_profiles_page(collection, model, store, vectors)
     elif app_mode == "📊 Analytics":
-        analytics_page(collection)
+        analytics_page(collection, store)
     elif app_mode == "🗂️ View All Profiles":
-        view_all_profiles_page(collection)
+        view_all_profiles_page(collection, model, store, vectors)
 
 def show_dashboard(collection, model):
     """Display dashboard with system overview"""
@@ -216,13 +335,17 @@ def show_dashboard(collection, model):
     
     col1, col2, col3, col4 = st.columns(4)
     
-    # Get statistics
-    all_profiles = get_all_profiles(collection)
+    # Get statistics (count() reads the collection size without loading any records)
+    try:
+        total_profiles = collection.count()
+    except Exception as e:
+        st.error(f"Error counting profiles: {str(e)}")
+        total_profiles = 0
     
     with col1:
         st.metric(
             label="Total Profiles",
-            value=len(all_profiles['ids']) if all_profiles and all_profiles.get('ids') else 0,
+            value=total_profiles,
             delta="Active users"
         )
     
@@ -268,7 +391,7 @@ def show_dashboard(collection, model):
             st.session_state.page = "analytics"
             st.rerun()
 
-def create_profile_page(collection, model):
+def create_profile_page(collection, model, store, vectors):
     """Profile creation interface"""
     st.header("➕ Create New Profile")
     
@@ -287,6 +410,9 @@ def create_profile_page(collection, model):
             medical_history = st.text_area("Medical History", placeholder="Describe any past medical conditions, surgeries, or treatments")
             allergies = st.text_area("Allergies", placeholder="List any known allergies")
         
+        notes = st.text_area("Notes", placeholder="Internal notes (not used for search)")
+        
+        allow_duplicate = st.checkbox("Create even if this looks like an existing profile")
         submitted = st.form_submit_button("Create Profile", type="primary")
         
         if submitted and name and email:
@@ -299,18 +425,107 @@ def create_profile_page(collection, model):
                 "address": address,
                 "medical_history": medical_history,
                 "allergies": allergies,
+                "notes": notes,
                 "created_at": datetime.now().isoformat()
             }
             
-            profile_id = add_profile_to_vector_db(profile_data, collection, model)
+            # Check for the same person before storing (same email/phone or a near-identical profile)
+            embedded = create_profile_embedding(profile_data, model, vectors)
+            if not allow_duplicate:
+                try:
+                    duplicates = check_new_profile(profile_data, embedded[1], collection, store)
+                except Exception as e:
+                    st.error(f"Error checking for duplicate profiles: {str(e)}")
+                    duplicates = []
+                if duplicates:
+                    st.warning("⚠️ This profile looks like one that already exists. "
+                               "Tick the box above to create it anyway.")
+                    for duplicate in duplicates:
+                        similarity = f", similarity {duplicate['similarity']:.1%}" if duplicate['similarity'] else ""
+                        st.write(f"👤 **{duplicate['name']}** ({duplicate['email']}) — "
+                                 f"{', '.join(duplicate['reasons'])}{similarity} · ID: {duplicate['id']}")
+                    return
+            
+            profile_id = add_profile_to_vector_db(profile_data, collection, model, store, vectors, embedded)
             
             if profile_id:
+                reset_profile_pages()
                 st.success(f"✅ Profile created successfully! ID: {profile_id}")
                 st.info("🎯 The profile has been stored in the vector database with embeddings for semantic search.")
             else:
                 st.error("❌ Failed to create profile. Please try again.")
 
-def search_profiles_page(collection, model):
+def bulk_page(collection, model, store, vectors):
+    """Bulk import and export interface"""
+    st.header("📦 Import / Export Profiles")
+    
+    import_tab, export_tab = st.tabs(["📥 Import", "📤 Export"])
+    
+    with import_tab:
+        st.write("Upload a CSV (with a header row) or JSONL file with the fields: "
+                 "name, email, phone, age, gender, address, medical_history, allergies, notes (name and email are required).")
+        uploaded = st.file_uploader("Profiles file", type=["csv", "jsonl", "ndjson"])
+        batch_size = st.select_slider("Batch size", options=sorted({64, 128, 256, 512, 1024, profile_bulk.IMPORT_BATCH}),
+                                      value=profile_bulk.IMPORT_BATCH)
+        st.caption("Records with the email or phone of an existing profile (or of an earlier row) are skipped "
+                   "and listed in the error report.")
+        check_similar = st.checkbox("Also skip records similar to an existing profile (slower)")
+        
+        if uploaded and st.button("📥 Import Profiles", type="primary"):
+            progress_bar = st.progress(0.0, text="Starting import...")
+            
+            def show_progress(report):
+                # The upload is read as a stream, so progress is measured in bytes consumed
+                fraction = min(uploaded.tell() / uploaded.size, 1.0) if uploaded.size else 1.0
+                progress_bar.progress(fraction, text=f"{report.imported} imported, {len(report.errors)} failed")
+            
+            records = profile_bulk.iter_records(uploaded, profile_bulk.detect_format(uploaded.name))
+            report = profile_bulk.import_profiles(records, collection, model, store, vectors, batch_size, show_progress,
+                                                  check_similar=check_similar)
+            progress_bar.progress(1.0, text="Import finished")
+            reset_profile_pages()
+            
+            if report.imported:
+                st.success(f"✅ {report.summary()}")
+            if report.errors:
+                st.warning(f"⚠️ {len(report.errors)} record(s) could not be imported")
+                errors = pd.DataFrame([{**e, "record": json.dumps(e["record"], default=str)} for e in report.errors])
+                st.dataframe(errors.head(1000), use_container_width=True)
+                st.download_button("Download error report", errors.to_csv(index=False),
+                                   file_name="import_errors.csv", mime="text/csv")
+    
+    with export_tab:
+        export_format = st.radio("Format", ["Parquet", "NPY + JSONL"], horizontal=True)
+        include_embeddings = export_format == "NPY + JSONL" or st.checkbox("Include embeddings")
+        
+        if st.button("📤 Export Profiles", type="primary"):
+            total = collection.count()
+            if not total:
+                st.info("There are no profiles to export.")
+                return
+            progress_bar = st.progress(0.0, text="Exporting...")
+            show_progress = lambda written: progress_bar.progress(min(written / total, 1.0), text=f"{written} exported")
+            # Patient data must not outlive the download; the files are read into the buttons and then removed
+            try:
+                with tempfile.TemporaryDirectory(prefix="profiles_export_") as export_dir:
+                    if export_format == "Parquet":
+                        path = os.path.join(export_dir, "profiles.parquet")
+                        written = profile_bulk.export_parquet(collection, path, include_embeddings, show_progress)
+                        with open(path, "rb") as f:
+                            st.download_button("Download profiles.parquet", f.read(), file_name="profiles.parquet")
+                    else:
+                        path = os.path.join(export_dir, "profiles.npy")
+                        written = profile_bulk.export_npy(collection, path, show_progress)
+                        with open(path, "rb") as f:
+                            st.download_button("Download profiles.npy (embeddings)", f.read(), file_name="profiles.npy")
+                        with open(os.path.join(export_dir, "profiles.jsonl"), "rb") as f:
+                            st.download_button("Download profiles.jsonl (same row order)", f.read(),
+                                               file_name="profiles.jsonl")
+                st.success(f"✅ Exported {written} profiles")
+            except Exception as e:
+                st.error(f"Error exporting profiles: {str(e)}")
+
+def search_profiles_page(collection, model, store, vectors):
     """Profile search interface"""
     st.header("🔍 Search Profiles")
     
@@ -320,15 +535,28 @@ def search_profiles_page(collection, model):
         height=100
     )
     
-    col1, col2 = st.columns([3, 1])
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        default_clinical = DEFAULT_WEIGHTS['clinical'] / (sum(DEFAULT_WEIGHTS.values()) or 1.0)
+        clinical_weight = st.slider("Clinical vs. demographic weight", min_value=0.0, max_value=1.0,
+                                    value=float(round(default_clinical, 2)), step=0.05,
+                                    help="1.0 matches on medical history and allergies only; 0.0 on name, age, contact details and address only")
     with col2:
         num_results = st.number_input("Results", min_value=1, max_value=20, value=5)
+    with col3:
+        search_ef = st.number_input("Search depth (ef)", min_value=10, max_value=500, value=10, step=10,
+                                    help="Higher values find closer matches at the cost of latency")
     
     if st.button("🔍 Search Profiles", type="primary") and search_query:
         with st.spinner("Searching vector database..."):
-            results = search_similar_profiles(search_query, collection, model, num_results)
+            weights = {"clinical": clinical_weight, "demographic": 1.0 - clinical_weight}
+            parsed, results = search_filtered_profiles(search_query, collection, model, store, vectors, num_results,
+                                                       ef=search_ef, weights=weights)
             
-            if results and results.get('documents'):
+            if parsed.has_filters:
+                st.caption(f"Filters: {parsed.describe()}" + (f" · Similar to: {parsed.remainder}" if parsed.remainder else ""))
+            
+            if results and results.get('documents') and results['documents'][0]:
                 st.success(f"Found {len(results['documents'][0])} similar profiles")
                 
                 # Display results
@@ -339,7 +567,8 @@ def search_profiles_page(collection, model):
                 )):
                     profile_data = json.loads(doc)
                     
-                    with st.expander(f"👤 {metadata['name']} (Similarity: {(1-distance):.2%})"):
+                    match = f"Similarity: {(1-distance):.2%}" if distance is not None else "Matches filters"
+                    with st.expander(f"👤 {metadata['name']} ({match})"):
                         col1, col2 = st.columns(2)
                         
                         with col1:
@@ -355,19 +584,19 @@ def search_profiles_page(collection, model):
             else:
                 st.warning("No profiles found matching your search criteria.")
 
-def analytics_page(collection):
+def analytics_page(collection, store):
     """Analytics and visualization page"""
     st.header("📊 Profile Analytics")
     
-    # Get all profiles
-    all_profiles = get_all_profiles(collection)
+    # Aggregates are maintained on every add/delete, so this never scans the profiles
+    stats = store.stats()
     
-    if not all_profiles or not all_profiles.get('metadatas'):
+    if not stats['total']:
         st.info("No profiles available for analytics. Please create some profiles first.")
         return
     
     # Create visualizations
-    fig = create_profile_visualization(all_profiles)
+    fig = create_profile_visualization(stats)
     
     if fig:
         st.plotly_chart(fig, use_container_width=True)
@@ -375,84 +604,207 @@ def analytics_page(collection):
     # Additional statistics
     st.subheader("📈 Detailed Statistics")
     
-    metadata_list = all_profiles['metadatas']
-    
     col1, col2, col3 = st.columns(3)
     
     with col1:
         # Age statistics
-        ages = [int(meta.get('age', 0)) for meta in metadata_list if meta.get('age', '').isdigit()]
-        if ages:
-            st.metric("Average Age", f"{np.mean(ages):.1f}")
-            st.metric("Age Range", f"{min(ages)} - {max(ages)}")
+        if stats['average_age'] is not None:
+            st.metric("Average Age", f"{stats['average_age']:.1f}")
+            st.metric("Age Range", f"{stats['min_age']} - {stats['max_age']}")
     
     with col2:
         # Gender distribution
-        genders = [meta.get('gender', 'Unknown') for meta in metadata_list]
-        gender_counts = pd.Series(genders).value_counts()
         st.write("**Gender Distribution:**")
-        for gender, count in gender_counts.items():
+        for gender, count in stats['genders'].items():
             st.write(f"{gender}: {count}")
     
     with col3:
         # Profile creation timeline
-        created_dates = [meta.get('created_at', '') for meta in metadata_list if meta.get('created_at')]
-        if created_dates:
-            st.write(f"**Total Profiles:** {len(metadata_list)}")
-            st.write(f"**Database Size:** {len(all_profiles.get('embeddings', []))} vectors")
+        if stats['timeline']:
+            st.write(f"**Total Profiles:** {stats['total']}")
+            st.write(f"**Database Size:** {collection.count()} vectors")
+            st.write(f"**First Profile:** {next(iter(stats['timeline']))}")
+
+def reset_profile_pages():
+    """Drop cached browser pages so the next render reads fresh data"""
+    st.session_state.profile_pages = {}
+    st.session_state.profile_page = 0
+
+def get_profile_page(store, search_term, gender, page_size, page_number):
+    """Fetch one browser page, reusing pages already cached in session state"""
+    key = (search_term.strip(), gender, page_size)
+    cache = st.session_state.profile_pages
+    if cache.get('key') != key:
+        # Filters changed: start again from the first page
+        cache.clear()
+        cache.update(key=key, cursors=[None], pages={}, total=None)
+        st.session_state.profile_page = page_number = 0
+    
+    if cache['total'] is None:
+        cache['total'] = store.count_matching(search_term, gender)
+    
+    if page_number not in cache['pages']:
+        rows, next_key = store.browse(search_term, gender, page_size, after=cache['cursors'][page_number])
+        cache['pages'][page_number] = rows
+        if next_key and len(cache['cursors']) == page_number + 1:
+            cache['cursors'].append(next_key)
+    
+    has_next = len(cache['cursors']) > page_number + 1
+    return cache['pages'][page_number], cache['total'], has_next
+
+def edit_profile_form(profile, collection, model, store, vectors):
+    """Inline edit form for one profile in the browser"""
+    profile_id = profile['id']
+    with st.form(f"edit_{profile_id}"):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            name = st.text_input("Full Name *", value=profile.get('name') or "")
+            email = st.text_input("Email *", value=profile.get('email') or "")
+            phone = st.text_input("Phone Number", value=profile.get('phone') or "")
+            # Blank stays blank: saving must not turn "no age" into 0
+            age = st.number_input("Age", min_value=0, max_value=120, value=age_input_value(profile.get('age')),
+                                  placeholder="Unknown")
+        
+        with col2:
+            gender = profile.get('gender') or ""
+            gender = st.selectbox("Gender", GENDERS, index=GENDERS.index(gender) if gender in GENDERS else 0)
+            address = st.text_area("Address", value=profile.get('address') or "")
+            medical_history = st.text_area("Medical History", value=profile.get('medical_history') or "")
+            allergies = st.text_area("Allergies", value=profile.get('allergies') or "")
+        
+        notes = st.text_area("Notes", value=profile.get('notes') or "")
+        
+        col1, col2 = st.columns([1, 5])
+        with col1:
+            saved = st.form_submit_button("💾 Save", type="primary")
+        with col2:
+            cancelled = st.form_submit_button("Cancel")
+    
+    if cancelled:
+        st.session_state.editing_profile = None
+        st.rerun()
+    
+    if saved:
+        if not name or not email:
+            st.error("Name and email are required.")
+            return
+        profile_data = {
+            "name": name,
+            "email": email,
+            "phone": phone,
+            "age": age_from_input(age),
+            "gender": gender,
+            "address": address,
+            "medical_history": medical_history,
+            "allergies": allergies,
+            "notes": notes
+        }
+        result = update_profile(profile_id, profile_data, collection, model, store, vectors)
+        if result is None:
+            return
+        changes, reembedded = result
+        if not changes:
+            st.session_state.profile_notice = "No changes to save."
+        else:
+            embedded = f"re-embedded {', '.join(reembedded)} fields" if reembedded else "no re-embedding needed"
+            st.session_state.profile_notice = f"✅ Updated {', '.join(changes)} ({embedded})"
+        # Only this page's cached rows are stale; created_at is unchanged so page cursors stay valid
+        st.session_state.profile_pages.get('pages', {}).pop(st.session_state.profile_page, None)
+        st.session_state.editing_profile = None
+        st.rerun()
 
-def view_all_profiles_page(collection):
+def view_all_profiles_page(collection, model, store, vectors):
     """View all profiles page"""
     st.header("🗂️ All Profiles")
     
-    all_profiles = get_all_profiles(collection)
-    
-    if not all_profiles or not all_profiles.get('metadatas'):
+    if not store.count():
         st.info("No profiles found in the database.")
         return
     
-    # Display profiles in a grid
-    metadata_list = all_profiles['metadatas']
-    document_list = all_profiles['documents']
+    # Search/filter functionality (runs in SQLite, one page at a time)
+    col1, col2, col3, col4 = st.columns([4, 1, 1, 1])
+    with col1:
+        search_term = st.text_input("🔍 Filter profiles", placeholder="Search by name, email, or any field...")
+    with col2:
+        gender = st.selectbox("Gender", ["", "Male", "Female", "Other"], format_func=lambda g: g or "Any")
+    with col3:
+        page_size = st.selectbox("Page size", [10, 25, 50, 100], index=1)
+    with col4:
+        st.write("")
+        if st.button("🔄 Refresh", use_container_width=True):
+            reset_profile_pages()
     
-    # Search/filter functionality
-    search_term = st.text_input("🔍 Filter profiles", placeholder="Search by name, email, or any field...")
+    try:
+        rows, total, has_next = get_profile_page(
+            store, search_term, gender, page_size, st.session_state.profile_page
+        )
+    except ValueError:
+        st.warning("Enter at least one letter or number to filter by.")
+        return
     
-    filtered_indices = range(len(metadata_list))
-    if search_term:
-        filtered_indices = [
-            i for i in range(len(metadata_list))
-            if search_term.lower() in json.dumps(metadata_list[i]).lower() or
-               search_term.lower() in document_list[i].lower()
-        ]
+    page_number = st.session_state.profile_page
+    page_count = max(1, -(-total // page_size))
+    st.write(f"Showing {len(rows)} of {total} profiles (page {page_number + 1} of {page_count})")
     
-    st.write(f"Showing {len(filtered_indices)} profiles")
+    if st.session_state.profile_notice:
+        st.success(st.session_state.profile_notice)
+        st.session_state.profile_notice = None
     
     # Display profiles
-    for i in filtered_indices:
-        metadata = metadata_list[i]
-        profile_data = json.loads(document_list[i])
-        profile_id = all_profiles['ids'][i]
+    for profile in rows:
+        profile_id = profile['id']
         
-        with st.expander(f"👤 {metadata.get('name', 'Unknown')} ({metadata.get('email', 'No email')})"):
+        editing = st.session_state.editing_profile == profile_id
+        with st.expander(f"👤 {profile.get('name') or 'Unknown'} ({profile.get('email') or 'No email'})", expanded=editing):
+            if editing:
+                edit_profile_form(profile, collection, model, store, vectors)
+                continue
+            
             col1, col2 = st.columns([3, 1])
             
             with col1:
                 st.write(f"**ID:** {profile_id}")
-                st.write(f"**Age:** {metadata.get('age', 'N/A')}")
-                st.write(f"**Gender:** {metadata.get('gender', 'N/A')}")
-                st.write(f"**Phone:** {metadata.get('phone', 'N/A')}")
-                st.write(f"**Address:** {metadata.get('address', 'N/A')}")
-                st.write(f"**Medical History:** {profile_data.get('medical_history', 'N/A')}")
-                st.write(f"**Allergies:** {profile_data.get('allergies', 'N/A')}")
+                st.write(f"**Age:** {profile.get('age') if profile.get('age') is not None else 'N/A'}")
+                st.write(f"**Gender:** {profile.get('gender') or 'N/A'}")
+                st.write(f"**Phone:** {profile.get('phone') or 'N/A'}")
+                st.write(f"**Address:** {profile.get('address') or 'N/A'}")
+                st.write(f"**Medical History:** {profile.get('medical_history') or 'N/A'}")
+                st.write(f"**Allergies:** {profile.get('allergies') or 'N/A'}")
+                if profile.get('notes'):
+                    st.write(f"**Notes:** {profile['notes']}")
+            
+                if st.toggle("🕓 History", key=f"history_{profile_id}"):
+                    history = store.audit_history(profile_id)
+                    if not history:
+                        st.caption("No recorded changes")
+                    for entry in history:
+                        changed = ", ".join(entry['changes']) or "—"
+                        reembedded = f" · re-embedded: {', '.join(entry['reembedded'])}" if entry['reembedded'] else ""
+                        st.caption(f"{entry['changed_at'][:19]} · {entry['action']} · {changed}{reembedded}")
             
             with col2:
+                if st.button("✏️ Edit", key=f"edit_{profile_id}"):
+                    st.session_state.editing_profile = profile_id
+                    st.rerun()
                 if st.button("🗑️ Delete", key=f"delete_{profile_id}"):
-                    if delete_profile(profile_id, collection):
+                    if delete_profile(profile_id, collection, store, vectors):
                         st.success("Profile deleted successfully!")
+                        reset_profile_pages()
                         st.rerun()
                     else:
                         st.error("Failed to delete profile.")
+    
+    # Pagination
+    col1, col2, col3 = st.columns([1, 4, 1])
+    with col1:
+        if st.button("⬅️ Previous", disabled=page_number == 0, use_container_width=True):
+            st.session_state.profile_page -= 1
+            st.rerun()
+    with col3:
+        if st.button("Next ➡️", disabled=not has_next, use_container_width=True):
+            st.session_state.profile_page += 1
+            st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Opt-in request profiling for main.py and rag_vector_api.py
+
+A sampled fraction of requests (PROFILE_SAMPLE_RATE), or any request that
+sends "X-Profile: <PROFILE_TOKEN>", runs under cProfile. Each profile is
+written to PROFILE_DIR as
+
+  <timestamp>_<METHOD>_<route>_<duration>ms.prof
+
+and the directory is trimmed to the newest PROFILE_MAX_FILES files. The
+files load with pstats or snakeviz; this script prints a combined report.
+
+Only one request is profiled at a time (cProfile cannot nest profilers),
+so a request that would be sampled while another is being profiled runs
+normally. Under FastAPI the profile covers the event loop thread, so work
+handed to run_in_threadpool is not included and other coroutines running
+concurrently may show up in it.
+
+Configuration (environment variables):
+  PROFILE_SAMPLE_RATE   fraction of requests to profile (default 0 = off)
+  PROFILE_TOKEN         value the X-Profile header must carry (unset = header ignored)
+  PROFILE_DIR           output directory (default profiles)
+  PROFILE_MAX_FILES     profiles kept before the oldest are deleted (default 200)
+
+Run:
+  python profiling.py [--dir profiles] [--route chat] [--top 30] [--sort cumulative]
+"""
+
+import argparse
+import cProfile
+import glob
+import hmac
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from datetime import datetime
+
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+PROFILE_HEADER = "X-Profile"
+_UNSAFE = re.compile(r"[^A-Za-z0-9]+")
+
+
+class RequestProfiler:
+    def __init__(self, directory=PROFILE_DIR, sample_rate=SAMPLE_RATE, token=PROFILE_TOKEN, max_files=MAX_FILES):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.token = token
+        self.max_files = max_files
+        self._busy = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0 or bool(self.token)
+
+    def wanted(self, headers):
+        """Decide whether to profile a request (headers needs .get())"""
+        requested = headers.get(PROFILE_HEADER)
+        if requested and self.token and hmac.compare_digest(requested, self.token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self):
+        """Return a running profiler, or None if another request is being profiled"""
+        if not self._busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiling tool is active
+            self._busy.release()
+            return None
+        return profiler
+
+    def finish(self, profiler, method, route, duration):
+        """Stop profiler and write it out; returns the file name"""
+        profiler.disable()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            name = "{}_{}_{}_{}ms.prof".format(
+                datetime.now().strftime("%Y%m%d-%H%M%S-%f"),
+                method,
+                _UNSAFE.sub("-", route).strip("-") or "root",
+                int(duration * 1000)
+            )
+            profiler.dump_stats(os.path.join(self.directory, name))
+            self._rotate()
+            return name
+        finally:
+            self._busy.release()
+
+    def _rotate(self):
+        files = sorted(glob.glob(os.path.join(self.directory, "*.prof")))
+        for path in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def profile_fastapi(app, profiler=None):
+    """Profile sampled or explicitly requested FastAPI requests"""
+    from fastapi import Request
+
+    profiler = profiler or RequestProfiler()
+    if not profiler.enabled:
+        return profiler
+
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        if not profiler.wanted(request.headers):
+            return await call_next(request)
+        running = profiler.start()
+        if running is None:
+            return await call_next(request)
+
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await call_next(request)
+            return response
+        finally:
+            route = request.scope.get("route")
+            name = profiler.finish(running, request.method, getattr(route, "path", request.url.path),
+                                   time.perf_counter() - start)
+            if response is not None:
+                response.headers["X-Profile-File"] = name
+
+    return profiler
+
+
+def profile_flask(app, profiler=None):
+    """Profile sampled or explicitly requested Flask requests"""
+    from flask import g, request
+
+    profiler = profiler or RequestProfiler()
+    if not profiler.enabled:
+        return profiler
+
+    def stop(response=None):
+        running = g.pop("profiler", None)
+        if running is None:
+            return None
+        rule = request.url_rule.rule if request.url_rule else request.path
+        return profiler.finish(running, request.method, rule, time.perf_counter() - g.pop("profile_started"))
+
+    @app.before_request
+    def start_profile():
+        if profiler.wanted(request.headers):
+            running = profiler.start()
+            if running is not None:
+                g.profiler = running
+                g.profile_started = time.perf_counter()
+
+    @app.after_request
+    def finish_profile(response):
+        name = stop()
+        if name:
+            response.headers["X-Profile-File"] = name
+        return response
+
+    @app.teardown_request
+    def abandon_profile(error=None):
+        # Unhandled exceptions skip after_request; still release the profiler
+        stop()
+
+    return profiler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Combined report over captured request profiles")
+    parser.add_argument("--dir", default=PROFILE_DIR)
+    parser.add_argument("--route", help="only profiles whose file name contains this text")
+    parser.add_argument("--top", type=int, default=30)
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key (cumulative, tottime, calls)")
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.dir, "*.prof")))
+    if args.route:
+        files = [f for f in files if args.route in os.path.basename(f)]
+    if not files:
+        print(f"❌ No profiles found in {args.dir}")
+        return
+
+    print(f"🔥 {len(files)} profiles from {args.dir}")
+    print("=" * 60)
+    stats = pstats.Stats(*files)
+    stats.strip_dirs().sort_stats(args.sort).print_stats(args.top)
+
+
+if __name__ == "__main__":
+    main()
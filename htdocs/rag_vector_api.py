@@ -8,32 +8,58 @@ from datetime import datetime
 import uuid
 import json
 import os
+from contextlib import contextmanager
+
+from instrumentation import CHROMA_QUERY, EMBEDDING_ENCODE, instrument_flask
+from tracing import current_trace, debug_timing_requested, span, trace_flask
+from profiling import profile_flask
+from stub_backends import HashingEmbedder
+from vector_index import get_collection, parse_ef, query_collection
 
 app = Flask(__name__)
 CORS(app)
 
+# Per-route latency histograms and /metrics (Prometheus text format)
+instrument_flask(app)
+
+# Per-request spans, Server-Timing header and sampled JSONL trace log
+trace_flask(app)
+
+# Opt-in cProfile capture (PROFILE_SAMPLE_RATE or X-Profile: <PROFILE_TOKEN>)
+profile_flask(app)
+
 # Initialize ChromaDB client
 chroma_client = chromadb.PersistentClient(path="./chroma_db")
 
 # Initialize sentence transformer model
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# (EMBEDDING_BACKEND=stub swaps in a deterministic offline embedder for load tests)
+if os.getenv("EMBEDDING_BACKEND") == "stub":
+    model = HashingEmbedder()
+else:
+    model = SentenceTransformer('all-MiniLM-L6-v2')
 
-# Create or get collections
-knowledge_collection = chroma_client.get_or_create_collection(
-    name="knowledge_base",
-    metadata={"hnsw:space": "cosine"}
-)
-conversations_collection = chroma_client.get_or_create_collection(
-    name="conversations",
-    metadata={"hnsw:space": "cosine"}
-)
+# Create or get collections (HNSW parameters are configured in vector_index.py)
+knowledge_collection = get_collection(chroma_client, "knowledge_base")
+conversations_collection = get_collection(chroma_client, "conversations")
+
+def embed(texts, operation):
+    """Encode texts with the sentence transformer, recording encode time"""
+    with span("encode"), EMBEDDING_ENCODE.time(operation=operation):
+        return model.encode(texts).tolist()
+
+@contextmanager
+def timed(collection, operation):
+    """Record the duration of one Chroma call as a metric and a trace span"""
+    with span(f"{collection.name}.{operation}"), CHROMA_QUERY.time(collection=collection.name, operation=operation):
+        yield
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Check if the vector database is accessible"""
     try:
         # Test collection access
-        knowledge_collection.count()
+        with timed(knowledge_collection, "count"):
+            knowledge_collection.count()
         return jsonify({
             "status": "healthy",
             "vector_db_connected": True,
@@ -58,22 +84,23 @@ def add_knowledge():
             return jsonify({"error": "Text is required"}), 400
         
         # Generate embedding
-        embedding = model.encode([text])[0].tolist()
+        embedding = embed([text], "add_knowledge")[0]
         
         # Generate unique ID
         vector_id = str(uuid.uuid4())
         
         # Add to collection
-        knowledge_collection.add(
-            embeddings=[embedding],
-            documents=[text],
-            metadatas=[{
-                **metadata,
-                "timestamp": datetime.now().isoformat(),
-                "id": vector_id
-            }],
-            ids=[vector_id]
-        )
+        with timed(knowledge_collection, "add"):
+            knowledge_collection.add(
+                embeddings=[embedding],
+                documents=[text],
+                metadatas=[{
+                    **metadata,
+                    "timestamp": datetime.now().isoformat(),
+                    "id": vector_id
+                }],
+                ids=[vector_id]
+            )
         
         return jsonify({
             "success": True,
@@ -91,18 +118,21 @@ def search_knowledge():
         data = request.json
         query = data.get('query')
         k = data.get('k', 3)
+        ef = data.get('ef')  # optional: search more candidates for better recall
         
         if not query:
             return jsonify({"error": "Query is required"}), 400
+        try:
+            ef = parse_ef(ef)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         # Generate query embedding
-        query_embedding = model.encode([query])[0].tolist()
+        query_embedding = embed([query], "search_knowledge")[0]
         
         # Search for similar vectors
-        results = knowledge_collection.query(
-            query_embeddings=[query_embedding],
-            n_results=k
-        )
+        with timed(knowledge_collection, "query"):
+            results = query_collection(knowledge_collection, [query_embedding], k, ef=ef)
         
         # Format results
         formatted_results = []
@@ -128,7 +158,8 @@ def get_all_knowledge():
     """Get all knowledge vectors from the database"""
     try:
         # Get all vectors from collection
-        results = knowledge_collection.get()
+        with timed(knowledge_collection, "get"):
+            results = knowledge_collection.get()
         
         formatted_results = []
         if results['ids']:
@@ -159,19 +190,20 @@ def update_knowledge(vector_id):
             return jsonify({"error": "Text is required"}), 400
         
         # Generate new embedding
-        embedding = model.encode([text])[0].tolist()
+        embedding = embed([text], "update_knowledge")[0]
         
         # Update in collection
-        knowledge_collection.update(
-            ids=[vector_id],
-            embeddings=[embedding],
-            documents=[text],
-            metadatas=[{
-                **metadata,
-                "updated_at": datetime.now().isoformat(),
-                "id": vector_id
-            }]
-        )
+        with timed(knowledge_collection, "update"):
+            knowledge_collection.update(
+                ids=[vector_id],
+                embeddings=[embedding],
+                documents=[text],
+                metadatas=[{
+                    **metadata,
+                    "updated_at": datetime.now().isoformat(),
+                    "id": vector_id
+                }]
+            )
         
         return jsonify({
             "success": True,
@@ -185,7 +217,8 @@ def update_knowledge(vector_id):
 def delete_knowledge(vector_id):
     """Delete a knowledge vector"""
     try:
-        knowledge_collection.delete(ids=[vector_id])
+        with timed(knowledge_collection, "delete"):
+            knowledge_collection.delete(ids=[vector_id])
         
         return jsonify({
             "success": True,
@@ -212,20 +245,21 @@ def save_conversation():
         ])
         
         # Generate embedding
-        embedding = model.encode([conversation_text])[0].tolist()
+        embedding = embed([conversation_text], "save_conversation")[0]
         
         # Add to conversations collection
-        conversations_collection.add(
-            embeddings=[embedding],
-            documents=[conversation_text],
-            metadatas=[{
-                "conversation_id": conversation_id,
-                "message_count": len(messages),
-                "timestamp": datetime.now().isoformat(),
-                "type": "conversation"
-            }],
-            ids=[conversation_id]
-        )
+        with timed(conversations_collection, "add"):
+            conversations_collection.add(
+                embeddings=[embedding],
+                documents=[conversation_text],
+                metadatas=[{
+                    "conversation_id": conversation_id,
+                    "message_count": len(messages),
+                    "timestamp": datetime.now().isoformat(),
+                    "type": "conversation"
+                }],
+                ids=[conversation_id]
+            )
         
         return jsonify({
             "success": True,
@@ -242,18 +276,21 @@ def search_conversations():
         data = request.json
         query = data.get('query')
         k = data.get('k', 3)
+        ef = data.get('ef')  # optional: search more candidates for better recall
         
         if not query:
             return jsonify({"error": "Query is required"}), 400
+        try:
+            ef = parse_ef(ef)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         # Generate query embedding
-        query_embedding = model.encode([query])[0].tolist()
+        query_embedding = embed([query], "search_conversations")[0]
         
         # Search for similar conversations
-        results = conversations_collection.query(
-            query_embeddings=[query_embedding],
-            n_results=k
-        )
+        with timed(conversations_collection, "query"):
+            results = query_collection(conversations_collection, [query_embedding], k, ef=ef)
         
         # Format results
         formatted_results = []
@@ -281,60 +318,69 @@ def generate_rag_response():
         data = request.json
         query = data.get('query')
         conversation_history = data.get('conversation_history', [])
+        ef = data.get('ef')  # optional: search more candidates for better recall
         
         if not query:
             return jsonify({"error": "Query is required"}), 400
+        try:
+            ef = parse_ef(ef)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         # Search for relevant knowledge
-        query_embedding = model.encode([query])[0].tolist()
-        knowledge_results = knowledge_collection.query(
-            query_embeddings=[query_embedding],
-            n_results=3
-        )
+        query_embedding = embed([query], "generate_rag_response")[0]
+        with timed(knowledge_collection, "query"):
+            knowledge_results = query_collection(knowledge_collection, [query_embedding], 3, ef=ef)
         
         # Search for relevant conversations
-        conversation_results = conversations_collection.query(
-            query_embeddings=[query_embedding],
-            n_results=2
-        )
-        
-        # Combine contexts
-        contexts = []
-        
-        if knowledge_results['ids'][0]:
-            for i in range(len(knowledge_results['ids'][0])):
-                contexts.append({
-                    "type": "knowledge",
-                    "content": knowledge_results['documents'][0][i],
-                    "metadata": knowledge_results['metadatas'][0][i],
-                    "similarity": float(knowledge_results['distances'][0][i]) if knowledge_results['distances'][0] else 0.0
-                })
-        
-        if conversation_results['ids'][0]:
-            for i in range(len(conversation_results['ids'][0])):
-                contexts.append({
-                    "type": "conversation",
-                    "content": conversation_results['documents'][0][i],
-                    "metadata": conversation_results['metadatas'][0][i],
-                    "similarity": float(conversation_results['distances'][0][i]) if conversation_results['distances'][0] else 0.0
-                })
-        
-        # Sort by similarity and take top results
-        contexts.sort(key=lambda x: x['similarity'])
-        relevant_contexts = [ctx for ctx in contexts if ctx['similarity'] > 0.7][:3]
+        with timed(conversations_collection, "query"):
+            conversation_results = query_collection(conversations_collection, [query_embedding], 2, ef=ef)
         
-        # Generate response (simplified - in real implementation, use LLM)
-        if relevant_contexts:
-            context_text = "\n---\n".join([ctx['content'] for ctx in relevant_contexts])
-            response = f"Based on the relevant information I found:\n\n{context_text}\n\nIn response to your question: {query}"
-        else:
-            response = f"I don't have specific information about that in my knowledge base. Regarding your question: {query}"
-        
-        return jsonify({
+        # Combine contexts and build the response
+        with span("assemble"):
+            contexts = []
+            
+            if knowledge_results['ids'][0]:
+                for i in range(len(knowledge_results['ids'][0])):
+                    contexts.append({
+                        "type": "knowledge",
+                        "content": knowledge_results['documents'][0][i],
+                        "metadata": knowledge_results['metadatas'][0][i],
+                        "similarity": float(knowledge_results['distances'][0][i]) if knowledge_results['distances'][0] else 0.0
+                    })
+            
+            if conversation_results['ids'][0]:
+                for i in range(len(conversation_results['ids'][0])):
+                    contexts.append({
+                        "type": "conversation",
+                        "content": conversation_results['documents'][0][i],
+                        "metadata": conversation_results['metadatas'][0][i],
+                        "similarity": float(conversation_results['distances'][0][i]) if conversation_results['distances'][0] else 0.0
+                    })
+            
+            # Sort by similarity and take top results
+            contexts.sort(key=lambda x: x['similarity'])
+            relevant_contexts = [ctx for ctx in contexts if ctx['similarity'] > 0.7][:3]
+            
+            # Generate response (simplified - in real implementation, use LLM)
+            if relevant_contexts:
+                context_text = "\n---\n".join([ctx['content'] for ctx in relevant_contexts])
+                response = f"Based on the relevant information I found:\n\n{context_text}\n\nIn response to your question: {query}"
+            else:
+                response = f"I don't have specific information about that in my knowledge base. Regarding your question: {query}"
+        
+        result = {
             "response": response,
             "contexts": relevant_contexts,
             "context_count": len(relevant_contexts)
-        })
+        }
+        
+        # Per-stage breakdown for ?debug_timing=1
+        trace = current_trace()
+        if trace is not None and debug_timing_requested(request.args):
+            result["timing"] = trace.breakdown()
+        
+        return jsonify(result)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -360,7 +406,7 @@ def batch_add_knowledge():
             
             if text:
                 vector_id = str(uuid.uuid4())
-                embedding = model.encode([text])[0].tolist()
+                embedding = embed([text], "batch_add_knowledge")[0]
                 
                 ids.append(vector_id)
                 texts.append(text)
@@ -372,12 +418,13 @@ def batch_add_knowledge():
                 })
         
         if ids:
-            knowledge_collection.add(
-                embeddings=embeddings,
-                documents=texts,
-                metadatas=metadatas,
-                ids=ids
-            )
+            with timed(knowledge_collection, "add"):
+                knowledge_collection.add(
+                    embeddings=embeddings,
+                    documents=texts,
+                    metadatas=metadatas,
+                    ids=ids
+                )
         
         return jsonify({
             "success": True,
@@ -395,6 +442,7 @@ if __name__ == '__main__':
     print("🚀 Starting RAG Chatbot Vector Database API...")
     print("📡 API Endpoints:")
     print("  - GET  /api/health")
+    print("  - GET  /metrics")
     print("  - POST /api/add-knowledge")
     print("  - POST /api/search-knowledge")
     print("  - GET  /api/get-all-knowledge")
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Retention tiering for consultations
+
+Consultations reviewed (approved/modified) longer ago than a configurable
+age are moved from the hot consultations table into consultations_archive in
+small batched transactions, so the pending queue stays small. Reads go
+through consultation_queue.py, which spans both tiers.
+
+A background RetentionWorker runs the archiver on an interval, reclaims
+freed pages with incremental vacuum, and optionally runs a full VACUUM on
+a longer schedule.
+
+Configuration (environment variables):
+  CONSULTATION_RETENTION_DAYS       days after review before archiving (default 30, 0 disables)
+  RETENTION_BATCH_SIZE              rows moved per transaction (default 500)
+  RETENTION_INTERVAL_SECONDS        pause between archiver runs (default 300)
+  RETENTION_VACUUM_PAGES            pages freed per incremental vacuum (default 1000)
+  RETENTION_FULL_VACUUM_HOURS       hours between full VACUUMs (default 0 = never)
+
+Run:
+  python retention.py [--db chatbot.db] [--stats] [--run-once] [--enable-incremental-vacuum]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from consultation_queue import ARCHIVED_STATUSES, CONSULTATION_COLUMNS, rebuild_search_index
+
+DATABASE_URL = "chatbot.db"
+
+RETENTION_DAYS = float(os.getenv("CONSULTATION_RETENTION_DAYS", "30"))
+BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "300"))
+VACUUM_PAGES = int(os.getenv("RETENTION_VACUUM_PAGES", "1000"))
+FULL_VACUUM_HOURS = float(os.getenv("RETENTION_FULL_VACUUM_HOURS", "0"))
+
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+
+def connect(db_path=DATABASE_URL):
+    """Autocommit connection; archive batches manage their own transactions"""
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    return conn
+
+
+def archive_batch(conn, cutoff, batch_size=BATCH_SIZE):
+    """Move one batch of consultations reviewed before cutoff; returns rows moved"""
+    placeholders = ", ".join("?" for _ in ARCHIVED_STATUSES)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        ids = [row[0] for row in conn.execute(f"""
+            SELECT id FROM consultations
+            WHERE status IN ({placeholders}) AND updated_at < ?
+            ORDER BY updated_at
+            LIMIT ?
+        """, (*ARCHIVED_STATUSES, cutoff, batch_size)).fetchall()]
+
+        if ids:
+            id_list = ", ".join("?" for _ in ids)
+            conn.execute(f"""
+                INSERT INTO consultations_archive ({CONSULTATION_COLUMNS}, archived_at)
+                SELECT {CONSULTATION_COLUMNS}, CURRENT_TIMESTAMP FROM consultations
+                WHERE id IN ({id_list})
+            """, ids)
+            conn.execute(f"DELETE FROM consultations WHERE id IN ({id_list})", ids)
+
+        conn.execute("COMMIT")
+        return len(ids)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def archive_reviewed(conn, retention_days=RETENTION_DAYS, batch_size=BATCH_SIZE, max_batches=None, pause=0.0):
+    """
+    Archive all eligible consultations in batches.
+
+    Each batch is its own short write transaction; pause yields the write
+    lock to request handlers between batches.
+    """
+    cutoff = (datetime.utcnow() - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+    moved = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(conn, cutoff, batch_size)
+        moved += count
+        batches += 1
+        if count < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return moved
+
+
+def auto_vacuum_mode(conn):
+    return AUTO_VACUUM_MODES.get(conn.execute("PRAGMA auto_vacuum").fetchone()[0], "unknown")
+
+
+def enable_incremental_vacuum(conn):
+    """Switch an existing database to incremental auto-vacuum (requires one full VACUUM)"""
+    if auto_vacuum_mode(conn) == "incremental":
+        return False
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    full_vacuum(conn)
+    return True
+
+
+def full_vacuum(conn):
+    """
+    Rewrite the whole database file.
+
+    VACUUM may renumber the implicit rowids of the consultations tables,
+    which the search index is keyed on, so it is rebuilt.
+    """
+    conn.execute("VACUUM")
+    rebuild_search_index(conn)
+
+
+def incremental_vacuum(conn, pages=VACUUM_PAGES):
+    """Return up to pages free pages to the filesystem; no-op unless incremental mode is on"""
+    if auto_vacuum_mode(conn) != "incremental":
+        return 0
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+    after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return before - after
+
+
+def table_stats(conn):
+    """Row counts per tier plus page-level storage figures for the database file"""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    hot_by_status = dict(conn.execute(
+        "SELECT status, COUNT(*) FROM consultations GROUP BY status"
+    ).fetchall())
+    archived = conn.execute("SELECT COUNT(*) FROM consultations_archive").fetchone()[0]
+    oldest_archived = conn.execute("SELECT MIN(created_at) FROM consultations_archive").fetchone()[0]
+
+    return {
+        "consultations": {
+            "hot_rows": sum(hot_by_status.values()),
+            "hot_by_status": hot_by_status,
+            "archived_rows": archived,
+            "oldest_archived": oldest_archived
+        },
+        "storage": {
+            "page_size": page_size,
+            "page_count": page_count,
+            "freelist_count": freelist_count,
+            "database_bytes": page_size * page_count,
+            "free_bytes": page_size * freelist_count,
+            "auto_vacuum": auto_vacuum_mode(conn)
+        },
+        "retention_days": RETENTION_DAYS
+    }
+
+
+class RetentionWorker(threading.Thread):
+    """Background thread that archives, vacuums and records the last run's figures"""
+
+    def __init__(self, db_path=DATABASE_URL, interval=INTERVAL_SECONDS, retention_days=RETENTION_DAYS,
+                 batch_size=BATCH_SIZE, full_vacuum_hours=FULL_VACUUM_HOURS):
+        super().__init__(name="consultation-retention", daemon=True)
+        self.db_path = db_path
+        self.interval = interval
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.full_vacuum_hours = full_vacuum_hours
+        self.last_full_vacuum = time.monotonic()
+        self.last_run = None
+        self._stop_event = threading.Event()
+
+    def run_once(self):
+        conn = connect(self.db_path)
+        try:
+            started = time.perf_counter()
+            moved = archive_reviewed(conn, self.retention_days, self.batch_size, pause=0.05)
+            freed = incremental_vacuum(conn)
+
+            if self.full_vacuum_hours and time.monotonic() - self.last_full_vacuum >= self.full_vacuum_hours * 3600:
+                full_vacuum(conn)
+                self.last_full_vacuum = time.monotonic()
+
+            self.last_run = {
+                "finished_at": datetime.now().isoformat(),
+                "archived_rows": moved,
+                "freed_pages": freed,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+            }
+            return self.last_run
+        finally:
+            conn.close()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except sqlite3.Error as e:
+                print(f"⚠️ Retention run failed: {e}")
+            self._stop_event.wait(self.interval)
+
+    def stop(self, timeout=5):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
+def start_retention_worker(db_path=DATABASE_URL):
+    """Start the background worker unless retention is disabled (CONSULTATION_RETENTION_DAYS=0)"""
+    if RETENTION_DAYS <= 0:
+        return None
+    worker = RetentionWorker(db_path)
+    worker.start()
+    return worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive reviewed consultations and report table sizes")
+    parser.add_argument("--db", default=DATABASE_URL)
+    parser.add_argument("--days", type=float, default=RETENTION_DAYS)
+    parser.add_argument("--stats", action="store_true", help="print table size metrics")
+    parser.add_argument("--run-once", action="store_true", help="archive and vacuum once, then exit")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="convert the database to incremental auto-vacuum (runs a full VACUUM)")
+    args = parser.parse_args()
+
+    if args.enable_incremental_vacuum:
+        conn = connect(args.db)
+        changed = enable_incremental_vacuum(conn)
+        conn.close()
+        print("✅ Incremental vacuum enabled" if changed else "✅ Incremental vacuum already enabled")
+
+    if args.run_once:
+        worker = RetentionWorker(args.db, retention_days=args.days)
+        print(json.dumps(worker.run_once(), indent=2))
+
+    if args.stats or not (args.run_once or args.enable_incremental_vacuum):
+        conn = connect(args.db)
+        print(json.dumps(table_stats(conn), indent=2))
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,20 @@ import http.server
 import socketserver
 import json
 import sqlite3
-import hashlib
 import secrets
 from datetime import datetime
-from urllib.parse import urlparse, parse_qs
-import os
+from urllib.parse import urlparse, parse_qs, unquote
+import time
+
+from consultation_queue import list_consultations, DEFAULT_PAGE_SIZE
+from migrations import migrate, seed_default_doctor
+from retention import start_retention_worker, table_stats
+from write_behind import ConsultationWriter
+from doctor_auth import doctor_key_cache
+from password_hashing import hash_password_pooled, verify_password_pooled
+from fast_json import rows_to_json
+from static_assets import StaticAssets
+from instrumentation import CONTENT_TYPE, REQUEST_DURATION, InstrumentedConnection, render_metrics
 
 # Server configuration
 PORT = 5000
@@ -21,60 +30,50 @@ HOST = "127.0.0.1"
 # Database setup
 DATABASE_URL = "chatbot.db"
 
+# Group-committed consultation inserts from /chat
+consultation_writer = ConsultationWriter(DATABASE_URL)
+
+# Whitelisted, precompressed static assets (never the database or sources)
+static_assets = StaticAssets()
+
+# Routes reported by name in request metrics; everything else is "static"
+API_ROUTES = {"/health", "/metrics", "/_list_recent", "/_storage_stats", "/chat", "/doctor_review", "/register", "/login"}
+
 def init_db():
     """Initialize SQLite database"""
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    
-    # Create consultations table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS consultations (
-            id TEXT PRIMARY KEY,
-            patient_name TEXT NOT NULL,
-            symptoms TEXT NOT NULL,
-            chatbot_recommendation TEXT NOT NULL,
-            status TEXT DEFAULT 'pending',
-            doctor_name TEXT,
-            doctor_note TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create doctors table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS doctors (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            access_key TEXT UNIQUE NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
+    # Schema lives in migrations.py so existing databases pick up new versions
+    migrate(DATABASE_URL)
+    seed_default_doctor(DATABASE_URL)
+
+class ThreadingServer(socketserver.ThreadingTCPServer):
+    """Threaded so concurrent /chat requests can share a group commit"""
+    daemon_threads = True
+    request_queue_size = 128
+
+class ChatbotHandler(http.server.SimpleHTTPRequestHandler):
+    def parse_request(self):
+        """Start the request timer once the request line has arrived"""
+        self.request_started = time.perf_counter()
+        self.response_status = None
+        return super().parse_request()
     
-    # Create users table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
+    def send_response(self, code, message=None):
+        self.response_status = code
+        super().send_response(code, message)
     
-    # Insert default doctor
-    cursor.execute("SELECT COUNT(*) FROM doctors")
-    if cursor.fetchone()[0] == 0:
-        cursor.execute("""
-            INSERT INTO doctors (name, email, access_key) 
-            VALUES (?, ?, ?)
-        """, ("Dr. Admin", "admin@healthcare.com", "doctor123"))
+    def handle_one_request(self):
+        """Record per-route latency for every request handled"""
+        self.request_started = None
+        super().handle_one_request()
+        if self.request_started is not None and self.response_status is not None:
+            path = urlparse(self.path).path
+            REQUEST_DURATION.observe(
+                time.perf_counter() - self.request_started,
+                method=self.command,
+                route=path if path in API_ROUTES else "static",
+                status=self.response_status
+            )
     
-    conn.commit()
-    conn.close()
-
-class ChatbotHandler(http.server.SimpleHTTPRequestHandler):
     def do_GET(self):
         """Handle GET requests"""
         parsed_path = urlparse(self.path)
@@ -89,44 +88,112 @@ class ChatbotHandler(http.server.SimpleHTTPRequestHandler):
             self.wfile.write(json.dumps(response).encode())
             return
             
+        elif parsed_path.path == "/metrics":
+            body = render_metrics()
+            self.send_response(200)
+            self.send_header("Content-type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+            
         elif parsed_path.path == "/_list_recent":
+            params = parse_qs(parsed_path.query)
+            
+            conn = sqlite3.connect(DATABASE_URL, factory=InstrumentedConnection)
+            conn.row_factory = sqlite3.Row
+            
+            try:
+                rows, next_cursor = list_consultations(
+                    conn,
+                    status=params.get("status", ["pending"])[0],
+                    since=params.get("since", [None])[0],
+                    limit=int(params.get("limit", [DEFAULT_PAGE_SIZE])[0]),
+                    cursor=params.get("cursor", [None])[0]
+                )
+            except ValueError as e:
+                self.send_response(400)
+                self.send_header("Content-type", "application/json")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(json.dumps({"error": str(e)}).encode())
+                return
+            finally:
+                conn.close()
+            
+            # Serialize rows straight to bytes (see fast_json for the orjson exception)
+            body = rows_to_json(rows)
+            
             self.send_response(200)
             self.send_header("Content-type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
             self.send_header("Access-Control-Allow-Origin", "*")
+            if next_cursor:
+                self.send_header("X-Next-Cursor", next_cursor)
+                self.send_header("Access-Control-Expose-Headers", "X-Next-Cursor")
             self.end_headers()
             
-            conn = sqlite3.connect(DATABASE_URL)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            self.wfile.write(body)
+            return
             
-            cursor.execute("""
-                SELECT * FROM consultations 
-                WHERE status = 'pending' 
-                ORDER BY created_at DESC 
-                LIMIT 50
-            """)
+        elif parsed_path.path == "/_storage_stats":
+            if self.require_doctor() is None:
+                return
             
-            consultations = []
-            for row in cursor.fetchall():
-                consultations.append({
-                    "id": row["id"],
-                    "patient_name": row["patient_name"],
-                    "symptoms": row["symptoms"],
-                    "chatbot_recommendation": row["chatbot_recommendation"],
-                    "status": row["status"],
-                    "doctor_name": row["doctor_name"],
-                    "doctor_note": row["doctor_note"],
-                    "created_at": row["created_at"],
-                    "updated_at": row["updated_at"]
-                })
+            conn = sqlite3.connect(DATABASE_URL, factory=InstrumentedConnection)
+            try:
+                stats = table_stats(conn)
+            finally:
+                conn.close()
             
-            conn.close()
-            self.wfile.write(json.dumps(consultations).encode())
+            self.send_response(200)
+            self.send_header("Content-type", "application/json")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(json.dumps(stats).encode())
             return
             
         # Serve static files
         else:
-            super().do_GET()
+            self.serve_static(parsed_path.path)
+    
+    def require_doctor(self):
+        """Doctor id for the X-Doctor-Key header, or None after sending a 401"""
+        access_key = self.headers.get("X-Doctor-Key")
+        doctor_id = doctor_key_cache.verify(access_key) if access_key else None
+        if doctor_id is None:
+            self.send_response(401)
+            self.send_header("Content-type", "application/json")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            error = "Invalid doctor access key" if access_key else "Doctor access key required"
+            self.wfile.write(json.dumps({"error": error}).encode())
+        return doctor_id
+    
+    def do_HEAD(self):
+        """Handle HEAD requests for static files"""
+        self.serve_static(urlparse(self.path).path, head_only=True)
+    
+    def serve_static(self, path, head_only=False):
+        """Serve a whitelisted asset, sending the file with sendfile where available"""
+        status, headers, file_path = static_assets.prepare(unquote(path), self.headers)
+        
+        if status == 404:
+            self.send_response(404)
+            self.send_header("Content-Length", "9")
+            self.end_headers()
+            if not head_only:
+                self.wfile.write(b"Not Found")
+            return
+        
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        
+        if file_path and not head_only:
+            with open(file_path, "rb") as f:
+                self.connection.sendfile(f)
     
     def do_POST(self):
         """Handle POST requests"""
@@ -172,18 +239,9 @@ class ChatbotHandler(http.server.SimpleHTTPRequestHandler):
         # Generate AI response
         response = self.generate_ai_response(message)
         
-        # Save consultation
-        conn = sqlite3.connect(DATABASE_URL)
-        cursor = conn.cursor()
-        
+        # Save consultation (batched by the write-behind buffer)
         consult_id = secrets.token_urlsafe(16)
-        cursor.execute("""
-            INSERT INTO consultations (id, patient_name, symptoms, chatbot_recommendation)
-            VALUES (?, ?, ?, ?)
-        """, (consult_id, f"User_{user_id}", message, response))
-        
-        conn.commit()
-        conn.close()
+        consultation_writer.submit(consult_id, f"User_{user_id}", message, response)
         
         # Send response
         self.send_response(200)
@@ -263,7 +321,10 @@ Please describe your symptoms or health concern, and I'll provide evidence-based
         doctor_name = data.get("doctor_name")
         doctor_note = data.get("doctor_note")
         
-        conn = sqlite3.connect(DATABASE_URL)
+        # A consultation created moments ago may still be in the write-behind buffer
+        consultation_writer.ensure_written(consult_id)
+        
+        conn = sqlite3.connect(DATABASE_URL, factory=InstrumentedConnection)
         cursor = conn.cursor()
         
         try:
@@ -312,7 +373,7 @@ Please describe your symptoms or health concern, and I'll provide evidence-based
         email = data.get("email")
         password = data.get("password")
         
-        conn = sqlite3.connect(DATABASE_URL)
+        conn = sqlite3.connect(DATABASE_URL, factory=InstrumentedConnection)
         cursor = conn.cursor()
         
         try:
@@ -321,8 +382,8 @@ Please describe your symptoms or health concern, and I'll provide evidence-based
             if cursor.fetchone():
                 raise Exception("Email already registered")
             
-            # Hash password
-            hashed_password = hashlib.sha256(password.encode()).hexdigest()
+            # Hash password (salted KDF on the bounded hashing pool)
+            hashed_password = hash_password_pooled(password)
             
             cursor.execute("""
                 INSERT INTO users (name, email, password)
@@ -355,21 +416,26 @@ Please describe your symptoms or health concern, and I'll provide evidence-based
         email = data.get("email")
         password = data.get("password")
         
-        conn = sqlite3.connect(DATABASE_URL)
+        conn = sqlite3.connect(DATABASE_URL, factory=InstrumentedConnection)
         cursor = conn.cursor()
         
         try:
-            hashed_password = hashlib.sha256(password.encode()).hexdigest()
-            
             cursor.execute("""
-                SELECT id, name, email FROM users 
-                WHERE email = ? AND password = ?
-            """, (email, hashed_password))
+                SELECT id, name, email, password FROM users 
+                WHERE email = ?
+            """, (email,))
             
             user = cursor.fetchone()
-            if not user:
+            valid, needs_rehash = verify_password_pooled(password, user[3] if user else None)
+            if not valid:
                 raise Exception("Invalid credentials")
             
+            # Upgrade legacy SHA-256 or lower-cost hashes now that we know the password
+            if needs_rehash:
+                cursor.execute("UPDATE users SET password = ? WHERE id = ?",
+                               (hash_password_pooled(password), user[0]))
+                conn.commit()
+            
             self.send_response(200)
             self.send_header("Content-type", "application/json")
             self.send_header("Access-Control-Allow-Origin", "*")
@@ -405,13 +471,17 @@ def main():
     init_db()
     print("✅ Database initialized successfully")
     
+    # Archive reviewed consultations in the background
+    retention_worker = start_retention_worker(DATABASE_URL)
+    
     # Start server
-    with socketserver.TCPServer((HOST, PORT), ChatbotHandler) as httpd:
+    with ThreadingServer((HOST, PORT), ChatbotHandler) as httpd:
         print(f"🌐 Server running on http://{HOST}:{PORT}")
         print("📚 Available endpoints:")
         print(f"   - Health: http://{HOST}:{PORT}/health")
         print(f"   - Chat: http://{HOST}:{PORT}/chat")
         print(f"   - Consultations: http://{HOST}:{PORT}/_list_recent")
+        print(f"   - Metrics: http://{HOST}:{PORT}/metrics")
         print(f"   - Doctor Panel: http://{HOST}:{PORT}/doctor-panel.html")
         print(f"   - Chatbot Demo: http://{HOST}:{PORT}/chatbot-demo.html")
         print(f"   - Main Site: http://{HOST}:{PORT}/index.html")
@@ -422,6 +492,10 @@ def main():
             httpd.serve_forever()
         except KeyboardInterrupt:
             print("\n👋 Server stopped. Goodbye!")
+        finally:
+            if retention_worker:
+                retention_worker.stop()
+            consultation_writer.close()
 
 if __name__ == "__main__":
     main()
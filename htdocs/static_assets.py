@@ -0,0 +1,274 @@
+"""
+Static asset serving for main.py and simple_server.py
+
+Only whitelisted file types under STATIC_ROOT, a directory that holds
+nothing but the front end (static/), are served; databases, the Chroma
+directories, Python/PHP sources and SQL dumps are never reachable.
+Every asset is indexed at startup with an ETag and Last-Modified, and
+compressible files get gzip (and brotli, if the 'brotli' package is
+installed) variants written once to STATIC_CACHE_DIR. Each response is
+then a file on disk that can be handed to sendfile. Edited files are
+re-indexed on their next request and files added later are indexed on
+their first one; hashing and compression happen outside the index lock,
+so other requests are never held up by them.
+
+Each asset is also reachable under a fingerprinted alias
+(name.<hash>.ext, see url_for()). Those URLs, and files that already carry
+a content hash in their name, get a one-year immutable Cache-Control;
+plain names are revalidated with ETag/If-None-Match and answered with 304.
+
+Configuration (environment variables):
+  STATIC_ROOT          directory to serve from (default: static/ next to this module)
+  STATIC_CACHE_DIR     where compressed variants are written (default: <tmp>/healthbot-static)
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import brotli
+except ImportError:  # brotli variants are optional
+    brotli = None
+
+STATIC_ROOT = os.getenv("STATIC_ROOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"))
+STATIC_CACHE_DIR = os.getenv("STATIC_CACHE_DIR", os.path.join(tempfile.gettempdir(), "healthbot-static"))
+
+ALLOWED_SUFFIXES = {
+    ".html", ".css", ".js", ".map", ".svg", ".png", ".jpg", ".jpeg", ".gif",
+    ".webp", ".ico", ".woff", ".woff2", ".ttf", ".webmanifest"
+}
+COMPRESSIBLE_SUFFIXES = {".html", ".css", ".js", ".map", ".svg", ".webmanifest"}
+EXCLUDED_DIRS = {"chroma_db", "vector_db", "test_vector_db", "__pycache__", "node_modules"}
+
+MIN_COMPRESS_BYTES = 1024
+FINGERPRINT = re.compile(r"\.[0-9a-f]{8,}\.[^.]+$")
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+
+class Asset:
+    def __init__(self, url_path, path, stat, digest, cache_dir):
+        self.url_path = url_path
+        self.path = path
+        self.mtime = stat.st_mtime
+        self.size = stat.st_size
+        self.etag = f'"{digest[:16]}"'
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/") or self.content_type in ("application/javascript", "image/svg+xml"):
+            self.content_type += "; charset=utf-8"
+        self.immutable = bool(FINGERPRINT.search(url_path))
+        root, ext = os.path.splitext(url_path)
+        self.fingerprinted_path = url_path if self.immutable else f"{root}.{digest[:10]}{ext}"
+        self.variants = {"identity": (path, stat.st_size)}
+        self._build_variants(digest, cache_dir)
+
+    def _build_variants(self, digest, cache_dir):
+        suffix = os.path.splitext(self.path)[1].lower()
+        if suffix not in COMPRESSIBLE_SUFFIXES or self.size < MIN_COMPRESS_BYTES:
+            return
+
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        encoders = [("gzip", ".gz", lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.insert(0, ("br", ".br", lambda raw: brotli.compress(raw, quality=11)))
+
+        os.makedirs(cache_dir, exist_ok=True)
+        for encoding, extension, compress in encoders:
+            # Content-addressed names, so variants survive restarts and are never stale
+            variant = os.path.join(cache_dir, f"{digest[:32]}{extension}")
+            if not os.path.exists(variant):
+                compressed = compress(data)
+                if len(compressed) >= len(data):
+                    continue
+                tmp = f"{variant}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(compressed)
+                os.replace(tmp, variant)
+            self.variants[encoding] = (variant, os.path.getsize(variant))
+
+
+def _accepted_encodings(accept_encoding):
+    """Parse Accept-Encoding into the set of codings with a non-zero q value"""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding)
+    return accepted
+
+
+class StaticAssets:
+    def __init__(self, root=STATIC_ROOT, cache_dir=STATIC_CACHE_DIR):
+        self.root = os.path.abspath(root)
+        self.cache_dir = cache_dir
+        self._assets = {}
+        self._aliases = {}
+        # simple_server.py serves from many threads; guards _assets/_aliases
+        self._lock = threading.Lock()
+        self.scan()
+
+    def scan(self):
+        """Index every whitelisted file under root"""
+        assets = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in EXCLUDED_DIRS and not d.startswith(".")]
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                url_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if self._allowed(url_path):
+                    assets.append(self._build(url_path, path))
+
+        with self._lock:
+            self._assets = {asset.url_path: asset for asset in assets}
+            self._aliases = {asset.fingerprinted_path: asset.url_path for asset in assets}
+
+    def _allowed(self, url_path):
+        parts = url_path.split("/")
+        if any(not part or part in (".", "..") or part.startswith(".") for part in parts):
+            return False
+        if any(part in EXCLUDED_DIRS for part in parts[:-1]):
+            return False
+        return os.path.splitext(parts[-1])[1].lower() in ALLOWED_SUFFIXES
+
+    def _build(self, url_path, path):
+        """Hash and compress one file; runs without the lock"""
+        stat = os.stat(path)
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+        return Asset(url_path, path, stat, digest.hexdigest(), self.cache_dir)
+
+    def _install(self, asset, replaces=None):
+        """Swap a built asset into the index unless another thread changed the entry meanwhile"""
+        with self._lock:
+            current = self._assets.get(asset.url_path)
+            if current is not replaces:
+                return current or asset
+            if current is not None:
+                self._aliases.pop(current.fingerprinted_path, None)
+            self._assets[asset.url_path] = asset
+            self._aliases[asset.fingerprinted_path] = asset.url_path
+        return asset
+
+    def _discover(self, url_path):
+        """Index a file added under root after startup, or None"""
+        if not self._allowed(url_path):
+            return None
+        path = os.path.realpath(os.path.join(self.root, *url_path.split("/")))
+        if os.path.commonpath([path, os.path.realpath(self.root)]) != os.path.realpath(self.root):
+            return None
+        try:
+            return self._install(self._build(url_path, path))
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return None
+
+    def lookup(self, url_path):
+        """Return (asset, immutable) for a request path, or (None, False)"""
+        url_path = url_path.lstrip("/")
+        immutable = False
+        with self._lock:
+            if url_path in self._aliases and url_path not in self._assets:
+                url_path = self._aliases[url_path]
+                immutable = True
+            asset = self._assets.get(url_path)
+
+        if asset is None:
+            asset = self._discover(url_path)
+            if asset is None:
+                return None, False
+            return asset, asset.immutable
+
+        # Pick up edits made while the server is running
+        try:
+            stat = os.stat(asset.path)
+        except FileNotFoundError:
+            with self._lock:
+                if self._assets.get(url_path) is asset:
+                    del self._assets[url_path]
+                    self._aliases.pop(asset.fingerprinted_path, None)
+            return None, False
+        if stat.st_mtime != asset.mtime or stat.st_size != asset.size:
+            try:
+                asset = self._install(self._build(url_path, asset.path), replaces=asset)
+            except FileNotFoundError:
+                return None, False
+
+        return asset, immutable or asset.immutable
+
+    def url_for(self, name, prefix=""):
+        """Fingerprinted URL for an asset, suitable for long-lived caching"""
+        with self._lock:
+            asset = self._assets.get(name.lstrip("/"))
+        return f"{prefix}/{asset.fingerprinted_path}" if asset else f"{prefix}/{name.lstrip('/')}"
+
+    def prepare(self, url_path, request_headers):
+        """
+        Resolve a request to (status, headers, file_path).
+
+        request_headers needs .get(); file_path is None for 304/404. The
+        caller sends the file (ideally with sendfile) for status 200.
+        """
+        if url_path in ("", "/"):
+            url_path = "index.html"
+        asset, immutable = self.lookup(url_path)
+        if asset is None:
+            return 404, {}, None
+
+        headers = {
+            "ETag": asset.etag,
+            "Last-Modified": asset.last_modified,
+            "Cache-Control": IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE,
+            "Vary": "Accept-Encoding",
+        }
+
+        if self._not_modified(asset, request_headers):
+            return 304, headers, None
+
+        accepted = _accepted_encodings(request_headers.get("Accept-Encoding"))
+        encoding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in asset.variants and candidate in accepted:
+                encoding = candidate
+                break
+
+        path, size = asset.variants[encoding]
+        headers["Content-Type"] = asset.content_type
+        headers["Content-Length"] = str(size)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return 200, headers, path
+
+    @staticmethod
+    def _not_modified(asset, request_headers):
+        if_none_match = request_headers.get("If-None-Match")
+        if if_none_match:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or asset.etag in tags
+
+        if_modified_since = request_headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return int(asset.mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
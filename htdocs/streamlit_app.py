@@ -1,6 +1,14 @@
 """
 Streamlit Web App for the Medical Assistant AI (Informational Only)
 
+Answers are cached per normalized symptom description (see
+medical_assistant_agent.py), so a repeated question is answered without
+another model call, also across browser sessions. Non-streamed answers
+additionally go through st.cache_data with the same TTL and size; with
+ADVICE_CACHE_TTL=0 both layers are off. By default the answer is
+streamed as it is generated, with the time to the first token shown
+under it.
+
 Run locally:
   pip install streamlit
   streamlit run streamlit_app.py
@@ -9,7 +17,34 @@ Run locally:
 from __future__ import annotations
 
 import streamlit as st
-from medical_assistant_agent import generate_otc_advice
+from medical_assistant_agent import (
+    ADVICE_CACHE_SIZE,
+    ADVICE_CACHE_TTL,
+    AdviceError,
+    advice_key,
+    generate_otc_advice,
+    stream_otc_advice,
+)
+
+
+def _advice(key: str, _symptoms: str) -> str:
+    """Advice for the symptoms; only key (the normalized symptoms) is hashed by st.cache_data"""
+    return generate_otc_advice(_symptoms, raise_errors=True)
+
+
+if ADVICE_CACHE_TTL > 0:
+    # Shared by every session; keyed on the normalized symptoms, errors are not cached
+    _cached_advice = st.cache_data(ttl=ADVICE_CACHE_TTL, max_entries=ADVICE_CACHE_SIZE,
+                                   show_spinner=False)(_advice)
+else:
+    _cached_advice = None
+
+
+def cached_advice(symptoms: str) -> str:
+    """Advice through st.cache_data, or straight from the agent when caching is disabled"""
+    if _cached_advice is None:
+        return generate_otc_advice(symptoms, raise_errors=True)
+    return _cached_advice(advice_key(symptoms), symptoms)
 
 
 st.set_page_config(page_title="Informational Medical Assistant", page_icon="🩺", layout="centered")
@@ -26,14 +61,31 @@ with st.form("symptom_form"):
         placeholder="e.g., sore throat, runny nose, mild fever for 2 days",
         height=120,
     )
+    stream = st.checkbox("Stream the answer as it is written", value=True)
     submitted = st.form_submit_button("Get Suggestions")
 
 if submitted:
     if not symptoms.strip():
         st.warning("Please enter some symptoms.")
     else:
-        result = generate_otc_advice(symptoms)
-        st.markdown(result)
+        try:
+            if stream:
+                timings: dict = {}
+                st.write_stream(stream_otc_advice(symptoms, timings=timings))
+                if timings.get("fallback"):
+                    st.caption(f"⚠️ No model tokens arrived (gave up after {timings.get('total_seconds', 0):.1f} s)")
+                else:
+                    source = "cache" if timings.get("cached") else "model"
+                    st.caption(
+                        f"⚡ First token after {timings.get('first_token_seconds', 0) * 1000:.0f} ms, "
+                        f"complete in {timings.get('total_seconds', 0):.1f} s (from {source})"
+                    )
+            else:
+                with st.spinner("Thinking..."):
+                    result = cached_advice(symptoms)
+                st.markdown(result)
+        except AdviceError as e:
+            st.error(str(e))
 
 with st.expander("About"):
     st.write(
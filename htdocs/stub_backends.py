@@ -0,0 +1,77 @@
+"""
+Offline stand-ins for the model backends
+
+Used by load tests and benchmarks so the services run without network
+access or API keys:
+  EMBEDDING_BACKEND=stub   rag_vector_api.py uses HashingEmbedder instead of SentenceTransformer
+  LLM_BACKEND=stub         gemini_chat_api.py uses StubGenerativeModel instead of Gemini
+
+Both are deterministic. Optional artificial latency keeps timings
+production-shaped:
+  STUB_ENCODE_MS       delay per encode() call (default 0)
+  STUB_LLM_LATENCY_MS  delay per generate_content() call (default 50)
+"""
+
+import hashlib
+import os
+import re
+import time
+
+import numpy as np
+
+STUB_ENCODE_MS = float(os.getenv("STUB_ENCODE_MS", "0"))
+STUB_LLM_LATENCY_MS = float(os.getenv("STUB_LLM_LATENCY_MS", "50"))
+
+_TOKEN = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """Feature-hashed bag of words with the same shape as all-MiniLM-L6-v2 output"""
+
+    def __init__(self, dimension=384, latency_ms=STUB_ENCODE_MS):
+        self.dimension = dimension
+        self.latency_ms = latency_ms
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, sentences, batch_size=32, normalize_embeddings=True, **kwargs):
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        vectors = np.zeros((len(sentences), self.dimension), dtype=np.float32)
+        for row, text in enumerate(sentences):
+            for token in _TOKEN.findall(text.lower()):
+                digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+                index = int.from_bytes(digest[:4], "little") % self.dimension
+                vectors[row, index] += 1.0 if digest[4] & 1 else -1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms == 0, 1, norms)
+        return vectors[0] if single else vectors
+
+
+class _StubResponse:
+    def __init__(self, text):
+        self.text = text
+        self.candidates = []
+
+
+class StubGenerativeModel:
+    """Answers like genai.GenerativeModel.generate_content, after a fixed delay"""
+
+    def __init__(self, model_name="stub", latency_ms=STUB_LLM_LATENCY_MS):
+        self.model_name = model_name
+        self.latency_ms = latency_ms
+
+    def generate_content(self, parts):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        last = parts[-1]["content"] if parts and isinstance(parts[-1], dict) else str(parts)
+        return _StubResponse(
+            f"(stub reply) You said: {last[:200]}. "
+            "Please consult a medical professional for serious issues."
+        )
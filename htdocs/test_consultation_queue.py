@@ -0,0 +1,140 @@
+import base64
+import json
+import sqlite3
+
+import pytest
+
+from consultation_queue import (decode_cursor, encode_cursor, get_consultation, list_consultations,
+                                rebuild_search_index, search_consultations)
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("DELETE FROM consultations")
+    # Two rows share a timestamp so the id tie-breaker is exercised
+    rows = [(f"c{i}", f"Patient {i}", "fever", "rest", "pending", f"2025-01-0{min(i, 8) + 1} 10:00:00")
+            for i in range(10)]
+    rows += [(f"a{i}", f"Patient a{i}", "cough", "rest", "approved", f"2025-02-0{i + 1} 10:00:00")
+             for i in range(3)]
+    conn.executemany("""
+        INSERT INTO consultations (id, patient_name, symptoms, chatbot_recommendation, status, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def _all_pages(conn, **kwargs):
+    ids = []
+    cursor = None
+    while True:
+        rows, cursor = list_consultations(conn, cursor=cursor, **kwargs)
+        ids.extend(row["id"] for row in rows)
+        if cursor is None:
+            return ids
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("2025-01-01 10:00:00", "abc")
+    assert decode_cursor(cursor) == ("2025-01-01 10:00:00", "abc")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    "%%%",
+    base64.urlsafe_b64encode(b"[1, 2]").decode(),
+    base64.urlsafe_b64encode(json.dumps(["only one"]).encode()).decode(),
+])
+def test_malformed_cursor_is_rejected(conn, cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        list_consultations(conn, cursor=cursor)
+
+
+def test_unknown_status_is_rejected(conn):
+    with pytest.raises(ValueError, match="Invalid status"):
+        list_consultations(conn, status="deleted")
+
+
+def test_pages_cover_queue_once_newest_first(conn):
+    everything, cursor = list_consultations(conn, limit=100)
+    assert cursor is None
+    expected = [row["id"] for row in everything]
+    assert len(expected) == 10
+
+    assert _all_pages(conn, limit=3) == expected
+    assert _all_pages(conn, limit=1) == expected
+
+
+def test_since_limits_pages(conn):
+    ids = _all_pages(conn, limit=2, since="2025-01-08T00:00:00Z")
+    assert ids == ["c9", "c8", "c7"]
+
+
+def test_since_offsets_are_converted_to_utc(conn):
+    # 15:30 at +05:30 is 10:00 UTC, exactly when c7 was created
+    assert _all_pages(conn, since="2025-01-08T15:30:00+05:30") == ["c9", "c8", "c7"]
+    assert _all_pages(conn, since="2025-01-08T16:00:00+05:30") == ["c9", "c8"]
+    assert _all_pages(conn, since="2025-01-08 10:00:00") == ["c9", "c8", "c7"]
+
+
+@pytest.mark.parametrize("since", ["yesterday", "2025-13-01", "2025-01-08T25:00"])
+def test_invalid_since_is_rejected(conn, since):
+    with pytest.raises(ValueError):
+        list_consultations(conn, since=since)
+
+
+def test_archived_statuses_span_both_tiers(conn):
+    conn.execute("""
+        INSERT INTO consultations_archive (id, patient_name, symptoms, chatbot_recommendation, status, created_at)
+        SELECT id, patient_name, symptoms, chatbot_recommendation, status, created_at
+        FROM consultations WHERE id = 'a1'
+    """)
+    conn.execute("DELETE FROM consultations WHERE id = 'a1'")
+    conn.commit()
+
+    assert _all_pages(conn, status="approved", limit=1) == ["a2", "a1", "a0"]
+    assert get_consultation(conn, "a1")["status"] == "approved"
+    assert get_consultation(conn, "missing") is None
+
+
+def _archive(conn, consult_id):
+    """Move a row to the archive the way retention.py does"""
+    conn.execute(f"""
+        INSERT INTO consultations_archive (id, patient_name, symptoms, chatbot_recommendation, status,
+                                           doctor_note, created_at)
+        SELECT id, patient_name, symptoms, chatbot_recommendation, status, doctor_note, created_at
+        FROM consultations WHERE id = ?
+    """, (consult_id,))
+    conn.execute("DELETE FROM consultations WHERE id = ?", (consult_id,))
+
+
+def test_search_scores_do_not_depend_on_the_tier(conn):
+    conn.execute("UPDATE consultations SET symptoms = 'migraine and nausea' WHERE id IN ('a0', 'a1')")
+    # A large archive of unrelated rows would skew per-tier bm25 statistics
+    conn.executemany("""
+        INSERT INTO consultations_archive (id, patient_name, symptoms, chatbot_recommendation, status)
+        VALUES (?, 'Filler', 'sprained ankle', 'ice and rest', 'approved')
+    """, [(f"f{i}",) for i in range(200)])
+    _archive(conn, "a1")
+
+    results, has_more = search_consultations(conn, "migraine")
+    assert not has_more
+    assert {(r["id"], r["tier"]) for r in results} == {("a0", "active"), ("a1", "archived")}
+    assert results[0]["score"] == results[1]["score"]
+    assert "<mark>" in results[0]["snippet"]
+
+
+def test_search_index_follows_updates_moves_and_vacuum(conn):
+    conn.execute("UPDATE consultations SET doctor_note = 'check thyroid' WHERE id = 'a2'")
+    _archive(conn, "a2")
+    conn.commit()
+    assert [(r["id"], r["tier"]) for r in search_consultations(conn, "thyroid")[0]] == [("a2", "archived")]
+
+    conn.execute("DELETE FROM consultations_archive WHERE id = 'a2'")
+    assert search_consultations(conn, "thyroid")[0] == []
+
+    rebuild_search_index(conn)
+    assert len(search_consultations(conn, "fever", limit=100)[0]) == 10
@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+
+from doctor_auth import DoctorKeyCache, add_doctor, rotate_doctor_key
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = sqlite3.connect(db_path)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def cache(db_path):
+    return DoctorKeyCache(db_path=db_path, ttl=3600, negative_ttl=3600)
+
+
+def test_valid_key_is_served_from_cache(cache):
+    assert cache.verify("doctor123") == 1
+    assert cache.verify("doctor123") == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.verify("wrong") is None
+
+
+def test_rotation_invalidates_the_old_key(conn, cache):
+    assert cache.verify("doctor123") == 1
+
+    new_key = rotate_doctor_key(conn, 1, "rotated-key", cache=cache)
+
+    assert new_key == "rotated-key"
+    assert cache.verify("doctor123") is None
+    assert cache.verify("rotated-key") == 1
+
+
+def test_rotation_clears_a_negatively_cached_new_key(conn, cache):
+    assert cache.verify("next-key") is None
+    rotate_doctor_key(conn, 1, "next-key", cache=cache)
+    assert cache.verify("next-key") == 1
+
+
+def test_added_doctor_is_not_stuck_as_rejected(conn, cache):
+    assert cache.verify("new-doctor-key") is None
+    doctor_id, _ = add_doctor(conn, "Dr. New", "new@example.com", "new-doctor-key", cache=cache)
+    assert cache.verify("new-doctor-key") == doctor_id
+
+
+def test_rotating_unknown_doctor_fails(conn, cache):
+    with pytest.raises(ValueError):
+        rotate_doctor_key(conn, 999, cache=cache)
+
+
+def test_cache_is_bounded(cache):
+    cache.max_size = 3
+    for i in range(10):
+        cache.verify(f"key-{i}")
+    assert cache.stats()["size"] == 3
@@ -0,0 +1,41 @@
+import json
+import sqlite3
+
+import pytest
+
+import fast_json
+
+
+@pytest.fixture(params=["stdlib", "orjson"])
+def encoder(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(fast_json, "orjson", None)
+    elif fast_json.orjson is None:
+        pytest.skip("orjson is not installed")
+    return fast_json.rows_to_json
+
+
+def _rows():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute('CREATE TABLE t (id TEXT, "50%" INTEGER, score REAL, note TEXT)')
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?)", [
+        ("a", 1, 0.5, 'quote " and \\ backslash'),
+        ("b", None, -2.25, "⚠️ non-ASCII\nnewline %s"),
+    ])
+    rows = conn.execute("SELECT * FROM t").fetchall()
+    conn.close()
+    return rows
+
+
+def test_rows_become_objects_keyed_by_column(encoder):
+    rows = _rows()
+    assert json.loads(encoder(rows)) == [dict(row) for row in rows]
+
+
+def test_explicit_columns_for_plain_tuples(encoder):
+    assert json.loads(encoder([("a", 1)], columns=["id", "n"])) == [{"id": "a", "n": 1}]
+
+
+def test_empty_result(encoder):
+    assert json.loads(encoder([])) == []
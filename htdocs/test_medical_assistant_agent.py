@@ -0,0 +1,125 @@
+import pytest
+
+import medical_assistant_agent as agent
+from medical_assistant_agent import AdviceCache, advice_key, generate_otc_advice, stream_otc_advice
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """Count model round trips; each answer names its call number"""
+    calls = []
+
+    def ask(symptoms, model, temperature):
+        calls.append(symptoms)
+        return f"answer {len(calls)}"
+
+    def stream(symptoms, model, temperature):
+        calls.append(symptoms)
+        yield "streamed "
+        yield f"answer {len(calls)}"
+
+    monkeypatch.setattr(agent, "_ask_llm", ask)
+    monkeypatch.setattr(agent, "_stream_llm", stream)
+    monkeypatch.setattr(agent, "advice_cache", AdviceCache(ttl=3600, max_entries=8, path=""))
+    return calls
+
+
+def test_equivalent_descriptions_share_a_key():
+    assert advice_key("Fever, sore throat") == advice_key("  sore THROAT;fever.  ")
+    assert advice_key("fever") != advice_key("fever", model="gpt-4o")
+    assert advice_key("fever") != advice_key("fever", temperature=0.2)
+
+
+def test_wording_inside_a_symptom_matters():
+    assert advice_key("pain with urination") != advice_key("urination, pain")
+
+
+def test_repeat_question_is_answered_from_cache(monkeypatch, llm_calls):
+    monkeypatch.setattr(agent, "ADVICE_CACHE_TTL", 3600)
+    assert generate_otc_advice("fever, cough") == "answer 1"
+    assert generate_otc_advice("Cough, fever") == "answer 1"
+    assert "".join(stream_otc_advice("cough; fever")) == "answer 1"
+    assert len(llm_calls) == 1
+
+
+def test_ttl_zero_disables_the_cache(monkeypatch, llm_calls):
+    monkeypatch.setattr(agent, "ADVICE_CACHE_TTL", 0)
+    assert generate_otc_advice("fever, cough") == "answer 1"
+    assert generate_otc_advice("fever, cough") == "answer 2"
+    timings = {}
+    assert "".join(stream_otc_advice("fever, cough", timings=timings)) == "streamed answer 3"
+    assert timings["cached"] is False
+    assert len(llm_calls) == 3
+    assert agent.advice_cache.stats()["entries"] == 0
+
+
+def test_errors_are_not_cached(monkeypatch, llm_calls):
+    monkeypatch.setattr(agent, "ADVICE_CACHE_TTL", 3600)
+
+    def fail(symptoms, model, temperature):
+        raise agent.AdviceError("Error: rate limited")
+
+    monkeypatch.setattr(agent, "_ask_llm", fail)
+    assert generate_otc_advice("fever") == "Error: rate limited"
+    with pytest.raises(agent.AdviceError):
+        generate_otc_advice("fever", raise_errors=True)
+    assert agent.advice_cache.stats()["entries"] == 0
+
+
+def test_empty_replies_raise_when_asked(monkeypatch, llm_calls):
+    monkeypatch.setattr(agent, "ADVICE_CACHE_TTL", 3600)
+    monkeypatch.setattr(agent, "_ask_llm", lambda symptoms, model, temperature: "")
+
+    assert generate_otc_advice("fever") == agent.FALLBACK_ANSWER
+    # Raising keeps callers' own caches (st.cache_data) from storing the fallback
+    with pytest.raises(agent.AdviceError, match=agent.FALLBACK_ANSWER):
+        generate_otc_advice("fever", raise_errors=True)
+    assert agent.advice_cache.stats()["entries"] == 0
+
+
+def _observed_calls():
+    """Number of LLM_CALL observations for the default model"""
+    series = agent.LLM_CALL._values.get((agent.DEFAULT_MODEL,))
+    return series[2] if series else 0
+
+
+def test_empty_stream_reports_the_fallback(monkeypatch, llm_calls):
+    monkeypatch.setattr(agent, "_stream_llm", lambda symptoms, model, temperature: iter(()))
+    before = _observed_calls()
+
+    timings = {}
+    assert list(stream_otc_advice("fever", timings=timings)) == [agent.FALLBACK_ANSWER]
+    assert timings["fallback"] is True
+    assert "first_token_seconds" in timings and "total_seconds" in timings
+    assert _observed_calls() == before + 1
+
+
+def test_failed_stream_is_still_timed(monkeypatch, llm_calls):
+    def broken(symptoms, model, temperature):
+        yield "partial "
+        raise agent.AdviceError("Error: connection reset")
+
+    monkeypatch.setattr(agent, "_stream_llm", broken)
+    before = _observed_calls()
+
+    timings = {}
+    with pytest.raises(agent.AdviceError):
+        list(stream_otc_advice("fever", timings=timings))
+    assert _observed_calls() == before + 1
+    assert timings["fallback"] is False and "total_seconds" in timings
+    assert agent.advice_cache.stats()["entries"] == 0
+
+
+def test_disk_tier_is_shared_between_caches(tmp_path):
+    path = str(tmp_path / "advice.db")
+    AdviceCache(ttl=3600, path=path).put("key", "advice")
+
+    other = AdviceCache(ttl=3600, path=path)
+    assert other.get("key") == "advice"
+    assert other.stats()["disk_hits"] == 1
+
+
+def test_expired_entries_are_misses():
+    cache = AdviceCache(ttl=-1, path="")
+    cache.put("key", "advice")
+    assert cache.get("key") is None
@@ -0,0 +1,71 @@
+import sqlite3
+
+from migrations import MIGRATIONS, access_key_digest, current_version, migrate, seed_default_doctor
+
+
+def _schema(path):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(conn.execute("SELECT type, name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"))
+    finally:
+        conn.close()
+
+
+def test_migrates_baseline_database_to_latest(baseline_db):
+    conn = sqlite3.connect(baseline_db)
+    consultations = conn.execute("SELECT COUNT(*) FROM consultations").fetchone()[0]
+    conn.close()
+
+    assert migrate(baseline_db) == MIGRATIONS[-1][0]
+
+    conn = sqlite3.connect(baseline_db)
+    try:
+        assert current_version(conn) == MIGRATIONS[-1][0]
+        assert conn.execute("SELECT COUNT(*) FROM consultations").fetchone()[0] == consultations
+        # Existing rows are indexed for search and existing doctor keys get digests
+        assert conn.execute("SELECT COUNT(*) FROM consultation_search").fetchone()[0] == consultations
+        for access_key, digest in conn.execute("SELECT access_key, access_key_digest FROM doctors"):
+            assert digest == access_key_digest(access_key)
+    finally:
+        conn.close()
+
+
+def test_migrate_is_idempotent(baseline_db):
+    version = migrate(baseline_db)
+    schema = _schema(baseline_db)
+
+    assert migrate(baseline_db) == version
+    assert _schema(baseline_db) == schema
+    conn = sqlite3.connect(baseline_db)
+    try:
+        applied = [row[0] for row in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+    finally:
+        conn.close()
+    assert applied == [number for number, _, _ in MIGRATIONS]
+
+
+def test_migrate_stops_at_target_and_resumes(baseline_db):
+    assert migrate(baseline_db, target=2) == 2
+    conn = sqlite3.connect(baseline_db)
+    try:
+        assert not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'consultations_archive'"
+        ).fetchone()
+    finally:
+        conn.close()
+
+    assert migrate(baseline_db) == MIGRATIONS[-1][0]
+
+
+def test_fresh_database_gets_schema_and_default_doctor(tmp_path):
+    path = str(tmp_path / "fresh.db")
+    migrate(path)
+    seed_default_doctor(path)
+    seed_default_doctor(path)
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM doctors").fetchone()[0] == 1
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2  # incremental
+    finally:
+        conn.close()
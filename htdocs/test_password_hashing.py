@@ -0,0 +1,87 @@
+import hashlib
+
+import pytest
+
+import password_hashing
+from password_hashing import hash_password, verify_password
+
+# bcrypt hash of "password" as written by PHP's password_hash() (see schema.sql)
+PHP_BCRYPT = "$2y$10$92IXUNpkjO0rOQ5byMi.Ye4oKoEa3Ro9llC/.og/at2.uheWG/igi"
+
+
+@pytest.fixture(autouse=True)
+def cheap_kdf(monkeypatch):
+    """Low KDF costs so the tests stay fast; the formats are what is under test"""
+    monkeypatch.setattr(password_hashing, "ALGORITHM", "scrypt")
+    monkeypatch.setattr(password_hashing, "SCRYPT_N", 2 ** 10)
+    monkeypatch.setattr(password_hashing, "PBKDF2_ITERATIONS", 1000)
+
+
+def test_scrypt_round_trip():
+    stored = hash_password("s3cret")
+    assert stored.startswith("scrypt$1024$")
+    assert verify_password("s3cret", stored) == (True, False)
+    assert verify_password("wrong", stored) == (False, False)
+
+
+def test_salts_differ():
+    assert hash_password("s3cret") != hash_password("s3cret")
+
+
+def test_weaker_scrypt_needs_rehash(monkeypatch):
+    stored = hash_password("s3cret")
+    monkeypatch.setattr(password_hashing, "SCRYPT_N", 2 ** 11)
+    assert verify_password("s3cret", stored) == (True, True)
+
+
+def test_pbkdf2_round_trip(monkeypatch):
+    monkeypatch.setattr(password_hashing, "ALGORITHM", "pbkdf2_sha256")
+    stored = hash_password("s3cret")
+    assert stored.startswith("pbkdf2_sha256$1000$")
+    assert verify_password("s3cret", stored) == (True, False)
+    assert verify_password("wrong", stored) == (False, False)
+
+
+def test_pbkdf2_is_upgraded_when_scrypt_is_configured():
+    stored = hash_password("s3cret", algorithm="pbkdf2_sha256")
+    assert verify_password("s3cret", stored) == (True, True)
+
+
+def test_legacy_sha256_is_verified_and_rehashed():
+    stored = hashlib.sha256(b"s3cret").hexdigest()
+    assert verify_password("s3cret", stored) == (True, True)
+    assert verify_password("wrong", stored) == (False, False)
+
+
+def test_php_bcrypt_is_verified_and_kept():
+    pytest.importorskip("bcrypt")
+    assert verify_password("password", PHP_BCRYPT) == (True, False)
+    assert verify_password("wrong", PHP_BCRYPT) == (False, False)
+
+
+@pytest.mark.parametrize("stored", [
+    None,
+    "",
+    "plaintext",
+    "scrypt$1024$8$1$c2FsdA",
+    "scrypt$x$8$1$c2FsdA$aGFzaA",
+    "scrypt$1000$8$1$c2FsdA$aGFzaA",
+    "pbkdf2_sha256$1000$c2FsdA",
+    "pbkdf2_sha256$1000$c2FsdA$a",
+    PHP_BCRYPT[:20],
+])
+def test_malformed_hashes_fail_closed(stored):
+    if stored and stored.startswith("$2y$"):
+        pytest.importorskip("bcrypt")
+    assert verify_password("s3cret", stored) == (False, False)
+
+
+def test_unknown_algorithm_is_rejected():
+    with pytest.raises(ValueError):
+        hash_password("s3cret", algorithm="md5")
+
+
+def test_pooled_helpers_match_direct_calls():
+    stored = password_hashing.hash_password_pooled("s3cret")
+    assert password_hashing.verify_password_pooled("s3cret", stored) == (True, False)
+    assert password_hashing.verify_password_pooled("s3cret", None) == (False, False)
@@ -0,0 +1,44 @@
+import pytest
+
+from profile_query import parse_profile_query
+
+
+@pytest.mark.parametrize("text, gender, age_min, age_max, allergies, remainder", [
+    ("male patients in their 30s allergic to peanuts with diabetes", "Male", 30, 39, ["peanuts"], "diabetes"),
+    ("women over 60 allergic to penicillin and sulfa", "Female", 61, None, ["penicillin", "sulfa"], ""),
+    ("patients at least 65 years old with hypertension", None, 65, None, [], "hypertension"),
+    ("users under 18", None, 0, 17, [], ""),
+    ("people aged 45", None, 45, 45, [], ""),
+    ("patients aged 30-40 with asthma", None, 30, 40, [], "asthma"),
+    ("teenagers with asthma", None, 13, 19, [], "asthma"),
+    ("peanut allergy children", None, 0, 12, ["peanut"], ""),
+    ("men and women with asthma", None, None, None, [], "asthma"),
+])
+def test_extracts_structured_predicates(text, gender, age_min, age_max, allergies, remainder):
+    query = parse_profile_query(text)
+    assert query.gender == gender
+    assert (query.age_min, query.age_max) == (age_min, age_max)
+    assert query.allergies == allergies
+    assert query.remainder == remainder
+    assert query.has_filters == any([gender, age_min is not None, age_max is not None, allergies])
+
+
+@pytest.mark.parametrize("text", [
+    "diabetes",
+    "headache for 2 to 3 days",
+    "BMI over 30",
+    "people with 2 kids and asthma",
+    "no known allergies",
+    "not allergic to latex",
+    "food allergies",
+    "",
+])
+def test_ambiguous_phrases_stay_free_text(text):
+    query = parse_profile_query(text)
+    assert not query.has_filters, query
+
+
+def test_describe_summarizes_filters():
+    query = parse_profile_query("women over 60 allergic to penicillin")
+    assert query.describe() == "gender = Female; age ≥ 61; allergic to penicillin"
+    assert parse_profile_query("diabetes").describe() == ""
@@ -0,0 +1,35 @@
+from profile_records import PROFILE_INPUT_FIELDS, age_from_input, age_input_value, diff_profiles, validate_profile
+
+
+def _untouched_form(profile):
+    """What edit_profile_form submits when nothing is edited"""
+    form = {field: profile.get(field) or "" for field in PROFILE_INPUT_FIELDS}
+    form["age"] = age_from_input(age_input_value(profile.get("age")))
+    return form
+
+
+def test_untouched_form_for_an_ageless_profile_has_no_changes():
+    profile = validate_profile({"name": "Ann", "email": "ann@example.com"})
+    assert profile["age"] == ""
+
+    assert age_input_value(profile["age"]) is None
+    assert diff_profiles(profile, _untouched_form(profile)) == {}
+    # Profiles stored with age NULL (the SQLite side store) behave the same
+    assert diff_profiles({**profile, "age": None}, _untouched_form({**profile, "age": None})) == {}
+
+
+def test_untouched_form_keeps_a_known_age():
+    profile = validate_profile({"name": "Bob", "email": "bob@example.com", "age": "42"})
+    assert age_input_value(profile["age"]) == 42
+    assert diff_profiles(profile, _untouched_form(profile)) == {}
+
+
+def test_entering_or_clearing_an_age_is_a_change():
+    profile = validate_profile({"name": "Cy", "email": "cy@example.com"})
+    assert diff_profiles(profile, {**_untouched_form(profile), "age": age_from_input(0)}) == {
+        "age": {"old": "", "new": 0}
+    }
+    aged = {**profile, "age": 30}
+    assert diff_profiles(aged, {**_untouched_form(aged), "age": age_from_input(None)}) == {
+        "age": {"old": 30, "new": ""}
+    }
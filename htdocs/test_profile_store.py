@@ -0,0 +1,112 @@
+import sqlite3
+
+import pytest
+
+from profile_store import ProfileStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ProfileStore(str(tmp_path / "profiles.db"))
+    yield store
+    store.close()
+
+
+def _profile(name, age, gender, email=None, **extra):
+    return {"name": name, "email": email or f"{name.lower()}@example.com", "age": age, "gender": gender, **extra}
+
+
+def test_aggregates_follow_inserts(store):
+    store.add("p1", _profile("Ann", 34, "Female"), "2025-01-01T09:00:00")
+    store.add("p2", _profile("Bob", 38, "Male"), "2025-01-01T10:00:00")
+    store.add("p3", _profile("Cy", None, ""), "2025-01-02T10:00:00")
+
+    stats = store.stats()
+    assert stats["total"] == store.count() == 3
+    assert stats["age_histogram"] == {"30-39": 2, "unknown": 1}
+    assert stats["genders"] == {"Female": 1, "Male": 1, "Unknown": 1}
+    assert stats["timeline"] == {"2025-01-01": 2, "2025-01-02": 1}
+    assert stats["average_age"] == 36
+    assert (stats["min_age"], stats["max_age"]) == (34, 38)
+
+
+def test_replacing_a_profile_moves_it_between_buckets(store):
+    store.add("p1", _profile("Ann", 34, "Female"), "2025-01-01T09:00:00")
+    store.add("p1", _profile("Ann", 51, "Other"), "2025-01-01T09:00:00")
+
+    stats = store.stats()
+    assert stats["total"] == 1
+    assert stats["age_histogram"] == {"50-59": 1}
+    assert stats["genders"] == {"Other": 1}
+    assert stats["average_age"] == 51
+
+
+def test_deleting_profiles_empties_the_aggregates(store):
+    store.add_many([])
+    store.add("p1", _profile("Ann", 34, "Female"), "2025-01-01T09:00:00")
+    store.add("p2", _profile("Bob", 72, "Male"), "2025-01-03T09:00:00")
+
+    store.delete("p1")
+    stats = store.stats()
+    assert stats["total"] == 1
+    assert stats["age_histogram"] == {"70-79": 1}
+    assert stats["timeline"] == {"2025-01-03": 1}
+
+    store.delete_many(["p2", "missing"])
+    stats = store.stats()
+    assert stats["total"] == 0
+    assert stats["age_histogram"] == {} and stats["genders"] == {} and stats["timeline"] == {}
+    assert stats["average_age"] is None
+
+
+def test_identity_keys_follow_replace_and_delete(store):
+    store.add("p1", _profile("Ann", 34, "Female", email="Ann@Example.com ", phone="+1 (555) 123-4567"))
+    assert store.find_by_identity({"email": "ann@example.com"}) == {"p1": ["email"]}
+    assert store.find_by_identity({"phone": "555.123.4567"}) == {"p1": ["phone"]}
+
+    store.delete("p1")
+    assert store.find_by_identity({"email": "ann@example.com"}) == {}
+
+
+def test_browse_pages_and_filters(store):
+    for i in range(5):
+        store.add(f"p{i}", _profile(f"Name{i}", 30 + i, "Female" if i % 2 else "Male",
+                                    medical_history="asthma" if i < 2 else "diabetes"),
+                  f"2025-01-0{i + 1}T09:00:00")
+
+    first, next_key = store.browse(limit=2)
+    second, _ = store.browse(limit=2, after=next_key)
+    assert [row["id"] for row in first + second] == ["p4", "p3", "p2", "p1"]
+
+    rows, _ = store.browse(text="asth", limit=10)
+    assert {row["id"] for row in rows} == {"p0", "p1"}
+    assert store.count_matching(text="asthma", gender="Female") == 1
+
+
+def test_notes_column_is_added_to_existing_stores(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE profiles (id TEXT PRIMARY KEY, name TEXT, email TEXT, phone TEXT, age INTEGER,
+                               gender TEXT, address TEXT, medical_history TEXT, allergies TEXT, created_at TEXT)
+    """)
+    conn.close()
+
+    store = ProfileStore(path)
+    try:
+        store.add("p1", _profile("Ann", 34, "Female", notes="prefers email"))
+        assert store.get_many(["p1"])[0]["notes"] == "prefers email"
+    finally:
+        store.close()
+
+
+def test_audit_trail(store):
+    store.record_audit("p1", "create", reembedded=["clinical", "demographic"])
+    store.record_audit("p1", "update", {"notes": {"old": "", "new": "call back"}})
+    store.record_audit_many(["p2", "p3"], "import", reembedded=["clinical"])
+
+    history = store.audit_history("p1")
+    assert [entry["action"] for entry in history] == ["update", "create"]
+    assert history[0]["changes"] == {"notes": {"old": "", "new": "call back"}}
+    assert history[1]["reembedded"] == ["clinical", "demographic"]
+    assert store.audit_history("p3")[0]["action"] == "import"
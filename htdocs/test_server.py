@@ -1,73 +1,127 @@
-#!/usr/bin/env python3
 """
-Test script to verify FastAPI server is running and responding correctly
+End-to-end checks for the HTTP routes
+
+Runs simple_server.py in-process on an ephemeral port against a migrated
+copy of chatbot.db, so no server needs to be started by hand. main.py
+serves the same routes through the same query, auth and storage modules.
 """
 
-import requests
 import json
-import time
-
-def test_server():
-    base_url = "http://127.0.0.1:5000"
-    
-    print("🧪 Testing FastAPI Server Connection...")
-    print("=" * 50)
-    
-    # Test 1: Health check
-    try:
-        print("1. Testing health endpoint...")
-        response = requests.get(f"{base_url}/health", timeout=5)
-        if response.status_code == 200:
-            print("✅ Health check passed")
-            print(f"   Response: {response.json()}")
-        else:
-            print(f"❌ Health check failed: {response.status_code}")
-    except requests.exceptions.ConnectionError:
-        print("❌ Cannot connect to server. Is it running?")
-        print("   Try running: python run_server.py")
-        return False
-    except Exception as e:
-        print(f"❌ Health check error: {e}")
-        return False
-    
-    # Test 2: Chat endpoint
-    try:
-        print("\n2. Testing chat endpoint...")
-        chat_data = {
-            "message": "I have fever and cough",
-            "user_id": 1
-        }
-        response = requests.post(f"{base_url}/chat", json=chat_data, timeout=10)
-        if response.status_code == 200:
-            print("✅ Chat endpoint working")
-            result = response.json()
-            print(f"   Response: {result['response'][:100]}...")
-            print(f"   Consultation ID: {result.get('consultation_id', 'None')}")
-        else:
-            print(f"❌ Chat endpoint failed: {response.status_code}")
-            print(f"   Error: {response.text}")
-    except Exception as e:
-        print(f"❌ Chat test error: {e}")
-    
-    # Test 3: List consultations
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import simple_server
+from doctor_auth import DoctorKeyCache
+from static_assets import StaticAssets
+from write_behind import ConsultationWriter
+
+
+@pytest.fixture
+def base_url(db_path, tmp_path, monkeypatch):
+    writer = ConsultationWriter(db_path, mode="sync")
+    monkeypatch.setattr(simple_server, "DATABASE_URL", db_path)
+    monkeypatch.setattr(simple_server, "consultation_writer", writer)
+    monkeypatch.setattr(simple_server, "doctor_key_cache", DoctorKeyCache(db_path=db_path))
+    monkeypatch.setattr(simple_server, "static_assets", StaticAssets(cache_dir=str(tmp_path / "static-cache")))
+
+    server = simple_server.ThreadingServer(("127.0.0.1", 0), simple_server.ChatbotHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    writer.close()
+
+
+def request(url, data=None, headers=None):
+    """(status, headers, body) without raising on 4xx"""
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, data=body, headers=headers or {})
+    if body is not None:
+        req.add_header("Content-Type", "application/json")
     try:
-        print("\n3. Testing consultations list...")
-        response = requests.get(f"{base_url}/_list_recent", timeout=5)
-        if response.status_code == 200:
-            print("✅ Consultations endpoint working")
-            consultations = response.json()
-            print(f"   Found {len(consultations)} consultations")
-        else:
-            print(f"❌ Consultations endpoint failed: {response.status_code}")
-    except Exception as e:
-        print(f"❌ Consultations test error: {e}")
-    
-    print("\n" + "=" * 50)
-    print("🎉 Server test completed!")
-    print("\nIf all tests passed, your chatbot should work now.")
-    print("Open: http://127.0.0.1:5000/static/chatbot-demo.html")
-    
-    return True
-
-if __name__ == "__main__":
-    test_server()
+        with urllib.request.urlopen(req, timeout=10) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_health(base_url):
+    status, _, body = request(f"{base_url}/health")
+    assert status == 200
+    assert json.loads(body)["status"] == "healthy"
+
+
+def test_chat_is_listed_for_review(base_url):
+    status, _, body = request(f"{base_url}/chat", {"message": "I have fever and cough", "user_id": 1})
+    assert status == 200
+    result = json.loads(body)
+    assert result["response"]
+
+    status, _, body = request(f"{base_url}/_list_recent?limit=50")
+    assert status == 200
+    assert result["consultation_id"] in {row["id"] for row in json.loads(body)}
+
+
+def test_list_recent_follows_the_cursor(base_url):
+    seen = []
+    url = f"{base_url}/_list_recent?limit=2"
+    while True:
+        status, headers, body = request(url)
+        assert status == 200
+        page = json.loads(body)
+        assert len(page) <= 2
+        seen.extend(row["id"] for row in page)
+        cursor = headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        url = f"{base_url}/_list_recent?limit=2&cursor={cursor}"
+
+    assert len(seen) == len(set(seen))
+    status, _, body = request(f"{base_url}/_list_recent?limit=100")
+    assert seen == [row["id"] for row in json.loads(body)]
+
+
+@pytest.mark.parametrize("query", ["cursor=not-a-cursor", "status=bogus", "since=yesterday"])
+def test_list_recent_rejects_bad_parameters(base_url, query):
+    status, _, body = request(f"{base_url}/_list_recent?{query}")
+    assert status == 400
+    assert "error" in json.loads(body)
+
+
+def test_storage_stats_requires_a_doctor_key(base_url):
+    assert request(f"{base_url}/_storage_stats")[0] == 401
+    assert request(f"{base_url}/_storage_stats", headers={"X-Doctor-Key": "wrong"})[0] == 401
+
+    status, _, body = request(f"{base_url}/_storage_stats", headers={"X-Doctor-Key": "doctor123"})
+    assert status == 200
+    assert json.loads(body)["consultations"]["hot_rows"] >= 1
+
+
+def test_metrics(base_url):
+    request(f"{base_url}/health")
+    status, _, body = request(f"{base_url}/metrics")
+    assert status == 200
+    assert body
+
+
+def test_only_the_front_end_is_served(base_url):
+    assert request(f"{base_url}/doctor-panel.html")[0] == 200
+    for path in ("/main.py", "/chatbot.db", "/../chatbot.db", "/.env"):
+        assert request(f"{base_url}{path}")[0] == 404
+
+
+def test_register_and_login(base_url):
+    account = {"name": "Test User", "email": "test@example.com", "password": "s3cret-pass"}
+    assert request(f"{base_url}/register", account)[0] == 200
+    assert request(f"{base_url}/register", account)[0] == 400
+
+    status, _, body = request(f"{base_url}/login", {"email": account["email"], "password": account["password"]})
+    assert status == 200
+    assert json.loads(body)["user"]["email"] == account["email"]
+
+    assert request(f"{base_url}/login", {"email": account["email"], "password": "wrong"})[0] == 401
+    assert request(f"{base_url}/login", {"email": "nobody@example.com", "password": "wrong"})[0] == 401
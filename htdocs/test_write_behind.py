@@ -0,0 +1,111 @@
+import sqlite3
+import threading
+
+import pytest
+
+from write_behind import ConsultationWriter
+
+
+def _stored_ids(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute("SELECT id FROM consultations")}
+    finally:
+        conn.close()
+
+
+def test_close_flushes_buffered_rows(db_path):
+    # A long commit window keeps the rows buffered until close()
+    writer = ConsultationWriter(db_path, mode="async", flush_ms=60000)
+    for i in range(5):
+        writer.submit(f"wb{i}", "Patient", "fever", "rest")
+    assert all(writer.is_pending(f"wb{i}") for i in range(5))
+
+    writer.close()
+
+    assert {f"wb{i}" for i in range(5)} <= _stored_ids(db_path)
+    assert not writer.is_pending("wb0")
+    with pytest.raises(RuntimeError):
+        writer.submit("late", "Patient", "fever", "rest")
+
+
+def test_ensure_written_forces_out_a_buffered_row(db_path):
+    writer = ConsultationWriter(db_path, mode="async", flush_ms=60000)
+    try:
+        writer.submit("wb-now", "Patient", "fever", "rest")
+        writer.ensure_written("wb-now")
+        assert "wb-now" in _stored_ids(db_path)
+    finally:
+        writer.close()
+
+
+@pytest.mark.parametrize("mode", ["sync", "group"])
+def test_blocking_modes_commit_before_returning(db_path, mode):
+    writer = ConsultationWriter(db_path, mode=mode)
+    try:
+        writer.submit(f"wb-{mode}", "Patient", "fever", "rest")
+        assert f"wb-{mode}" in _stored_ids(db_path)
+    finally:
+        writer.close()
+
+
+def test_group_mode_reports_failed_commits(db_path):
+    writer = ConsultationWriter(db_path, mode="group")
+    try:
+        writer.submit("dup", "Patient", "fever", "rest")
+        with pytest.raises(sqlite3.IntegrityError):
+            writer.submit("dup", "Patient", "fever", "rest")
+    finally:
+        writer.close()
+
+
+def test_invalid_mode_is_rejected(db_path):
+    with pytest.raises(ValueError):
+        ConsultationWriter(db_path, mode="eventually")
+
+
+def _finishes(target, timeout=5):
+    """Run target on a thread; the exception it raised, or fail if it is still blocked"""
+    outcome = {}
+
+    def run():
+        try:
+            target()
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "call is still blocked"
+    return outcome.get("error")
+
+
+def test_unexpected_commit_errors_reach_the_caller(db_path, monkeypatch):
+    writer = ConsultationWriter(db_path, mode="group")
+    try:
+        def broken(rows, conn=None):
+            raise RuntimeError("disk on fire")
+
+        monkeypatch.setattr(writer, "_write", broken)
+        error = _finishes(lambda: writer.submit("wb-lost", "Patient", "fever", "rest"))
+        assert isinstance(error, RuntimeError)
+        assert "wb-lost" not in _stored_ids(db_path)
+
+        # The flusher survives and later batches still commit
+        monkeypatch.undo()
+        assert _finishes(lambda: writer.submit("wb-later", "Patient", "fever", "rest")) is None
+        assert "wb-later" in _stored_ids(db_path)
+    finally:
+        writer.close()
+
+
+def test_a_dead_flusher_fails_callers_instead_of_blocking(tmp_path):
+    writer = ConsultationWriter(str(tmp_path / "missing" / "chatbot.db"), mode="group")
+    try:
+        assert isinstance(_finishes(lambda: writer.submit("wb1", "Patient", "fever", "rest")), sqlite3.Error)
+        assert isinstance(_finishes(lambda: writer.submit("wb2", "Patient", "fever", "rest")), RuntimeError)
+        assert _finishes(lambda: writer.ensure_written("wb1")) is None
+        assert _finishes(writer.flush) is None
+    finally:
+        writer.close()
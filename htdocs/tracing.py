@@ -0,0 +1,204 @@
+"""
+Lightweight per-request tracing
+
+A trace is a tree of timed spans for one request. Spans are opened with
+span(name) anywhere in the call path; outside a traced request they are
+no-ops. When the request finishes the trace is:
+  - summarised in a Server-Timing response header (visible in browser devtools)
+  - optionally returned in the JSON body (?debug_timing=1, see breakdown())
+  - appended to a local JSONL log for a sampled fraction of requests
+
+No external collector is needed; the log can be analysed offline, e.g.
+  python tracing.py --log traces.jsonl
+
+Configuration (environment variables):
+  TRACE_SAMPLE_RATE   fraction of requests written to the log (default 0.01)
+  TRACE_SLOW_MS       always log traces slower than this (default 0 = off)
+  TRACE_LOG_PATH      JSONL file to append to (default traces.jsonl)
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "0"))
+LOG_PATH = os.getenv("TRACE_LOG_PATH", "traces.jsonl")
+
+_current = contextvars.ContextVar("current_trace", default=None)
+_log_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, name, parent, start):
+        self.name = name
+        self.parent = parent
+        self.start = start
+        self.end = None
+
+    @property
+    def duration_ms(self):
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+
+class Trace:
+    def __init__(self, name, sampled=False):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.sampled = sampled
+        self.started_at = datetime.now().isoformat()
+        self.root = Span(name, None, time.perf_counter())
+        self.spans = []
+        self._stack = [self.root]
+
+    @contextmanager
+    def span(self, name):
+        s = Span(name, self._stack[-1], time.perf_counter())
+        self.spans.append(s)
+        self._stack.append(s)
+        try:
+            yield s
+        finally:
+            s.end = time.perf_counter()
+            self._stack.pop()
+
+    def finish(self):
+        if self.root.end is None:
+            self.root.end = time.perf_counter()
+        return self.root.duration_ms
+
+    def breakdown(self):
+        """Stage timings in milliseconds; the total is measured up to now if still running"""
+        return {
+            "trace_id": self.id,
+            "total_ms": round(self.root.duration_ms, 3),
+            "spans": [
+                {
+                    "name": s.name,
+                    "parent": s.parent.name,
+                    "offset_ms": round((s.start - self.root.start) * 1000, 3),
+                    "duration_ms": round(s.duration_ms, 3)
+                }
+                for s in self.spans
+            ]
+        }
+
+    def server_timing(self):
+        """Server-Timing header value; repeated span names are summed"""
+        totals = {}
+        for s in self.spans:
+            totals[s.name] = totals.get(s.name, 0.0) + s.duration_ms
+        entries = [f"{name};dur={ms:.2f}" for name, ms in totals.items()]
+        entries.append(f"total;dur={self.root.duration_ms:.2f}")
+        return ", ".join(entries)
+
+    def should_log(self):
+        return self.sampled or (SLOW_MS > 0 and self.root.duration_ms >= SLOW_MS)
+
+
+def start_trace(name, sample_rate=None):
+    """Begin a trace for the current request and make it current"""
+    rate = SAMPLE_RATE if sample_rate is None else sample_rate
+    trace = Trace(name, sampled=random.random() < rate)
+    _current.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current.get()
+
+
+def end_trace(log_path=None):
+    """Finish the current trace, log it if sampled, and return it"""
+    trace = _current.get()
+    if trace is None:
+        return None
+    _current.set(None)
+    trace.finish()
+    if trace.should_log():
+        write_trace(trace, log_path or LOG_PATH)
+    return trace
+
+
+@contextmanager
+def span(name):
+    """Time a stage of the current request; does nothing when no trace is active"""
+    trace = _current.get()
+    if trace is None:
+        yield None
+        return
+    with trace.span(name) as s:
+        yield s
+
+
+def write_trace(trace, log_path=LOG_PATH):
+    record = {"started_at": trace.started_at, "name": trace.name, **trace.breakdown()}
+    line = json.dumps(record) + "\n"
+    with _log_lock:
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def trace_flask(app):
+    """Trace every request of a Flask app and add a Server-Timing header"""
+    from flask import request
+
+    @app.before_request
+    def begin_request_trace():
+        rule = request.url_rule.rule if request.url_rule else request.path
+        start_trace(f"{request.method} {rule}")
+
+    @app.after_request
+    def finish_request_trace(response):
+        trace = end_trace()
+        if trace is not None:
+            response.headers["Server-Timing"] = trace.server_timing()
+        return response
+
+
+def debug_timing_requested(args):
+    """True for ?debug_timing=1 (args is a request's query-string mapping)"""
+    return args.get("debug_timing") in ("1", "true", "yes")
+
+
+def summarize(log_path=LOG_PATH):
+    """Per-route, per-span mean and p95 from a trace log"""
+    stages = {}
+    with open(log_path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            route = stages.setdefault(record["name"], {})
+            route.setdefault("total", []).append(record["total_ms"])
+            for s in record["spans"]:
+                route.setdefault(s["name"], []).append(s["duration_ms"])
+
+    summary = {}
+    for route, spans in stages.items():
+        summary[route] = {}
+        for name, values in spans.items():
+            values.sort()
+            summary[route][name] = {
+                "count": len(values),
+                "mean_ms": round(sum(values) / len(values), 3),
+                "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3)
+            }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a JSONL trace log")
+    parser.add_argument("--log", default=LOG_PATH)
+    args = parser.parse_args()
+    print(json.dumps(summarize(args.log), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+HNSW index configuration for the Chroma collections
+
+Each collection's HNSW parameters come from this module instead of being
+hard-coded at the call site. Defaults match Chroma's own; override them
+per collection with environment variables named after the collection:
+
+  HNSW_<COLLECTION>_M                 graph degree (default 16)
+  HNSW_<COLLECTION>_CONSTRUCTION_EF   build-time candidate list (default 100)
+  HNSW_<COLLECTION>_SEARCH_EF         query-time candidate list (default 10)
+
+e.g. HNSW_KNOWLEDGE_BASE_SEARCH_EF=64. The hnsw:* collection metadata
+keys used here are those of chromadb 0.5 (pinned in requirements.txt);
+later releases configure HNSW differently. Chroma fixes these when a
+collection is created, so changing them for an existing collection needs
+a rebuild. The rebuild command re-creates a collection with the new
+parameters from its stored embeddings, documents and metadata; no text
+is re-embedded. Stop the services that use the store while it runs.
+
+Per-request recall/latency trade-offs go through
+query_collection(..., ef=N): HNSW searches with max(search_ef, n_results)
+candidates, so asking Chroma for ef results and keeping the best
+n_results searches with ef. Requests can only raise ef above the
+collection's search_ef, capped at HNSW_MAX_EF.
+
+Run:
+  python vector_index.py status
+  python vector_index.py rebuild --collection knowledge_base [--m 32] [--construction-ef 200] [--search-ef 64]
+"""
+
+import argparse
+import os
+import time
+
+SPACE = "cosine"
+DEFAULT_M = 16
+DEFAULT_CONSTRUCTION_EF = 100
+DEFAULT_SEARCH_EF = 10
+MAX_EF = int(os.getenv("HNSW_MAX_EF", "500"))
+
+# Collection name -> persistent store it lives in
+COLLECTIONS = {
+    "knowledge_base": "./chroma_db",
+    "conversations": "./chroma_db",
+    "user_profiles": "./vector_db",
+    "user_profiles_clinical": "./vector_db",
+    "user_profiles_demographic": "./vector_db"
+}
+
+HNSW_KEYS = {"M": "hnsw:M", "construction_ef": "hnsw:construction_ef", "search_ef": "hnsw:search_ef"}
+REBUILD_BATCH = 1000
+
+
+def hnsw_params(name):
+    """Configured HNSW parameters for a collection"""
+    prefix = f"HNSW_{name.upper()}_"
+    return {
+        "M": int(os.getenv(prefix + "M", DEFAULT_M)),
+        "construction_ef": int(os.getenv(prefix + "CONSTRUCTION_EF", DEFAULT_CONSTRUCTION_EF)),
+        "search_ef": int(os.getenv(prefix + "SEARCH_EF", DEFAULT_SEARCH_EF))
+    }
+
+
+def collection_metadata(name, **overrides):
+    """Chroma collection metadata carrying the HNSW parameters"""
+    params = {**hnsw_params(name), **{k: v for k, v in overrides.items() if v is not None}}
+    metadata = {"hnsw:space": SPACE}
+    for key, value in params.items():
+        metadata[HNSW_KEYS[key]] = value
+    return metadata
+
+
+def index_drift(collection, name=None):
+    """HNSW settings where the live collection differs from the configuration"""
+    wanted = collection_metadata(name or collection.name)
+    current = collection.metadata or {}
+    defaults = {"hnsw:M": DEFAULT_M, "hnsw:construction_ef": DEFAULT_CONSTRUCTION_EF,
+                "hnsw:search_ef": DEFAULT_SEARCH_EF, "hnsw:space": "l2"}
+    return {
+        key: (current.get(key, defaults[key]), value)
+        for key, value in wanted.items()
+        if current.get(key, defaults[key]) != value
+    }
+
+
+def get_collection(client, name):
+    """
+    Open a collection, creating it with the configured parameters if it
+    does not exist yet; warns if an existing index differs.
+
+    The existing collection is read before anything is created, because
+    get_or_create_collection(metadata=...) overwrites the stored metadata
+    in some chromadb releases, which would hide (and misreport) drift.
+    """
+    try:
+        collection = client.get_collection(name=name)
+    except Exception:  # missing; the exception type differs between chromadb releases
+        return client.get_or_create_collection(name=name, metadata=collection_metadata(name))
+    drift = index_drift(collection, name)
+    if drift:
+        changes = ", ".join(f"{key} {old} -> {new}" for key, (old, new) in drift.items())
+        print(f"⚠️ Collection '{name}' was built with different HNSW settings ({changes}); "
+              f"run 'python vector_index.py rebuild --collection {name}' to apply them")
+    return collection
+
+
+def parse_ef(value):
+    """Validate a client-supplied ef: None, or an integer 1..MAX_EF; raises ValueError"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).strip().isdigit():
+        raise ValueError(f"ef must be a positive integer up to {MAX_EF}")
+    ef = int(value)
+    if not 1 <= ef <= MAX_EF:
+        raise ValueError(f"ef must be a positive integer up to {MAX_EF}")
+    return ef
+
+
+def query_collection(collection, query_embeddings, n_results, ef=None, **kwargs):
+    """collection.query with an optional per-request search ef"""
+    fetch = n_results
+    if ef:
+        fetch = max(n_results, min(int(ef), MAX_EF))
+    results = collection.query(query_embeddings=query_embeddings, n_results=fetch, **kwargs)
+    if fetch == n_results:
+        return results
+    return {
+        key: [row[:n_results] for row in value] if isinstance(value, list) and value and isinstance(value[0], list) else value
+        for key, value in results.items()
+    }
+
+
+def _read_all(collection):
+    """Page through every stored record: ids, embeddings, documents, metadatas"""
+    total = collection.count()
+    for offset in range(0, total, REBUILD_BATCH):
+        page = collection.get(
+            limit=REBUILD_BATCH,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        yield page
+
+
+def rebuild(client, name, m=None, construction_ef=None, search_ef=None, keep_old=False):
+    """Re-create a collection with new HNSW parameters from its stored embeddings"""
+    old = client.get_collection(name)
+    previous = old.metadata or {}
+    metadata = {**previous, **collection_metadata(name, M=m, construction_ef=construction_ef, search_ef=search_ef)}
+    # Stored distances and similarity thresholds depend on the space, so it never changes here
+    metadata["hnsw:space"] = previous.get("hnsw:space", "l2")
+
+    staging_name = f"{name}__rebuild"
+    try:
+        client.delete_collection(staging_name)
+    except Exception:
+        pass
+    staging = client.create_collection(name=staging_name, metadata=metadata)
+
+    copied = 0
+    for page in _read_all(old):
+        if not page["ids"]:
+            continue
+        staging.add(
+            ids=page["ids"],
+            embeddings=page["embeddings"],
+            documents=page["documents"],
+            metadatas=page["metadatas"]
+        )
+        copied += len(page["ids"])
+
+    expected = old.count()
+    if staging.count() != expected:
+        client.delete_collection(staging_name)
+        raise RuntimeError(f"Rebuild copied {staging.count()} of {expected} records; original left in place")
+
+    backup_name = f"{name}__old_{int(time.time())}"
+    old.modify(name=backup_name)
+    staging.modify(name=name)
+    if not keep_old:
+        client.delete_collection(backup_name)
+    return copied, metadata, backup_name if keep_old else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and rebuild HNSW indexes")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("status", help="show collection sizes and HNSW settings")
+
+    rebuild_parser = sub.add_parser("rebuild", help="re-create a collection with new HNSW parameters")
+    rebuild_parser.add_argument("--collection", required=True, choices=sorted(COLLECTIONS))
+    rebuild_parser.add_argument("--path", help="Chroma store (default: the collection's usual store)")
+    rebuild_parser.add_argument("--m", type=int)
+    rebuild_parser.add_argument("--construction-ef", type=int)
+    rebuild_parser.add_argument("--search-ef", type=int)
+    rebuild_parser.add_argument("--keep-old", action="store_true", help="keep the previous collection as a backup")
+    args = parser.parse_args()
+
+    import chromadb
+
+    if args.command == "status":
+        for name, path in COLLECTIONS.items():
+            if not os.path.isdir(path):
+                continue
+            client = chromadb.PersistentClient(path=path)
+            try:
+                collection = client.get_collection(name)
+            except Exception:
+                print(f"➖ {name}: not created yet ({path})")
+                continue
+            drift = index_drift(collection)
+            state = "✅" if not drift else "⚠️ rebuild needed"
+            print(f"📦 {name} ({path}): {collection.count()} vectors {state}")
+            print(f"   current: {collection.metadata}")
+            if drift:
+                print(f"   wanted:  {collection_metadata(name)}")
+        return
+
+    path = args.path or COLLECTIONS[args.collection]
+    client = chromadb.PersistentClient(path=path)
+    print(f"🔧 Rebuilding '{args.collection}' in {path}...")
+    start = time.perf_counter()
+    copied, metadata, backup = rebuild(client, args.collection, args.m, args.construction_ef,
+                                       args.search_ef, args.keep_old)
+    print(f"✅ Rebuilt {copied} vectors in {time.perf_counter() - start:.1f}s with {metadata}")
+    if backup:
+        print(f"   Previous index kept as '{backup}'")
+
+
+if __name__ == "__main__":
+    main()
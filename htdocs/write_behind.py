@@ -0,0 +1,222 @@
+"""
+Write-behind buffer for consultation inserts from /chat
+
+Chat handlers hand rows to a ConsultationWriter instead of running their
+own INSERT + commit. A background flusher groups rows that arrive within
+a few milliseconds into one transaction, so many requests share a single
+fsync.
+
+Durability modes (CONSULTATION_WRITE_MODE):
+  sync    insert and commit on the caller's thread (original behaviour)
+  group   caller waits until its row's group commit has finished (default)
+  async   caller returns immediately; rows are committed by the flusher
+
+In every mode the consultation id is usable straight away: ensure_written()
+forces out a row that is still buffered, and the servers call it before
+/doctor_review touches the row. close() flushes everything on shutdown.
+A failed commit is raised to the callers waiting on it; if the flusher
+itself stops (e.g. the database cannot be opened), everything still
+buffered fails and later submit() calls raise instead of blocking.
+
+Configuration (environment variables):
+  CONSULTATION_WRITE_MODE     sync | group | async (default group)
+  CONSULTATION_FLUSH_MS       group commit window in milliseconds (default 5)
+  CONSULTATION_FLUSH_ROWS     flush early once this many rows are buffered (default 100)
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+
+from instrumentation import InstrumentedConnection
+
+WRITE_MODES = ("sync", "group", "async")
+
+WRITE_MODE = os.getenv("CONSULTATION_WRITE_MODE", "group")
+FLUSH_MS = float(os.getenv("CONSULTATION_FLUSH_MS", "5"))
+FLUSH_ROWS = int(os.getenv("CONSULTATION_FLUSH_ROWS", "100"))
+
+
+class _Batch:
+    """Rows committed together, plus the event their submitters wait on"""
+
+    def __init__(self):
+        self.rows = []
+        self.done = threading.Event()
+        self.error = None
+
+
+class ConsultationWriter:
+    def __init__(self, db_path, mode=WRITE_MODE, flush_ms=FLUSH_MS, flush_rows=FLUSH_ROWS):
+        if mode not in WRITE_MODES:
+            raise ValueError(f"Invalid write mode '{mode}'. Use one of: {', '.join(WRITE_MODES)}")
+        self.db_path = db_path
+        self.mode = mode
+        self.flush_interval = flush_ms / 1000.0
+        self.flush_rows = flush_rows
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._batch = _Batch()
+        self._inflight = {}  # consult_id -> batch not yet committed
+        self._thread = None
+        self._closed = False
+        self._flush_requested = False
+        self.flushed_batches = 0
+        self.flushed_rows = 0
+
+    @property
+    def blocking(self):
+        """True when submit() waits on disk I/O and should run off the event loop"""
+        return self.mode != "async"
+
+    def start(self):
+        with self._lock:
+            if self._thread is None and self.mode != "sync":
+                self._thread = threading.Thread(target=self._run, name="consultation-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def submit(self, consult_id, patient_name, symptoms, chatbot_recommendation):
+        """Queue a consultation row; returns consult_id once the mode's durability is met"""
+        row = (consult_id, patient_name, symptoms, chatbot_recommendation)
+
+        if self.mode == "sync":
+            self._write([row])
+            return consult_id
+
+        self.start()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Consultation writer is closed")
+            batch = self._batch
+            batch.rows.append(row)
+            self._inflight[consult_id] = batch
+            if len(batch.rows) == 1 or len(batch.rows) >= self.flush_rows:
+                self._wakeup.notify()
+
+        if self.mode == "group":
+            batch.done.wait()
+            if batch.error:
+                raise batch.error
+        return consult_id
+
+    def is_pending(self, consult_id):
+        with self._lock:
+            return consult_id in self._inflight
+
+    def ensure_written(self, consult_id):
+        """Block until consult_id is committed if it is still buffered"""
+        with self._lock:
+            batch = self._inflight.get(consult_id)
+            if batch is None:
+                return
+            if batch is self._batch:
+                self._flush_requested = True
+                self._wakeup.notify()
+        batch.done.wait()
+        if batch.error:
+            raise batch.error
+
+    def flush(self):
+        """Commit everything buffered so far"""
+        with self._lock:
+            batch = self._batch
+            if not batch.rows:
+                return
+            self._flush_requested = True
+            self._wakeup.notify()
+        batch.done.wait()
+
+    def close(self):
+        """Flush remaining rows and stop the flusher thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        conn = None
+        error = None
+        try:
+            conn = self._connect()
+            while True:
+                with self._lock:
+                    # Sleep until the first row of a batch arrives
+                    while not self._batch.rows and not self._closed:
+                        self._wakeup.wait()
+                    # Group commit window: let more rows join unless full or asked to flush
+                    if not self._closed and not self._flush_requested and len(self._batch.rows) < self.flush_rows:
+                        self._wakeup.wait(self.flush_interval)
+                    batch = self._batch
+                    self._batch = _Batch()
+                    self._flush_requested = False
+                    closing = self._closed
+
+                if batch.rows:
+                    self._commit(conn, batch)
+                if closing and not self._batch.rows:
+                    return
+        except Exception as e:
+            error = e
+            print(f"⚠️ Consultation writer stopped: {e}")
+        finally:
+            # Nobody is left to commit: fail whatever is still waiting and refuse new rows
+            self._fail_pending(error or RuntimeError("Consultation writer stopped"))
+            if conn is not None:
+                conn.close()
+
+    def _commit(self, conn, batch):
+        try:
+            self._write(batch.rows, conn)
+            self.flushed_batches += 1
+            self.flushed_rows += len(batch.rows)
+        except Exception as e:
+            batch.error = e
+            if self.mode == "async":
+                print(f"⚠️ Failed to write {len(batch.rows)} consultations: {e}")
+        finally:
+            with self._lock:
+                for row in batch.rows:
+                    if self._inflight.get(row[0]) is batch:
+                        del self._inflight[row[0]]
+            batch.done.set()
+
+    def _fail_pending(self, error):
+        with self._lock:
+            self._closed = True
+            pending = {id(batch): batch for batch in self._inflight.values()}
+            pending[id(self._batch)] = self._batch
+            self._inflight.clear()
+            self._batch = _Batch()
+        for batch in pending.values():
+            if not batch.done.is_set():
+                batch.error = batch.error or error
+                batch.done.set()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, factory=InstrumentedConnection)
+        conn.execute("PRAGMA busy_timeout = 30000")
+        return conn
+
+    def _write(self, rows, conn=None):
+        owned = conn is None
+        if owned:
+            conn = self._connect()
+        try:
+            try:
+                conn.executemany("""
+                    INSERT INTO consultations (id, patient_name, symptoms, chatbot_recommendation)
+                    VALUES (?, ?, ?, ?)
+                """, rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        finally:
+            if owned:
+                conn.close()